@@ -0,0 +1,86 @@
+"""
+Round-trip budget of the result creation write path.
+
+    python -m lib.benchmarks.create_roundtrips [--verbose]
+
+Runs write_results (the database half of POST /results/) for one
+submission against SQL_DATABASE_URL, for a new and for an existing patient,
+counts statements plus COMMIT, prints them and exits non-zero when either case is over budget.
+Everything it creates is deleted afterwards.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+
+from sqlalchemy import delete
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.config.query_count import track_round_trips
+from lib.models.sql import Blob, Result, ResultImage, User
+from lib.stats import shift_result_stats
+from lib.utils.result_writer import NewResult, write_results
+
+# SELECT patient id, INSERT result, result_stats upsert, INSERT result_images, blob upsert, COMMIT
+EXISTING_PATIENT_BUDGET = 6
+# ... plus INSERT patient and its search trigrams
+NEW_PATIENT_BUDGET = 8
+
+
+async def _persist(creator_id: int, email: str, blobs):
+    counter = track_round_trips(keep_statements=True)
+    async with async_session() as session:
+        persisted = await write_results(session, [NewResult(
+            created_by=creator_id, email=email, name="Round Trip Check", age=40, gender="Female",
+            final_result="NON CANCER", confidence=87.5,
+            scored=[(blob_id, size, "NON CANCER", 87.5) for blob_id, size in blobs],
+        )])
+        await session.commit()
+    return persisted[0].result, counter
+
+
+async def _cleanup(email: str, blobs):
+    track_round_trips()
+    async with async_session() as session:
+        user_id = (await session.execute(select(User.id).where(User.email == email))).scalar_one_or_none()
+        if user_id is not None:
+            result_ids = select(Result.id).where(Result.user_id == user_id)
+            await session.execute(delete(ResultImage).where(ResultImage.result_id.in_(result_ids)))
+            await shift_result_stats(session, Result.user_id == user_id)
+            await session.execute(delete(Result).where(Result.user_id == user_id))
+            await session.delete(await session.get(User, user_id))
+        await session.execute(delete(Blob).where(Blob.id.in_([b for b, _ in blobs])))
+        await session.commit()
+
+
+async def run(verbose: bool = False) -> int:
+    async with async_session() as session:
+        creator_id = (await session.execute(select(User.id).order_by(User.id).limit(1))).scalar_one_or_none()
+    if creator_id is None:
+        print("No users yet: start the app once so the admin account exists")
+        return 1
+
+    email = f"roundtrip-{os.urandom(6).hex()}@example.com"
+    blobs = [(hashlib.sha256(os.urandom(16)).hexdigest() + ".jpg", 1024) for _ in range(3)]
+    failures = 0
+    try:
+        for case, budget in (("new patient", NEW_PATIENT_BUDGET), ("existing patient", EXISTING_PATIENT_BUDGET)):
+            _, counter = await _persist(creator_id, email, blobs)
+            over = counter.count > budget
+            failures += over
+            print(f"{case:18} {counter.count} round-trips (budget {budget}) {'FAIL' if over else 'ok'}")
+            if verbose or over:
+                for statement in counter.statements:
+                    print("   ", " ".join(statement.split())[:160])
+    finally:
+        await _cleanup(email, blobs)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="list every statement")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args.verbose)) else 0)
@@ -0,0 +1,97 @@
+"""
+Per-row CPU of ORM-entity reads vs projected Core reads for the listings.
+
+    python -m lib.benchmarks.read_projection [--rows 1000] [--repeat 5]
+
+Runs against SQL_DATABASE_URL. Each variant fetches the same rows and maps
+them into response dicts the way the endpoints do; CPU time (not wall time,
+so network latency does not blur it) is reported per row.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.models.sql import Result, User
+
+RESULT_FIELDS = ("id", "user_id", "created_by", "age", "gender", "result", "confidence", "date")
+USER_FIELDS = ("id", "name", "email", "role", "created_at")
+
+
+def _result_orm_query(limit):
+    return select(Result, User).join(User, User.id == Result.user_id).order_by(Result.id).limit(limit)
+
+
+def _result_projected_query(limit):
+    columns = [Result.__table__.c[f] for f in RESULT_FIELDS]
+    columns += [User.__table__.c.name.label("user_name"), User.__table__.c.email.label("user_email")]
+    return select(*columns).join_from(Result, User, User.id == Result.user_id).order_by(Result.id).limit(limit)
+
+
+def _map_result_entities(rows):
+    return [
+        {**{f: getattr(res, f) for f in RESULT_FIELDS}, "user": {"id": user.id, "name": user.name, "email": user.email}}
+        for res, user in rows
+    ]
+
+
+def _map_result_rows(rows):
+    return [
+        {**{f: getattr(row, f) for f in RESULT_FIELDS}, "user": {"id": row.user_id, "name": row.user_name, "email": row.user_email}}
+        for row in rows
+    ]
+
+
+def _user_orm_query(limit):
+    return select(User).order_by(User.id).limit(limit)
+
+
+def _user_projected_query(limit):
+    return select(*(User.__table__.c[f] for f in USER_FIELDS)).order_by(User.id).limit(limit)
+
+
+def _map_user_entities(rows):
+    from lib.schemas import UserRead
+
+    return [UserRead.model_validate(u).model_dump() for (u,) in rows]
+
+
+def _map_user_rows(rows):
+    return [dict(row._mapping) for row in rows]
+
+
+async def _measure(query, mapper, repeat: int):
+    samples, count = [], 0
+    for _ in range(repeat):
+        # Fresh session each time: the identity map must not serve the ORM variant from cache
+        async with async_session() as session:
+            started = time.process_time()
+            rows = (await session.execute(query)).all()
+            count = len(mapper(rows))
+            samples.append(time.process_time() - started)
+    per_row = statistics.median(samples) / max(count, 1) * 1e6
+    return count, per_row
+
+
+async def run(rows: int, repeat: int):
+    cases = [
+        ("results ORM entities", _result_orm_query(rows), _map_result_entities),
+        ("results projected", _result_projected_query(rows), _map_result_rows),
+        ("users ORM + model_validate", _user_orm_query(rows), _map_user_entities),
+        ("users projected", _user_projected_query(rows), _map_user_rows),
+    ]
+    print(f"{'variant':28} {'rows':>6} {'CPU us/row':>11}")
+    for name, query, mapper in cases:
+        count, per_row = await _measure(query, mapper, repeat)
+        print(f"{name:28} {count:>6} {per_row:>11.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
@@ -0,0 +1,97 @@
+"""
+Serialization cost of one listing page: stdlib JSON vs declared response
+models rendered with orjson.
+
+    python -m lib.benchmarks.response_serialization [--rows 100] [--repeat 200]
+
+No database: a synthetic page shaped like GET /results/ (and GET /users/)
+is serialized the way FastAPI does it for each setup:
+
+- before: no response_model → jsonable_encoder + JSONResponse (json.dumps)
+- after:  response_model validated and dumped by pydantic-core, rendered by
+          ORJSONResponse (orjson.dumps)
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from lib.schemas import PaginatedResultResponse, PaginatedUserResponse
+
+
+def _result_page(rows: int) -> dict:
+    now = datetime.utcnow()
+    data = [
+        {
+            "id": i,
+            "user_id": 1000 + i,
+            "created_by": 7,
+            "age": 30 + i % 50,
+            "gender": "Female" if i % 2 else "Male",
+            "result": "Healthy" if i % 3 else "Oral Cancer",
+            "confidence": 0.5 + (i % 50) / 100,
+            "images": [f"/media/{'a' * 64}?exp=1700000000&sig={'b' * 43}" for _ in range(3)],
+            "thumbnails": [f"/media/{'a' * 64}?v=thumb&exp=1700000000&sig={'c' * 43}" for _ in range(3)],
+            "previews": [f"/media/{'a' * 64}?v=preview&exp=1700000000&sig={'d' * 43}" for _ in range(3)],
+            "date": now - timedelta(minutes=i),
+            "user": {"id": 1000 + i, "name": f"Patient {i}", "email": f"patient{i}@example.com"},
+        }
+        for i in range(rows)
+    ]
+    return {"page": 1, "limit": rows, "total": rows * 20, "estimated": False, "pages": 20, "count": rows, "data": data}
+
+
+def _user_page(rows: int) -> dict:
+    now = datetime.utcnow()
+    data = [
+        {"id": i, "name": f"User {i}", "email": f"user{i}@example.com", "role": "user",
+         "created_at": now - timedelta(hours=i)}
+        for i in range(rows)
+    ]
+    return {"page": 1, "limit": rows, "total": rows * 20, "estimated": False, "pages": 20, "count": rows, "data": data}
+
+
+def _before(payload: dict) -> bytes:
+    return JSONResponse(content=jsonable_encoder(payload)).body
+
+
+def _after(adapter: TypeAdapter):
+    def render(payload: dict) -> bytes:
+        model = adapter.validate_python(payload)
+        return ORJSONResponse(content=adapter.dump_python(model, mode="json")).body
+    return render
+
+
+def _measure(fn, payload: dict, repeat: int) -> float:
+    fn(payload)  # warm up
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(payload)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def run(rows: int, repeat: int):
+    cases = [
+        ("results", _result_page(rows), TypeAdapter(PaginatedResultResponse)),
+        ("users", _user_page(rows), TypeAdapter(PaginatedUserResponse)),
+    ]
+    print(f"{rows} rows per page, median of {repeat}")
+    for name, payload, adapter in cases:
+        before = _measure(_before, payload, repeat)
+        after = _measure(_after(adapter), payload, repeat)
+        print(f"{name:8} before {before * 1000:8.3f} ms   after {after * 1000:8.3f} ms   "
+              f"({before / after:.1f}x, {len(_before(payload))} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
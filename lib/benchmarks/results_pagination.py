@@ -0,0 +1,66 @@
+"""
+OFFSET vs keyset pagination of the results listing, at increasing depth.
+
+    python -m lib.benchmarks.results_pagination [--limit 20] [--depths 1,100,1000,10000] [--repeat 5]
+
+Runs against SQL_DATABASE_URL with the same query shape as GET /results/
+(results JOIN users ordered by date, id). For each depth the keyset cursor
+is located once (untimed), then both page fetches are timed.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.models.sql import Result, User
+from lib.utils.pagination import keyset_after, keyset_order
+
+DATE = Result.__table__.c.date
+ID = Result.__table__.c.id
+
+
+def _base_query():
+    return select(Result, User).join(User, User.id == Result.user_id)
+
+
+async def _timed(session, query, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        (await session.execute(query)).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+async def run(limit: int, depths, repeat: int):
+    order = keyset_order(DATE, ID, descending=True)
+    print(f"{'page':>8} {'offset ms':>10} {'keyset ms':>10}")
+    async with async_session() as session:
+        for page in depths:
+            offset = (page - 1) * limit
+            offset_query = _base_query().order_by(*order).offset(offset).limit(limit)
+
+            keyset_query = _base_query().order_by(*order).limit(limit)
+            if offset:
+                boundary = (await session.execute(
+                    select(DATE, ID).order_by(*order).offset(offset - 1).limit(1)
+                )).first()
+                if boundary is None:
+                    print(f"{page:>8} {'(past end)':>21}")
+                    continue
+                keyset_query = keyset_query.where(keyset_after(DATE, ID, True, boundary.date, boundary.id))
+
+            print(f"{page:>8} {await _timed(session, offset_query, repeat):>10.2f} "
+                  f"{await _timed(session, keyset_query, repeat):>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--depths", default="1,100,1000,10000", help="comma-separated page numbers")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.limit, [int(d) for d in args.depths.split(",")], args.repeat))
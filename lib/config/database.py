@@ -1,25 +1,58 @@
+from fastapi import Request
 from sqlmodel import SQLModel
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from motor.motor_asyncio import AsyncIOMotorClient
 from lib.config.settings import settings
+from lib.config.pool import MeteredQueuePool, instrument_engine, pool_status
+from lib.config.query_count import count_round_trips
+from lib.config.replicas import PRIMARY_COOKIE, PrimarySession, RecentWriters, ReplicaSet
 from lib.models.sql import *  # Import all SQL models
 
 # =========================
 # SQL (Async MySQL) CONFIG
 # =========================
-async_engine = create_async_engine(
-    settings.SQL_DATABASE_URL, echo=settings.DEBUG
-)
+def _create_engine(url: str):
+    engine = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        poolclass=MeteredQueuePool,
+        pool_size=settings.SQL_POOL_SIZE,
+        max_overflow=settings.SQL_MAX_OVERFLOW,
+        pool_timeout=settings.SQL_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.SQL_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.SQL_POOL_PRE_PING,
+    )
+    instrument_engine(engine.sync_engine, settings.SQL_STATEMENT_TIMEOUT_MS)
+    count_round_trips(engine.sync_engine)
+    return engine
+
+
+async_engine = _create_engine(settings.SQL_DATABASE_URL)
 
 async_session = sessionmaker(
-    async_engine, expire_on_commit=False, class_=AsyncSession
+    async_engine, expire_on_commit=False, class_=PrimarySession
 )
 
+# Read replicas (optional): only endpoints depending on get_read_session use them
+replica_set = ReplicaSet(
+    [_create_engine(url) for url in settings.SQL_REPLICA_URLS],
+    settings.SQL_REPLICA_HEALTH_INTERVAL_SECONDS,
+)
+replica_sessions = {
+    engine: sessionmaker(engine, expire_on_commit=False, class_=AsyncSession)
+    for engine in replica_set.engines
+}
+recent_writers = RecentWriters(settings.SQL_READ_YOUR_WRITES_SECONDS)
+
 async def init_sql_db():
-    """Initialize SQLModel tables"""
+    """Initialize SQLModel tables, then apply pending schema migrations"""
+    from lib.migrations import run_migrations
+
     async with async_engine.begin() as conn:
         await conn.run_sync(SQLModel.metadata.create_all)
+    await run_migrations(async_engine)
     print("✅ SQL database initialized successfully")
 
 async def get_async_session() -> AsyncSession:
@@ -27,6 +60,43 @@ async def get_async_session() -> AsyncSession:
         yield session
 
 
+async def get_read_session(request: Request) -> AsyncSession:
+    """
+    Session for read-only endpoints: a healthy replica, or the primary when
+    there is none or the caller wrote recently (see lib/config/replicas.py).
+    """
+    engine = None
+    pinned = request.cookies.get(PRIMARY_COOKIE) or recent_writers.is_recent(
+        RecentWriters.key(request.headers.get("Authorization"))
+    )
+    if not pinned:
+        engine = replica_set.pick()
+    if engine is None:
+        async with async_session() as session:
+            yield session
+        return
+
+    async with replica_sessions[engine]() as session:
+        try:
+            yield session
+        except DBAPIError as e:
+            # Lost the replica mid-request: route the next requests elsewhere
+            if e.connection_invalidated:
+                replica_set.mark_down(engine)
+            raise
+
+
+def sql_pool_status() -> dict:
+    """Live pool metrics of this worker (see lib/config/pool.py)"""
+    status = {"primary": pool_status(async_engine)}
+    if replica_set.engines:
+        status["replicas"] = [
+            {**replica, "pool": pool_status(engine)}
+            for replica, engine in zip(replica_set.status(), replica_set.engines)
+        ]
+    return status
+
+
 # =========================
 # MONGO DATABASE CONFIG
 # =========================
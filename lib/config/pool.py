@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+# Upper bounds (seconds) of the checkout wait histogram; the last bucket is open-ended
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """
+    Live counters for one engine's connection pool (per worker process).
+
+    - checkouts / wait: time spent acquiring a connection, as a histogram
+    - overflow: checkouts that had to open a connection beyond pool_size
+    - timeouts: checkouts that gave up after pool_timeout (answered as 503)
+    - connects / closes / invalidations: connection churn (recycle, pre-ping
+      failures and overflow connections all show up here)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.overflow = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def record_wait(self, seconds: float, overflowed: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.overflow += overflowed
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            index = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+            self.wait_buckets[index] += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def count(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def snapshot(self, pool) -> Dict:
+        with self._lock:
+            labels = [f"<={bound}s" for bound in WAIT_BUCKETS] + [f">{WAIT_BUCKETS[-1]}s"]
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow_open": max(pool.overflow(), 0),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "overflow_checkouts": self.overflow,
+                "wait_avg_ms": round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+                "wait_histogram": dict(zip(labels, self.wait_buckets)),
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+            }
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that times every checkout into `pool.metrics`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow_before = self._overflow
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_timeout()
+            raise
+        # _overflow counts up from -pool_size, so it is positive only beyond pool_size
+        overflowed = self._overflow > overflow_before and self._overflow > 0
+        self.metrics.record_wait(time.perf_counter() - started, overflowed)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def _statement_timeout_sql(dialect: str, timeout_ms: int) -> Optional[str]:
+    if dialect == "mysql":
+        return f"SET SESSION max_execution_time = {int(timeout_ms)}"
+    if dialect == "postgresql":
+        return f"SET statement_timeout = {int(timeout_ms)}"
+    return None
+
+
+@asynccontextmanager
+async def statement_timeout_lifted(session: AsyncSession, timeout_ms: int):
+    """
+    Run the statements inside (e.g. a streamed export) on the session's
+    connection with no per-statement timeout, then set `timeout_ms` back.
+    A MySQL MAX_EXECUTION_TIME(0) hint would not do: 0 means "no hint", so the
+    session value still applies. A connection whose timeout could not be put
+    back is invalidated rather than returned to the pool without it.
+    """
+    connection = await session.connection()
+    lift = _statement_timeout_sql(connection.dialect.name, 0)
+    if timeout_ms <= 0 or lift is None:
+        yield
+        return
+    await connection.exec_driver_sql(lift)
+    try:
+        yield
+    finally:
+        try:
+            await connection.exec_driver_sql(_statement_timeout_sql(connection.dialect.name, timeout_ms))
+        except BaseException:
+            await connection.invalidate()
+            raise
+
+
+def instrument_engine(engine: Engine, statement_timeout_ms: int = 0):
+    """
+    Count connection churn on a (sync) engine's pool and apply the per-statement
+    timeout to every new connection (MySQL: max_execution_time, SELECTs only;
+    PostgreSQL: statement_timeout).
+    """
+    pool = engine.pool
+    metrics: PoolMetrics = getattr(pool, "metrics", None)
+    dialect = engine.dialect.name
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        if metrics is not None:
+            metrics.count("connects")
+        if statement_timeout_ms > 0:
+            statement = _statement_timeout_sql(dialect, statement_timeout_ms)
+            if statement is None:
+                return
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute(statement)
+            finally:
+                cursor.close()
+
+    if metrics is not None:
+        @event.listens_for(engine, "close")
+        def _on_close(dbapi_connection, connection_record):
+            metrics.count("closes")
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            metrics.count("invalidations")
+
+
+def pool_status(engine) -> Dict:
+    """Pool metrics for an (async or sync) engine; {} when its pool is not metered."""
+    pool = getattr(engine, "sync_engine", engine).pool
+    metrics = getattr(pool, "metrics", None)
+    return metrics.snapshot(pool) if metrics is not None else {}
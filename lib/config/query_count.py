@@ -0,0 +1,56 @@
+"""
+Per-request count of database round-trips (statements plus COMMIT / ROLLBACK).
+
+The logging middleware opens a counter for every request; any engine passed
+to count_round_trips() adds to it. Used for the request log and the
+X-DB-Round-Trips header, and by lib/benchmarks/create_roundtrips.py to keep
+the write path within budget.
+"""
+from contextvars import ContextVar
+from typing import List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class RoundTrips:
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+
+    def add(self, statement: str):
+        self.count += 1
+        if self.statements is not None:
+            self.statements.append(statement)
+
+
+_current: ContextVar[Optional[RoundTrips]] = ContextVar("db_round_trips", default=None)
+
+
+def track_round_trips(keep_statements: bool = False) -> RoundTrips:
+    """Start counting for the current request / task (and the tasks it spawns)."""
+    counter = RoundTrips(keep_statements)
+    _current.set(counter)
+    return counter
+
+
+def _add(statement: str):
+    counter = _current.get()
+    if counter is not None:
+        counter.add(statement)
+
+
+def count_round_trips(engine: Engine):
+    """Attach the counters to a (sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _statement(conn, cursor, statement, parameters, context, executemany):
+        _add(statement)
+
+    @event.listens_for(engine, "commit")
+    def _commit(conn):
+        _add("COMMIT")
+
+    @event.listens_for(engine, "rollback")
+    def _rollback(conn):
+        _add("ROLLBACK")
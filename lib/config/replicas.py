@@ -0,0 +1,179 @@
+"""
+Read-replica routing.
+
+Read-only endpoints take their session from get_read_session (see
+lib/config/database.py), which picks a healthy replica round-robin and falls
+back to the primary when none is healthy, when no replicas are configured,
+or when the caller wrote recently (read-your-writes). Everything else stays
+on the primary.
+
+Read-your-writes: a commit that wrote anything marks the request; the
+ReadYourWritesMiddleware then pins that caller (by bearer token, in this
+worker) and sets a short-lived cookie (seen by every worker) so their reads
+go to the primary for SQL_READ_YOUR_WRITES_SECONDS, longer than the
+expected replication lag.
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("sql.replicas")
+
+PRIMARY_COOKIE = "db_primary"
+HEALTH_CHECK_TIMEOUT = 2.0
+
+
+# =========================================
+# Replica health
+# =========================================
+class ReplicaSet:
+    def __init__(self, engines: List[AsyncEngine], interval: int):
+        self.engines = engines
+        self.interval = interval
+        self._healthy: Dict[int, bool] = {i: True for i in range(len(engines))}
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def pick(self) -> Optional[AsyncEngine]:
+        """Next healthy replica (round-robin), or None to use the primary."""
+        for _ in range(len(self.engines)):
+            index = self._next % len(self.engines)
+            self._next += 1
+            if self._healthy[index]:
+                return self.engines[index]
+        return None
+
+    def mark_down(self, engine: AsyncEngine):
+        """Take a replica out of rotation until the next successful health check."""
+        index = self.engines.index(engine)
+        if self._healthy[index]:
+            logger.warning("Replica %s marked down", engine.url.render_as_string(hide_password=True))
+        self._healthy[index] = False
+
+    async def _probe(self, engine: AsyncEngine) -> bool:
+        try:
+            async with engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=HEALTH_CHECK_TIMEOUT)
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return False
+
+    async def check_once(self):
+        results = await asyncio.gather(*(self._probe(engine) for engine in self.engines))
+        for index, healthy in enumerate(results):
+            if healthy != self._healthy[index]:
+                url = self.engines[index].url.render_as_string(hide_password=True)
+                logger.warning("Replica %s is %s", url, "back up" if healthy else "down")
+            self._healthy[index] = healthy
+
+    def status(self) -> List[Dict]:
+        return [
+            {"url": engine.url.render_as_string(hide_password=True), "healthy": self._healthy[i]}
+            for i, engine in enumerate(self.engines)
+        ]
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def start(self):
+        if self.engines and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="replica-health")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.check_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Replica health check failed")
+            await asyncio.sleep(self.interval)
+
+
+# =========================================
+# Read-your-writes
+# =========================================
+# Per-request marker, set by ReadYourWritesMiddleware and flipped by PrimarySession.commit
+_request_state: ContextVar[Optional[dict]] = ContextVar("sql_request_state", default=None)
+
+
+class RecentWriters:
+    """Callers (keyed by bearer token) that committed a write in this worker recently."""
+
+    def __init__(self, window: int, max_entries: int = 10_000):
+        self.window = window
+        self.max_entries = max_entries
+        self._until: Dict[str, float] = {}
+
+    @staticmethod
+    def key(authorization: Optional[str]) -> Optional[str]:
+        return hashlib.sha256(authorization.encode()).hexdigest() if authorization else None
+
+    def note(self, key: Optional[str]):
+        if not key:
+            return
+        now = time.monotonic()
+        if len(self._until) >= self.max_entries:
+            self._until = {k: t for k, t in self._until.items() if t > now}
+        self._until[key] = now + self.window
+
+    def is_recent(self, key: Optional[str]) -> bool:
+        until = self._until.get(key) if key else None
+        return until is not None and until > time.monotonic()
+
+
+def begin_request_tracking() -> dict:
+    state = {"wrote": False}
+    _request_state.set(state)
+    return state
+
+
+def request_wrote():
+    state = _request_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+
+class TrackedSession(Session):
+    """Sync session that notes (in session.info) whether it wrote anything."""
+
+
+@event.listens_for(TrackedSession, "after_flush")
+def _flushed(session, flush_context):
+    if session.new or session.dirty or session.deleted:
+        session.info["wrote"] = True
+
+
+@event.listens_for(TrackedSession, "do_orm_execute")
+def _executed(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+class PrimarySession(AsyncSession):
+    """AsyncSession on the primary whose writing commits mark the request for read-your-writes."""
+
+    sync_session_class = TrackedSession
+
+    async def commit(self):
+        await super().commit()  # flushes first, so the events above have run
+        if self.sync_session.info.pop("wrote", False):
+            request_wrote()
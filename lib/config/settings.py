@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 import os
+from typing import List, Optional
 from dotenv import load_dotenv
 
 
@@ -23,6 +24,18 @@ class Settings(BaseSettings):
 
 
     SQL_DATABASE_URL: str
+    SQL_ECHO: bool = False  # log every statement (slow; independent of DEBUG)
+    SQL_POOL_SIZE: int = 10  # persistent connections per worker
+    SQL_MAX_OVERFLOW: int = 10  # extra connections opened under burst, closed when returned
+    SQL_POOL_TIMEOUT_SECONDS: float = 3.0  # wait for a free connection before answering 503
+    SQL_POOL_RECYCLE_SECONDS: int = 1800  # replace connections older than this (< server wait_timeout)
+    SQL_POOL_PRE_PING: bool = True  # test connections on checkout, reconnect if stale
+    SQL_STATEMENT_TIMEOUT_MS: int = 30_000  # per statement; 0 disables
+
+    # Read replicas for read-only endpoints (same pool settings as the primary)
+    SQL_REPLICA_URLS: List[str] = []
+    SQL_REPLICA_HEALTH_INTERVAL_SECONDS: int = 10
+    SQL_READ_YOUR_WRITES_SECONDS: int = 10  # reads stay on the primary this long after a write
     MONGO_URI: str
     MONGO_DB_NAME: str
 
@@ -34,6 +47,63 @@ class Settings(BaseSettings):
     SMTP_FROM_EMAIL: str
     SMTP_FROM_NAME: str = "Support Team"
 
+    # Upload limits, checked before anything is stored or decoded
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024  # per file
+    UPLOAD_MAX_PIXELS: int = 50_000_000  # width * height
+    UPLOAD_MAX_FILES: int = 20  # per submission
+    UPLOAD_ALLOWED_FORMATS: List[str] = ["JPEG", "PNG", "WEBP"]
+
+    # Resumable (tus-style) uploads
+    UPLOAD_CHUNK_MAX_BYTES: int = 8 * 1024 * 1024  # per PATCH
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600  # idle sessions expire after this
+
+    # Object storage: "local" (STORAGE_ROOT) or "s3"
+    STORAGE_BACKEND: str = "local"
+    STORAGE_ROOT: str = "uploads"
+    STORAGE_TMP_DIR: str = "uploads/.tmp"  # staging area; same filesystem as STORAGE_ROOT for atomic renames
+    S3_BUCKET: Optional[str] = None
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: Optional[str] = None
+    S3_REGION: Optional[str] = None
+    S3_ACCESS_KEY_ID: Optional[str] = None
+    S3_SECRET_ACCESS_KEY: Optional[str] = None
+    S3_MAX_POOL_CONNECTIONS: int = 32
+    S3_MULTIPART_PART_SIZE: int = 8 * 1024 * 1024
+    S3_UPLOAD_CONCURRENCY: int = 4
+
+    # Background storage collector
+    STORAGE_GC_ENABLED: bool = True
+    STORAGE_GC_INTERVAL_SECONDS: int = 30
+    STORAGE_GC_BATCH_SIZE: int = 500
+    STORAGE_RECONCILE_INTERVAL_SECONDS: int = 3600
+    STORAGE_ORPHAN_GRACE_SECONDS: int = 3600  # never touch files younger than this
+
+    # Idempotency-Key support on create endpoints
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 3600  # how long a completed response is replayed
+    IDEMPOTENCY_LEASE_SECONDS: int = 300  # an in-flight original older than this is presumed dead
+    IDEMPOTENCY_WAIT_SECONDS: int = 60  # how long a concurrent duplicate waits before 409
+
+    # Write-behind coalescing of result inserts: concurrent submissions share one transaction
+    RESULT_WRITE_BATCHING: bool = False
+    RESULT_WRITE_BATCH_WINDOW_MS: int = 5  # how long the first submission waits for company
+    RESULT_WRITE_BATCH_MAX: int = 50  # flush immediately at this many
+
+    # Columnar snapshots for analytics (python -m lib.snapshots): Parquet under SNAPSHOT_DIR
+    SNAPSHOT_DIR: str = "snapshots"
+    SNAPSHOT_BATCH_ROWS: int = 50_000  # rows per keyset page / Parquet row group
+    SNAPSHOT_LAG_SECONDS: int = 60  # rows changed more recently wait for the next run; longer transactions need --full
+    SNAPSHOT_COMPRESSION: str = "zstd"
+
+    # GET /results/stats aggregates: kept in step on every write, recomputed from results this often
+    RESULT_STATS_RECONCILE_INTERVAL_SECONDS: int = 3600
+
+    # Listing totals: cached per role/scope; a write in the same worker drops them once this many seconds old
+    COUNT_CACHE_TTL_SECONDS: int = 30
+    COUNT_CACHE_WRITE_GRACE_SECONDS: float = 2.0
+
+    # Signed media URLs (links stay stable within one TTL window, valid for up to 2x TTL)
+    MEDIA_URL_TTL_SECONDS: int = 900
+
     class Config:
         env_file = None  
 
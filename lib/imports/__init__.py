@@ -0,0 +1,6 @@
+"""
+Bulk import of past screenings (python -m lib.imports, see lib/imports/archive.py).
+
+Kept free of imports: process-pool workers load lib.imports.hashing and
+must not pull in TensorFlow through lib.utils.
+"""
@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+
+if __name__ == "__main__":
+    # Imported here so the password-hashing workers (spawned, re-running this module) stay light
+    from lib.imports.archive import __doc__ as DOC, import_archive, write_report
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=DOC, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive", help="zip of images (with manifest.csv unless --manifest is given)")
+    parser.add_argument("--created-by", required=True, help="email of the counselor / admin the results belong to")
+    parser.add_argument("--manifest", help="manifest CSV outside the archive")
+    parser.add_argument("--report", help="per-row report CSV (default: <archive>.report.csv)")
+    parser.add_argument("--batch-size", type=int, default=32, help="images per model call")
+    parser.add_argument("--chunk-size", type=int, default=100, help="manifest rows per transaction")
+    parser.add_argument("--no-email", action="store_true", help="do not email new patients their account")
+    args = parser.parse_args()
+
+    lines, stats = asyncio.run(import_archive(
+        args.archive, args.created_by, manifest=args.manifest, batch_size=args.batch_size,
+        chunk_size=args.chunk_size, notify=not args.no_email,
+    ))
+    report = args.report or str(Path(args.archive).with_suffix(".report.csv"))
+    write_report(lines, report)
+    for key, value in stats.items():
+        print(f"{key:18} {value}")
+    print(f"Report: {report}")
@@ -0,0 +1,308 @@
+"""
+Bulk import of past screenings from a zip archive.
+
+    python -m lib.imports clinic.zip --created-by counselor@clinic.org [--report report.csv] [--no-email]
+
+The zip holds the images and a manifest.csv (or pass --manifest) with one
+row per screening; `images` lists paths inside the zip separated by ";":
+
+    email,name,age,gender,images
+    jane@example.com,Jane Doe,54,Female,jane/1.jpg;jane/2.jpg
+
+Instead of replaying POST /results/ once per row, the import
+- looks up every patient with one query per LOOKUP_CHUNK emails and hashes
+  the temporary passwords of the missing ones in a process pool
+- validates and stores the images of --chunk-size rows, then scores them in
+  model batches of --batch-size (a failing batch fails only its rows)
+- writes those rows' results, and the patients they are the first imported
+  row of, in one transaction with write_results (a failing chunk is retried
+  row by row)
+- sends the patients actually created their account emails at the end,
+  EMAIL_CONCURRENCY at a time
+and reports every manifest row as imported (with its result) or failed
+(with the reason).
+"""
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import random
+import string
+import time
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import select
+
+import lib.search  # noqa: F401 — trigram events for the patients created here
+from lib.config.database import async_session
+from lib.models.sql import User, UserRole
+from lib.storage import blob_store, validate_uploads
+from lib.utils import NewResult, final_verdict, predict_batch, preprocess_image, send_account_email, write_results
+from .hashing import hash_passwords
+
+logger = logging.getLogger("imports")
+
+MANIFEST_NAME = "manifest.csv"
+REPORT_FIELDS = ("line", "email", "status", "patient", "result_id", "result", "confidence", "images", "error")
+LOOKUP_CHUNK = 1000
+HASH_CHUNK = 25  # passwords per process-pool task
+EMAIL_CONCURRENCY = 4
+
+
+class ImportRow(NamedTuple):
+    line: int  # in the manifest, header = 1
+    email: str
+    name: str
+    age: Optional[int]
+    gender: Optional[str]
+    images: List[str]  # paths inside the archive
+
+
+def _error(e: Exception) -> str:
+    return str(getattr(e, "detail", None) or e) or type(e).__name__
+
+
+def parse_manifest(text: str, names: set, report: Dict[int, dict]) -> List[ImportRow]:
+    """Valid rows of the manifest; invalid ones only get their report entry."""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = {"email", "images"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Manifest is missing column(s): {', '.join(sorted(missing))}")
+
+    rows = []
+    for line, record in enumerate(reader, start=2):
+        email = (record.get("email") or "").strip()
+        images = [path.strip() for path in (record.get("images") or "").split(";") if path.strip()]
+        age = (record.get("age") or "").strip()
+        entry = report[line] = {"line": line, "email": email, "status": "failed", "images": len(images)}
+        absent = [path for path in images if path not in names]
+        if "@" not in email:
+            entry["error"] = "invalid email"
+        elif not images:
+            entry["error"] = "no images"
+        elif absent:
+            entry["error"] = "not in archive: " + ", ".join(absent)
+        elif age and not age.isdigit():
+            entry["error"] = f"invalid age {age!r}"
+        else:
+            rows.append(ImportRow(
+                line, email, (record.get("name") or "").strip() or "Unknown User",
+                int(age) if age else None, (record.get("gender") or "").strip() or None, images,
+            ))
+    return rows
+
+
+async def prepare_patients(
+    rows: List[ImportRow], pool: ProcessPoolExecutor,
+) -> Tuple[set, Dict[str, Tuple[str, str]]]:
+    """
+    Emails (lowercased) of the rows' existing patients, and a (temporary
+    password, hash) for each missing one. The patients themselves are created
+    by write_results in the transaction of their first imported row, so a
+    patient none of whose rows imports is never created nor emailed.
+    """
+    emails = sorted({row.email for row in rows})
+    existing = set()
+    async with async_session() as session:
+        for start in range(0, len(emails), LOOKUP_CHUNK):
+            # Patient accounts only, deleted ones included: their rows fail in write_results, they are not recreated
+            found = await session.execute(select(User.email).where(
+                User.email.in_(emails[start:start + LOOKUP_CHUNK]), User.role == UserRole.user,
+            ))
+            existing.update(email.lower() for email in found.scalars())
+
+    missing = sorted({row.email.lower() for row in rows} - existing)
+    if not missing:
+        return existing, {}
+    passwords = ["".join(random.choices(string.ascii_letters + string.digits, k=10)) for _ in missing]
+    # bcrypt is the slow part: spread it over the pool's processes
+    loop = asyncio.get_running_loop()
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, hash_passwords, passwords[start:start + HASH_CHUNK])
+        for start in range(0, len(passwords), HASH_CHUNK)
+    ))
+    hashes = [hashed for part in parts for hashed in part]
+    return existing, dict(zip(missing, zip(passwords, hashes)))
+
+
+async def store_and_score(
+    archive: zipfile.ZipFile, rows: List[ImportRow], batch_size: int, report: Dict[int, dict],
+) -> Dict[int, List[Tuple[str, int, str, float, float]]]:
+    """
+    Validate and store the rows' images, then score all of them in model
+    batches → line → (blob_id, size, label, confidence %, raw confidence) per image.
+    """
+    stored = {}
+    for row in rows:
+        sources = [(path, io.BytesIO(archive.read(path))) for path in row.images]
+        try:
+            await validate_uploads(sources)
+            blobs = []
+            for _, fileobj in sources:
+                fileobj.seek(0)
+                blobs.append(await blob_store.put(fileobj))
+        except Exception as e:
+            report[row.line]["error"] = _error(e)
+            continue
+        stored[row.line] = blobs
+
+    flat = [(line, blob) for line, blobs in stored.items() for blob in blobs]
+    scored = defaultdict(list)
+    failed = set()
+    for start in range(0, len(flat), batch_size):
+        part = flat[start:start + batch_size]
+        inputs = [blob.model_input for _, blob in part]
+        try:
+            batch = await run_in_threadpool(
+                lambda: np.concatenate([preprocess_image(io.BytesIO(data)) for data in inputs])
+            )
+            predictions = await run_in_threadpool(predict_batch, batch)
+        except Exception as e:
+            # Only the rows with an image in this batch fail, like a failing row in write_chunk
+            logger.warning("Scoring batch of %d images failed: %s", len(part), e)
+            for line, _ in part:
+                report[line]["error"] = _error(e)
+                failed.add(line)
+            continue
+        for (line, blob), (label, conf) in zip(part, predictions):
+            scored[line].append((blob.blob_id, blob.size, label, round(conf * 100, 2), conf))
+    return {line: images for line, images in scored.items() if line not in failed}
+
+
+async def write_chunk(
+    entries: List[Tuple[ImportRow, NewResult]], report: Dict[int, dict], created: Dict[str, Tuple[str, str, str]],
+):
+    """
+    Write a chunk of results in one transaction; if it fails, row by row.
+    Adds the patients it created to `created` as {email: (name, email, temporary password)}.
+    """
+    try:
+        async with async_session() as session:
+            persisted = await write_results(session, [item for _, item in entries])
+            await session.commit()
+    except Exception as e:
+        if len(entries) == 1:
+            report[entries[0][0].line]["error"] = _error(e)
+            return
+        logger.warning("Chunk of %d rows failed (%s); retrying row by row", len(entries), e)
+        for entry in entries:
+            await write_chunk([entry], report, created)
+        return
+    for (row, item), written in zip(entries, persisted):
+        report[row.line].update(
+            status="imported", result_id=written.result.id, result=item.final_result, confidence=item.confidence,
+        )
+        if written.password is not None:
+            created[row.email.lower()] = (item.name, item.email, written.password)
+
+
+async def _send_account_emails(created: Dict[str, Tuple[str, str, str]]) -> int:
+    semaphore = asyncio.Semaphore(EMAIL_CONCURRENCY)
+
+    async def send(name: str, email: str, password: str) -> bool:
+        async with semaphore:
+            try:
+                await send_account_email(name, email, password)
+                return True
+            except Exception as e:
+                logger.warning("Account email to %s failed: %s", email, e)
+                return False
+
+    return sum(await asyncio.gather(*(send(*account) for account in created.values())))
+
+
+async def import_archive(
+    path: str,
+    created_by: str,
+    manifest: Optional[str] = None,
+    batch_size: int = 32,
+    chunk_size: int = 100,
+    notify: bool = True,
+) -> Tuple[List[dict], dict]:
+    """Import an archive as `created_by` (a counselor's or admin's email) → (report rows, timings)."""
+    async with async_session() as session:
+        creator = (await session.execute(
+            select(User).where(User.email == created_by, User.role.in_(["admin", "counselor"]))
+        )).scalars().first()
+    if creator is None:
+        raise ValueError(f"No counselor or admin with email {created_by!r}")
+
+    stats = {"rows": 0, "imported": 0, "failed": 0, "patients_created": 0, "images": 0, "emails_sent": 0}
+    timings = {}
+    report: Dict[int, dict] = {}
+    with zipfile.ZipFile(path) as archive:
+        names = set(archive.namelist())
+        if manifest:
+            with open(manifest, encoding="utf-8-sig") as fh:
+                text = fh.read()
+        elif MANIFEST_NAME in names:
+            text = archive.read(MANIFEST_NAME).decode("utf-8-sig")
+        else:
+            raise ValueError(f"No {MANIFEST_NAME} in the archive; pass --manifest")
+        rows = parse_manifest(text, names, report)
+
+        started = time.perf_counter()
+        # spawn, not fork: this process runs TensorFlow threads; workers only import lib.imports.hashing
+        with ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn")) as pool:
+            existing, credentials = await prepare_patients(rows, pool)
+        timings["patients"] = time.perf_counter() - started
+
+        created: Dict[str, Tuple[str, str, str]] = {}
+        timings["score"] = timings["write"] = 0.0
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            started = time.perf_counter()
+            scored = await store_and_score(archive, chunk, batch_size, report)
+            timings["score"] += time.perf_counter() - started
+            stats["images"] += sum(len(images) for images in scored.values())
+
+            entries = []
+            for row in chunk:
+                images = scored.get(row.line)
+                if not images:
+                    continue
+                final_result, confidence = final_verdict([i[2] for i in images], [i[4] for i in images])
+                entries.append((row, NewResult(
+                    created_by=creator.id, email=row.email, name=row.name, age=row.age, gender=row.gender,
+                    final_result=final_result, confidence=confidence, scored=[i[:4] for i in images],
+                    credentials=credentials.get(row.email.lower()),
+                )))
+            started = time.perf_counter()
+            if entries:
+                await write_chunk(entries, report, created)
+            timings["write"] += time.perf_counter() - started
+            logger.info("Imported rows %d-%d of %d", start + 1, start + len(chunk), len(rows))
+
+    stats["patients_created"] = len(created)
+    for row in rows:
+        key = row.email.lower()
+        if key in existing or key in created:
+            report[row.line]["patient"] = "existing" if key in existing else "created"
+
+    if notify and created:
+        started = time.perf_counter()
+        stats["emails_sent"] = await _send_account_emails(created)
+        timings["email"] = time.perf_counter() - started
+
+    lines = [report[line] for line in sorted(report)]
+    stats["rows"] = len(lines)
+    stats["imported"] = sum(entry["status"] == "imported" for entry in lines)
+    stats["failed"] = stats["rows"] - stats["imported"]
+    stats.update({f"{phase}_seconds": round(seconds, 3) for phase, seconds in timings.items()})
+    if timings.get("score"):
+        stats["images_per_second"] = round(stats["images"] / timings["score"], 1)
+    return lines, stats
+
+
+def write_report(lines: List[dict], path: str):
+    with open(path, "w", newline="", encoding="utf-8") as fh:
+        writer = csv.DictWriter(fh, fieldnames=REPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(lines)
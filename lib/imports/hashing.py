@@ -0,0 +1,11 @@
+"""bcrypt hashing for process-pool workers (imports passlib only)."""
+from typing import List
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Same hashes as lib.utils.hash_password, for generated (short, non-empty) passwords."""
+    return [pwd_context.hash(password) for password in passwords]
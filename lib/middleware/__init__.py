@@ -3,6 +3,10 @@
 # Custom middleware
 from .logger import LoggingMiddleware
 from .exception import ExceptionMiddleware
+from .compression import SelectiveGZipMiddleware
+from .body_limit import BodySizeLimitMiddleware
+from .read_your_writes import ReadYourWritesMiddleware
+from lib.config.settings import settings
 
 # Third-party / built-in middleware
 from fastapi.middleware.cors import CORSMiddleware
@@ -24,10 +28,18 @@ def register_middleware(app):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # Resumable upload / idempotent create clients read these from responses
+        expose_headers=[
+            "Location", "Upload-Offset", "Upload-Length", "Upload-Expires", "Tus-Resumable",
+            "Idempotent-Replayed",
+        ],
     )
 
-    # 3. GZip for response compression
-    app.add_middleware(GZipMiddleware, minimum_size=500)
+    # 3. GZip for response compression (images are served as-is; exports compress themselves with ?gzip=true)
+    app.add_middleware(
+        SelectiveGZipMiddleware, minimum_size=500,
+        exclude_prefixes=["/api/v1/media/", "/api/v1/result/results/export"],
+    )
     
 
     # 4. Session Middleware (if needed)
@@ -36,7 +48,11 @@ def register_middleware(app):
     # 5. Custom Logging Middleware
     app.add_middleware(LoggingMiddleware)
 
-    # 6. JWT / Auth Middleware
+    # 6. Pin callers that just wrote to the primary (read-replica routing)
+    if settings.SQL_REPLICA_URLS:
+        app.add_middleware(ReadYourWritesMiddleware, window=settings.SQL_READ_YOUR_WRITES_SECONDS)
+
+    # 7. JWT / Auth Middleware
     # app.add_middleware(AuthMiddleware)
 
 
@@ -45,3 +61,9 @@ def register_middleware_at_last(app):
     Register middleware that should run last (e.g., exception handling)
     """
     app.add_middleware(ExceptionMiddleware)
+
+    # Outermost: refuse oversized bodies before anything reads them
+    app.add_middleware(
+        BodySizeLimitMiddleware,
+        max_bytes=settings.UPLOAD_MAX_BYTES * settings.UPLOAD_MAX_FILES + 1024 * 1024,
+    )
@@ -0,0 +1,21 @@
+# compression_middleware.py
+from typing import Iterable
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """
+    GZip everything except paths that serve already-compressed bytes
+    (images). Gzipping those wastes CPU and breaks byte-range responses.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 500, exclude_prefixes: Iterable[str] = ()):
+        super().__init__(app, minimum_size=minimum_size)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
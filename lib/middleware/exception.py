@@ -2,13 +2,13 @@
 import traceback
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from ..utils import AppException
 
 # FastAPI / Starlette imports
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
-from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError, TimeoutError as PoolTimeoutError
 
 # Pydantic imports
 from pydantic import ValidationError
@@ -21,7 +21,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
 
         # Custom application exception
         except AppException as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=e.status_code,
                 content={
                     "success": False,
@@ -33,7 +33,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
 
         # FastAPI validation errors (request body / query / path)
         except RequestValidationError as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=422,
                 content={
                     "success": False,
@@ -45,7 +45,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
 
         # Pydantic model validation errors (internal / model parsing)
         except ValidationError as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=422,
                 content={
                     "success": False,
@@ -57,7 +57,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
 
         # HTTP exceptions (404, 403, 401 etc.)
         except StarletteHTTPException as e:
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=e.status_code,
                 content={
                     "success": False,
@@ -67,9 +67,20 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
             )
 
         # SQLAlchemy / SQLModel errors
+        except PoolTimeoutError:
+            # No free connection within SQL_POOL_TIMEOUT_SECONDS: fail fast instead of queueing
+            return ORJSONResponse(
+                status_code=503,
+                headers={"Retry-After": "1"},
+                content={
+                    "success": False,
+                    "type": "DatabaseBusy",
+                    "message": "Database connection pool exhausted, retry shortly",
+                }
+            )
         except IntegrityError as e:
             traceback.print_exc()
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=400,
                 content={
                     "success": False,
@@ -80,7 +91,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
             )
         except SQLAlchemyError as e:
             traceback.print_exc()
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={
                     "success": False,
@@ -93,7 +104,7 @@ class ExceptionMiddleware(BaseHTTPMiddleware):
         # Catch-all for unexpected exceptions
         except Exception as e:
             traceback.print_exc()
-            return JSONResponse(
+            return ORJSONResponse(
                 status_code=500,
                 content={
                     "success": False,
@@ -5,6 +5,8 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import Response
 
+from lib.config.query_count import track_round_trips
+
 # Configure basic logging
 logging.basicConfig(
     level=logging.INFO,
@@ -14,6 +16,7 @@ logging.basicConfig(
 class LoggingMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         start_time = time.time()
+        round_trips = track_round_trips()
         
         # Log request details
         logging.info(f"Incoming request: {request.method} {request.url}")
@@ -26,8 +29,10 @@ class LoggingMiddleware(BaseHTTPMiddleware):
         
         process_time = time.time() - start_time
         logging.info(f"Completed request: {request.method} {request.url} "
-                     f"Status: {response.status_code} Time: {process_time:.4f}s")
+                     f"Status: {response.status_code} Time: {process_time:.4f}s "
+                     f"DB round-trips: {round_trips.count}")
         
         # Optional: Add process time to response headers
         response.headers["X-Process-Time"] = str(process_time)
+        response.headers["X-DB-Round-Trips"] = str(round_trips.count)
         return response
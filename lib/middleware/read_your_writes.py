@@ -0,0 +1,37 @@
+# read_your_writes_middleware.py
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from lib.config.database import recent_writers
+from lib.config.replicas import PRIMARY_COOKIE, RecentWriters, begin_request_tracking
+
+
+class ReadYourWritesMiddleware:
+    """
+    After a request that committed a write, keep the caller's reads on the
+    primary for `window` seconds: their token is pinned in this worker and a
+    short-lived cookie carries the pin to the other workers.
+    """
+
+    def __init__(self, app: ASGIApp, window: int):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = begin_request_tracking()
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start" and state["wrote"]:
+                headers = MutableHeaders(scope=message)
+                recent_writers.note(RecentWriters.key(dict(scope["headers"]).get(b"authorization", b"").decode() or None))
+                headers.append(
+                    "Set-Cookie",
+                    f"{PRIMARY_COOKIE}=1; Max-Age={self.window}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,100 @@
+"""
+Minimal schema migrations for changes `SQLModel.metadata.create_all` cannot
+make to existing tables (indexes, new columns, backfills).
+
+Each module in lib/migrations/versions defines VERSION, DESCRIPTION and a
+synchronous `upgrade(connection)`. Applied versions are recorded in
+schema_migrations; startup applies the pending ones in order under a
+database-level lock so concurrent workers do not race.
+
+    python -m lib.migrations            # apply pending migrations
+    python -m lib.migrations status     # list applied / pending
+"""
+import importlib
+import logging
+import pkgutil
+from types import ModuleType
+from typing import List
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from lib.models.sql import SchemaMigration
+
+logger = logging.getLogger("migrations")
+
+LOCK_NAME = "schema_migrations"
+LOCK_KEY = 730_731  # pg_advisory_lock id
+LOCK_TIMEOUT_SECONDS = 300
+
+
+def load_migrations() -> List[ModuleType]:
+    from lib.migrations import versions
+
+    modules = [
+        importlib.import_module(f"{versions.__name__}.{info.name}")
+        for info in pkgutil.iter_modules(versions.__path__)
+    ]
+    modules.sort(key=lambda m: m.VERSION)
+    seen = set()
+    for module in modules:
+        if module.VERSION in seen:
+            raise RuntimeError(f"Duplicate migration version {module.VERSION}")
+        seen.add(module.VERSION)
+    return modules
+
+
+def _lock(connection: Connection):
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        acquired = connection.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"), {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+        ).scalar()
+        if acquired != 1:
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+    elif dialect == "postgresql":
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": LOCK_KEY})
+
+
+def _unlock(connection: Connection):
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        connection.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+    elif dialect == "postgresql":
+        connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOCK_KEY})
+
+
+def applied_versions(connection: Connection) -> set:
+    SchemaMigration.__table__.create(connection, checkfirst=True)
+    return set(connection.execute(SchemaMigration.__table__.select().with_only_columns(
+        SchemaMigration.__table__.c.version
+    )).scalars())
+
+
+def _upgrade(connection: Connection) -> List[int]:
+    _lock(connection)
+    try:
+        done = applied_versions(connection)
+        connection.commit()
+        applied = []
+        for module in load_migrations():
+            if module.VERSION in done:
+                continue
+            logger.info("Applying migration %04d: %s", module.VERSION, module.DESCRIPTION)
+            module.upgrade(connection)
+            connection.execute(SchemaMigration.__table__.insert().values(
+                version=module.VERSION, description=module.DESCRIPTION[:255]
+            ))
+            connection.commit()
+            applied.append(module.VERSION)
+        return applied
+    finally:
+        _unlock(connection)
+        connection.commit()
+
+
+async def run_migrations(engine: AsyncEngine) -> List[int]:
+    """Apply pending migrations; returns the versions applied."""
+    async with engine.connect() as conn:
+        return await conn.run_sync(_upgrade)
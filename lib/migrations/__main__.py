@@ -0,0 +1,27 @@
+import asyncio
+import logging
+import sys
+
+from lib.config.database import async_engine
+from lib.migrations import applied_versions, load_migrations, run_migrations
+
+
+async def _status():
+    async with async_engine.connect() as conn:
+        done = await conn.run_sync(applied_versions)
+    for module in load_migrations():
+        state = "applied" if module.VERSION in done else "pending"
+        print(f"{module.VERSION:04d}  {state:8}  {module.DESCRIPTION}")
+
+
+async def _upgrade():
+    applied = await run_migrations(async_engine)
+    print(f"Applied {len(applied)} migration(s): {applied}" if applied else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command not in ("upgrade", "status"):
+        sys.exit("usage: python -m lib.migrations [upgrade|status]")
+    asyncio.run(_status() if command == "status" else _upgrade())
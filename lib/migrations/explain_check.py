@@ -0,0 +1,133 @@
+"""
+Query-plan regression check for the hot read paths.
+
+    python -m lib.migrations.explain_check [--verbose]
+
+Runs EXPLAIN (MySQL or PostgreSQL) for the result listings of each role and
+their totals (built by the route's own scoped_results_query), keyset pages,
+scoped search, the batched image fetch, the profile listing and the auth lookups, and exits non-zero when
+any of them reads a guarded table with a full scan. Run it in CI against a
+database seeded with representative data: on near-empty tables the planner
+may legitimately prefer a scan.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.models.sql import Profile, Result, ResultImage, User
+from lib.routes.profile import profile_list_query
+from lib.routes.result import scoped_results_query
+from lib.search import matching_user_ids, order_by_relevance
+from lib.utils.counts import total_query
+from lib.utils.pagination import keyset_after, keyset_order
+
+DATE = Result.__table__.c.date
+ID = Result.__table__.c.id
+PAGE = 10
+
+
+class PlanCheck(NamedTuple):
+    name: str
+    statement: object
+    guarded: Tuple[str, ...]  # tables that must not be full-scanned
+
+
+async def plan_checks(session, user_id: int = 1, email: str = "admin@oralcancer.ai") -> List[PlanCheck]:
+    order = keyset_order(DATE, ID, descending=True)
+
+    async def listing(role: str, search: Optional[str] = None):
+        # The statement GET /results/ builds for this role, before ordering and paging
+        query, _ = await scoped_results_query(session, User(id=user_id, role=role), search, None)
+        return query
+
+    def page(query):
+        return query.order_by(*order).offset(0).limit(PAGE)
+
+    admin, counselor, patient = await listing("admin"), await listing("counselor"), await listing("user")
+    return [
+        PlanCheck("results.list.admin", page(admin), ("results",)),
+        PlanCheck("results.list.counselor", page(counselor), ("results", "users")),
+        PlanCheck("results.list.user", page(patient), ("results", "users")),
+        PlanCheck("results.total.counselor", total_query(counselor, Result.id), ("results", "users")),
+        PlanCheck("results.total.user", total_query(patient, Result.id), ("results", "users")),
+        PlanCheck("results.keyset.user",
+                  patient.where(keyset_after(DATE, ID, True, datetime.utcnow(), 2**31)).order_by(*order).limit(PAGE),
+                  ("results", "users")),
+        PlanCheck("results.search.counselor", page(await listing("counselor", "example")), ("results", "users")),
+        PlanCheck("results.search.admin", page(await listing("admin", "example")), ("users", "user_search_trigrams")),
+        PlanCheck("users.search",
+                  order_by_relevance(select(User).where(User.id.in_(matching_user_ids("example"))), "example")
+                  .limit(PAGE), ("users", "user_search_trigrams")),
+        PlanCheck("results.detail", select(Result).where(Result.id == 1), ("results",)),
+        PlanCheck("result_images.page",
+                  select(ResultImage).where(ResultImage.result_id.in_(list(range(1, PAGE + 1))))
+                  .order_by(ResultImage.result_id, ResultImage.position), ("result_images",)),
+        PlanCheck("result_images.by_hash",
+                  select(ResultImage.result_id).where(ResultImage.content_hash == "0" * 64), ("result_images",)),
+        PlanCheck("profiles.page",
+                  profile_list_query(True, None, None).where(Profile.id > 0).order_by(Profile.id).limit(PAGE),
+                  ("profiles", "users")),
+        PlanCheck("profiles.by_user", select(Profile).where(Profile.user_id == user_id), ("profiles",)),
+        PlanCheck("users.auth.email", select(User).where(User.email == email), ("users",)),
+        PlanCheck("users.auth.id", select(User).where(User.id == user_id), ("users",)),
+    ]
+
+
+def _walk(node) -> Iterable[dict]:
+    if isinstance(node, dict):
+        yield node
+        for value in node.values():
+            yield from _walk(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _walk(value)
+
+
+def _full_scans(connection, statement) -> Tuple[List[str], str]:
+    """Tables read with a full scan, plus the raw plan for reporting."""
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    dialect = connection.dialect.name
+
+    if dialect == "mysql":
+        raw = connection.exec_driver_sql("EXPLAIN FORMAT=JSON " + str(compiled), params).scalar()
+        plan = json.loads(raw)
+        scans = [n["table_name"] for n in _walk(plan) if n.get("access_type") == "ALL" and "table_name" in n]
+    elif dialect == "postgresql":
+        raw = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), params).scalar()
+        plan = raw if isinstance(raw, list) else json.loads(raw)
+        scans = [n["Relation Name"] for n in _walk(plan) if n.get("Node Type") == "Seq Scan"]
+    else:
+        raise RuntimeError(f"EXPLAIN check supports mysql and postgresql, not {dialect}")
+    return scans, json.dumps(plan, indent=2)
+
+
+async def run(verbose: bool = False) -> int:
+    failures = 0
+    async with async_session() as session:
+        checks = await plan_checks(session)
+        conn = await session.connection()
+        for check in checks:
+            scans, plan = await conn.run_sync(_full_scans, check.statement)
+            regressed = sorted(set(scans) & set(check.guarded))
+            failures += bool(regressed)
+            status = f"FAIL full scan of {', '.join(regressed)}" if regressed else "ok"
+            print(f"{check.name:28} {status}")
+            if verbose or regressed:
+                print(plan)
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true", help="print every plan, not only regressions")
+    args = parser.parse_args()
+    sys.exit(1 if asyncio.run(run(args.verbose)) else 0)
@@ -0,0 +1,43 @@
+from typing import Sequence
+
+from sqlalchemy import Column, Index, MetaData, Table, inspect
+from sqlalchemy.engine import Connection
+
+
+def index_exists(connection: Connection, table: str, name: str) -> bool:
+    return any(ix["name"] == name for ix in inspect(connection).get_indexes(table))
+
+
+def create_index(connection: Connection, table: str, name: str, columns: Sequence[str], unique: bool = False):
+    """CREATE INDEX unless it exists (e.g. created by create_all on a fresh database)."""
+    if index_exists(connection, table, name):
+        return
+    reflected = Table(table, MetaData(), autoload_with=connection)
+    Index(name, *(reflected.c[c] for c in columns), unique=unique).create(connection)
+
+
+def drop_index(connection: Connection, table: str, name: str):
+    if not index_exists(connection, table, name):
+        return
+    reflected = Table(table, MetaData(), autoload_with=connection)
+    next(ix for ix in reflected.indexes if ix.name == name).drop(connection)
+
+
+def column_exists(connection: Connection, table: str, column: str) -> bool:
+    return any(c["name"] == column for c in inspect(connection).get_columns(table))
+
+
+def drop_column(connection: Connection, table: str, column: str):
+    if not column_exists(connection, table, column):
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    connection.exec_driver_sql(f"ALTER TABLE {quote(table)} DROP COLUMN {quote(column)}")
+
+
+def add_column(connection: Connection, table: str, column: Column):
+    """ALTER TABLE ... ADD COLUMN (always nullable, so existing rows need no default) unless it exists."""
+    if column_exists(connection, table, column.name):
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.exec_driver_sql(f"ALTER TABLE {quote(table)} ADD COLUMN {quote(column.name)} {column_type} NULL")
@@ -0,0 +1,11 @@
+from lib.migrations.ops import create_index
+
+VERSION = 1
+DESCRIPTION = "Composite indexes for role-scoped result listings ordered by (date, id)"
+
+
+def upgrade(connection):
+    # admin: ORDER BY date, id; counselor: WHERE created_by; user: WHERE user_id
+    create_index(connection, "results", "ix_results_date_id", ["date", "id"])
+    create_index(connection, "results", "ix_results_created_by_date_id", ["created_by", "date", "id"])
+    create_index(connection, "results", "ix_results_user_id_date_id", ["user_id", "date", "id"])
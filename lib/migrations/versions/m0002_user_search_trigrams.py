@@ -0,0 +1,26 @@
+from sqlalchemy import select
+
+from lib.migrations.ops import create_index
+from lib.models.sql import User, UserSearchTrigram
+from lib.search import write_user_trigrams
+
+VERSION = 2
+DESCRIPTION = "Trigram search index for users, backfilled; index on results.gender"
+
+BATCH = 1000
+
+
+def upgrade(connection):
+    UserSearchTrigram.__table__.create(connection, checkfirst=True)
+    create_index(connection, "results", "ix_results_gender", ["gender"])
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(User.id, User.name, User.email).where(User.id > last_id).order_by(User.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        write_user_trigrams(connection, rows)
+        connection.commit()
+        last_id = rows[-1].id
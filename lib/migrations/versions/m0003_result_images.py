@@ -0,0 +1,49 @@
+import json
+
+from sqlalchemy import MetaData, Table, delete, select
+
+from lib.migrations.ops import column_exists, drop_column
+from lib.models.sql import ResultImage
+from lib.storage.blob_store import blob_content_hash
+
+VERSION = 3
+DESCRIPTION = "Move results.images (JSON) into result_images rows"
+
+BATCH = 500
+
+
+def upgrade(connection):
+    ResultImage.__table__.create(connection, checkfirst=True)
+    if not column_exists(connection, "results", "images"):
+        return
+
+    results = Table("results", MetaData(), autoload_with=connection)
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select(results.c.id, results.c.images).where(results.c.id > last_id)
+            .order_by(results.c.id).limit(BATCH)
+        ).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        # Re-runnable: a batch committed by an interrupted run is rewritten, not duplicated
+        connection.execute(delete(ResultImage.__table__).where(ResultImage.__table__.c.result_id.in_(ids)))
+        values = []
+        for result_id, images in rows:
+            if isinstance(images, str):
+                images = json.loads(images)
+            for position, image in enumerate(images or []):
+                values.append({
+                    "result_id": result_id,
+                    "position": position,
+                    "image": image,
+                    "content_hash": blob_content_hash(image),
+                })
+        if values:
+            connection.execute(ResultImage.__table__.insert(), values)
+        connection.commit()
+        last_id = ids[-1]
+
+    drop_column(connection, "results", "images")
+    connection.commit()
@@ -0,0 +1,25 @@
+from sqlalchemy import select
+
+from lib.models.sql import ResultStat
+from lib.stats import grouped_results_query, row_key
+
+VERSION = 4
+DESCRIPTION = "Aggregate table result_stats for GET /results/stats, built from results"
+
+BATCH = 1000
+
+
+def upgrade(connection):
+    table = ResultStat.__table__
+    table.create(connection, checkfirst=True)
+    if connection.execute(select(table.c.day).limit(1)).first() is not None:
+        return  # already built (create_all + events on a fresh database)
+
+    rows = [
+        dict(zip(("day", "created_by", "result", "gender", "age_bucket"), row_key(row)),
+             count=int(row.count), confidence_sum=float(row.confidence_sum))
+        for row in connection.execute(grouped_results_query())
+    ]
+    for start in range(0, len(rows), BATCH):
+        connection.execute(table.insert(), rows[start:start + BATCH])
+        connection.commit()
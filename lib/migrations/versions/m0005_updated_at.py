@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, MetaData, Table, func, select, update
+
+from lib.migrations.ops import add_column, create_index
+
+VERSION = 5
+DESCRIPTION = "updated_at on results and users (snapshot watermarks), backfilled from date / created_at"
+
+BATCH = 5000
+
+
+def _backfill(connection, name: str, source: str):
+    table = Table(name, MetaData(), autoload_with=connection)
+    max_id = connection.execute(select(func.max(table.c.id))).scalar() or 0
+    for start in range(0, max_id, BATCH):
+        connection.execute(
+            update(table)
+            .where(table.c.id > start, table.c.id <= start + BATCH, table.c.updated_at.is_(None))
+            .values(updated_at=table.c[source])
+        )
+        connection.commit()
+
+
+def upgrade(connection):
+    for name, source in (("results", "date"), ("users", "created_at")):
+        add_column(connection, name, Column("updated_at", DateTime()))
+        _backfill(connection, name, source)
+        create_index(connection, name, f"ix_{name}_updated_at_id", ["updated_at", "id"])
@@ -0,0 +1,8 @@
+from lib.migrations.ops import create_index
+
+VERSION = 6
+DESCRIPTION = "Index on profiles.user_id for the paginated profile listing's filter"
+
+
+def upgrade(connection):
+    create_index(connection, "profiles", "ix_profiles_user_id", ["user_id"])
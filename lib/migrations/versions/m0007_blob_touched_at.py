@@ -0,0 +1,10 @@
+from sqlalchemy import Column, DateTime
+
+from lib.migrations.ops import add_column
+
+VERSION = 7
+DESCRIPTION = "blobs.touched_at, so the collector never sweeps a blob an upload is landing on"
+
+
+def upgrade(connection):
+    add_column(connection, "blobs", Column("touched_at", DateTime()))
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, DateTime
+
+from lib.migrations.ops import add_column
+
+VERSION = 8
+DESCRIPTION = "users.deleted_at, set when a user's deletion is scheduled"
+
+
+def upgrade(connection):
+    add_column(connection, "users", Column("deleted_at", DateTime()))
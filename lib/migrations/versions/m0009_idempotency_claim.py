@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String
+
+from lib.migrations.ops import add_column
+
+VERSION = 9
+DESCRIPTION = "idempotency_keys.claim, the token of the request holding a key's lease"
+
+
+def upgrade(connection):
+    add_column(connection, "idempotency_keys", Column("claim", String(32)))
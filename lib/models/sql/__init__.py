@@ -1,5 +1,13 @@
 from .user import User, UserRole
 from .profile import Profile
 from .result import Result
+from .result_image import ResultImage
+from .result_stat import ResultStat
+from .blob import Blob
+from .storage_job import StorageJob
+from .upload_session import UploadSession
+from .idempotency_key import IdempotencyKey
+from .schema_migration import SchemaMigration
+from .user_search_trigram import UserSearchTrigram
 
-__all__ = ["User", "Profile", "UserRole"]
\ No newline at end of file
+__all__ = ["User", "Profile", "UserRole", "Result", "ResultImage", "ResultStat", "Blob", "StorageJob", "UploadSession", "IdempotencyKey", "SchemaMigration", "UserSearchTrigram"]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+from typing import Optional
+
+
+class Blob(SQLModel, table=True):
+    """Content-addressed upload, shared by every result that references it."""
+    __tablename__ = "blobs"
+
+    id: str = Field(primary_key=True, max_length=80)  # <sha256 hex><.ext>
+    size: int = Field(default=0, nullable=False)
+    refcount: int = Field(default=0, nullable=False)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Last time an upload landed on this blob; the collector leaves it alone for STORAGE_ORPHAN_GRACE_SECONDS
+    touched_at: Optional[datetime] = Field(default=None)
@@ -0,0 +1,23 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import Column, JSON, UniqueConstraint
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Client Idempotency-Key → request fingerprint and the response it produced."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("owner_id", "scope", "key", name="uq_idempotency_owner_scope_key"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    owner_id: int = Field(nullable=False)  # no FK: rows outlive purged users until they expire
+    scope: str = Field(nullable=False, max_length=64)  # endpoint, e.g. "results.create"
+    key: str = Field(nullable=False, max_length=255)
+    fingerprint: str = Field(nullable=False, max_length=64)  # sha256 of the request
+    status: str = Field(default="pending", nullable=False, max_length=16)  # pending | completed
+    status_code: Optional[int] = Field(default=None)
+    response: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    locked_until: datetime = Field(nullable=False)  # lease of the in-flight original
+    claim: Optional[str] = Field(default=None, max_length=32)  # token of the request holding the lease
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(nullable=False, index=True)
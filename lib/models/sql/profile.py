@@ -9,7 +9,7 @@ class Profile(SQLModel, table=True):
     __tablename__ = "profiles"
 
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="users.id", nullable=False)
+    user_id: int = Field(foreign_key="users.id", nullable=False, index=True)
     phone: Optional[str] = Field(default=None)
     address: Optional[str] = Field(default=None)
     date_of_birth: Optional[datetime] = Field(default=None)
@@ -1,12 +1,20 @@
 # lib/models/sql/result.py
 from sqlmodel import SQLModel, Field, Relationship
-from typing import Optional, List
+from typing import Optional
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import JSON
-from sqlalchemy import Column
+from sqlalchemy import Index
 
 class Result(SQLModel, table=True):
     __tablename__ = "results"
+    # Role-scoped listings filter on user_id / created_by and page by (date, id);
+    # existing databases get these from lib/migrations
+    __table_args__ = (
+        Index("ix_results_user_id_date_id", "user_id", "date", "id"),
+        Index("ix_results_created_by_date_id", "created_by", "date", "id"),
+        Index("ix_results_date_id", "date", "id"),
+        Index("ix_results_gender", "gender"),
+        Index("ix_results_updated_at_id", "updated_at", "id"),  # snapshot watermark scans
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="users.id", nullable=False)  # patient or user
@@ -16,7 +24,8 @@ class Result(SQLModel, table=True):
     result: Optional[str] = Field(default=None)
     confidence: Optional[float] = Field(default=None)
     date: datetime = Field(default_factory=datetime.utcnow)
-    images: Optional[List[str]] = Field(default=[], sa_column=Column(JSON))
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
+    # Images and per-image predictions live in result_images
 
     # Relationships
     user: Optional["User"] = Relationship(sa_relationship_kwargs={"foreign_keys": "[Result.user_id]"})
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, ForeignKey, Index, Integer
+
+
+class ResultImage(SQLModel, table=True):
+    """One image of a Result, in upload order, with the model's prediction for it."""
+    __tablename__ = "result_images"
+    __table_args__ = (
+        Index("ix_result_images_result_id_position", "result_id", "position", unique=True),
+        Index("ix_result_images_content_hash", "content_hash"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    result_id: int = Field(sa_column=Column(Integer, ForeignKey("results.id"), nullable=False))
+    position: int = Field(default=0, nullable=False)
+    image: str = Field(nullable=False, max_length=255)  # blob id, or a legacy uploads/ path
+    content_hash: Optional[str] = Field(default=None, max_length=64)  # sha256 of the bytes (blob ids only)
+    label: Optional[str] = Field(default=None, max_length=32)  # None for images scored before this table
+    confidence: Optional[float] = Field(default=None)  # percent, like Result.confidence
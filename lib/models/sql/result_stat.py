@@ -0,0 +1,21 @@
+from datetime import date
+
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, Date, Double, Integer, String
+
+
+class ResultStat(SQLModel, table=True):
+    """
+    Result counts per (day, counselor, verdict, gender, age bucket), kept in
+    step with results by lib.stats and reconciled periodically. Missing
+    values are stored as "" so every key column can be part of the primary key.
+    """
+    __tablename__ = "result_stats"
+
+    day: date = Field(sa_column=Column(Date, primary_key=True))
+    created_by: int = Field(sa_column=Column(Integer, primary_key=True, index=True))
+    result: str = Field(sa_column=Column(String(32), primary_key=True))
+    gender: str = Field(sa_column=Column(String(32), primary_key=True))
+    age_bucket: str = Field(sa_column=Column(String(8), primary_key=True))
+    count: int = Field(default=0, sa_column=Column(Integer, nullable=False, default=0))
+    confidence_sum: float = Field(default=0.0, sa_column=Column(Double, nullable=False, default=0.0))
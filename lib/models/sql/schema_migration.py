@@ -0,0 +1,11 @@
+from sqlmodel import SQLModel, Field
+from datetime import datetime
+
+
+class SchemaMigration(SQLModel, table=True):
+    """One row per applied lib.migrations version."""
+    __tablename__ = "schema_migrations"
+
+    version: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    description: str = Field(nullable=False, max_length=255)
+    applied_at: datetime = Field(default_factory=datetime.utcnow)
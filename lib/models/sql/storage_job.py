@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+from sqlalchemy import Column, JSON
+
+
+class StorageJob(SQLModel, table=True):
+    """Deferred storage work, drained by lib.storage.collector."""
+    __tablename__ = "storage_jobs"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(nullable=False, max_length=32)  # release_images | purge_user
+    payload: dict = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    attempts: int = Field(default=0, nullable=False)
+    last_error: Optional[str] = Field(default=None, max_length=500)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
@@ -0,0 +1,16 @@
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+
+class UploadSession(SQLModel, table=True):
+    """Resumable upload of one file; chunks live in storage under staging/<id>/."""
+    __tablename__ = "upload_sessions"
+
+    id: str = Field(primary_key=True, max_length=32)  # uuid4 hex
+    owner_id: int = Field(foreign_key="users.id", index=True, nullable=False)
+    filename: Optional[str] = Field(default=None, max_length=255)
+    length: int = Field(nullable=False)  # declared total size in bytes
+    offset: int = Field(default=0, nullable=False)  # bytes received so far
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime = Field(nullable=False, index=True)
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship, UniqueConstraint
+from sqlalchemy import Index
 from typing import Optional
 from datetime import datetime
 from enum import Enum
@@ -14,6 +15,7 @@ class User(SQLModel, table=True):
     __tablename__ = "users"
     __table_args__ = (
         UniqueConstraint("email", "role", name="uq_email_role"),  # ✅ composite unique constraint
+        Index("ix_users_updated_at_id", "updated_at", "id"),  # snapshot watermark scans
     )
 
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -24,5 +26,7 @@ class User(SQLModel, table=True):
     otp_code: Optional[str] = Field(default=None, nullable=True)
     otp_verified: bool = Field(default=False, nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
+    deleted_at: Optional[datetime] = Field(default=None)  # deletion scheduled: hidden and locked out until purged
 
     profile: Optional["Profile"] = Relationship(back_populates="user")
@@ -0,0 +1,17 @@
+from sqlmodel import SQLModel, Field
+from sqlalchemy import Column, ForeignKey, Integer, String
+from sqlalchemy.dialects import mysql
+
+
+class UserSearchTrigram(SQLModel, table=True):
+    """
+    Trigram posting list for substring search over users.name / users.email.
+    Maintained by lib.search on every User insert / update.
+    """
+    __tablename__ = "user_search_trigrams"
+
+    # Binary collation: accent/case-insensitive collations would fold distinct trigrams together
+    trigram: str = Field(sa_column=Column(
+        String(3).with_variant(mysql.VARCHAR(3, collation="utf8mb4_bin"), "mysql"), primary_key=True
+    ))
+    user_id: int = Field(sa_column=Column(Integer, ForeignKey("users.id"), primary_key=True, index=True))
@@ -3,6 +3,9 @@ from .mail import router as mail_router
 from .user import router as user_router
 from .profile import router as profile_router
 from .result import router as result_router
+from .media import router as media_router
+from .upload import router as upload_router
+from .health import router as health_router
 # Create a router instance
 router = APIRouter()
 
@@ -10,6 +13,9 @@ router.include_router(user_router, prefix='/user')
 router.include_router(profile_router, prefix='/profile')
 router.include_router(mail_router, prefix='/mail')
 router.include_router(result_router, prefix='/result')
+router.include_router(media_router, prefix='/media')
+router.include_router(upload_router, prefix='/upload')
+router.include_router(health_router)
 
 # Function to register routes to the main app
 def register_routes(app: FastAPI):
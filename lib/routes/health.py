@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from lib.config.database import sql_pool_status
+from lib.models.sql import User
+from lib.routes.user import get_current_user
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+# =========================================
+# LIVENESS
+# =========================================
+@router.get("/")
+async def health():
+    """✅ Cheap liveness probe (touches no database)"""
+    return {"status": "ok"}
+
+
+# =========================================
+# SQL CONNECTION POOL METRICS (admin)
+# =========================================
+@router.get("/db")
+async def db_pool_metrics(current_user: User = Depends(get_current_user)):
+    """
+    ✅ Connection pool of this worker: checked-out / idle connections,
+    checkout wait histogram, overflow checkouts, pool timeouts (503s) and
+    connection churn (connects, closes, invalidations).
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admins only")
+    return {"pool": sql_pool_status()}
@@ -0,0 +1,72 @@
+import mimetypes
+import time
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request, Query
+from fastapi.responses import FileResponse, RedirectResponse, Response
+
+from lib.storage import storage, blob_store, is_blob_id, derivative_id
+from lib.utils import sign_value, verify_signature
+
+router = APIRouter(prefix="/images", tags=["Media"])
+
+MEDIA_PATH = "/api/v1/media/images"
+mimetypes.add_type("image/webp", ".webp")
+
+# Stored files are content-addressed, so a given URL never changes content
+IMMUTABLE_CACHE = "private, max-age=31536000, immutable"
+
+
+def image_url(image: str, variant: Optional[str] = None) -> str:
+    """
+    Short-lived signed URL for a stored image or one of its derivatives
+    ("thumb", "preview", "model"). Legacy (pre-blob) paths are returned as-is.
+    """
+    if not is_blob_id(image):
+        return image
+    name = derivative_id(image, variant) if variant else image
+    expires, signature = sign_value(name)
+    return f"{MEDIA_PATH}/{name}?expires={expires}&signature={signature}"
+
+
+# =========================================
+# SERVE IMAGE (signed, immutable, ranged)
+# =========================================
+@router.get("/{name}")
+async def serve_image(
+    name: str,
+    request: Request,
+    expires: int = Query(...),
+    signature: str = Query(...),
+):
+    """
+    ✅ Serve a blob or derivative by name.
+    - Requires a valid, unexpired signature (issued in result responses)
+    - Strong ETag = content hash → If-None-Match answers 304 with no body
+    - Local storage: range requests and sendfile are handled by FileResponse
+    - Object storage: redirect to a presigned bucket URL
+    """
+    if not verify_signature(name, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired image link")
+
+    try:
+        key = blob_store.key_for(name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE, "ETag": f'"{name}"'}
+    if_none_match = request.headers.get("if-none-match", "")
+    if headers["ETag"] in if_none_match or if_none_match.strip() == "*":
+        return Response(status_code=304, headers=headers)
+
+    path = storage.local_path(key)
+    if path is None:
+        # Object storage: hand the download (ranges included) to the bucket
+        url = await storage.presigned_url(key, expires_in=max(expires - int(time.time()), 1))
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
+
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return FileResponse(path, media_type=media_type, headers=headers)
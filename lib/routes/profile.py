@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
-from typing import List
+from typing import Optional
 
-from lib.config.database import get_async_session
+from lib.config.database import get_async_session, get_read_session
+from lib.config.pool import statement_timeout_lifted
+from lib.config.settings import settings
 from lib.models.sql import Profile, User
-from lib.schemas import ProfileCreate, ProfileRead, ProfileUpdate
-from lib.routes.user import get_current_user  
+from lib.schemas import ProfileCreate, ProfileRead, ProfileUpdate, CursorProfileResponse
+from lib.routes.user import get_current_user, get_current_reader
+from lib.utils import encode_cursor, decode_cursor, keyset_order, keyset_after
 
 router = APIRouter(prefix="/profiles", tags=["Profiles"])
 
@@ -59,18 +64,88 @@ async def get_or_create_my_profile(
 # =========================================
 # GET ALL PROFILES (Admin only)
 # =========================================
-@router.get("/", response_model=List[ProfileRead])
+PROFILE_COLUMNS = tuple(Profile.__table__.c)
+PROFILE_USER_COLUMNS = (User.__table__.c.name.label("user_name"), User.__table__.c.email.label("user_email"))
+PROFILE_STREAM_CHUNK_ROWS = 1000
+
+
+def profile_list_query(include_user: bool, user_id: Optional[int], email: Optional[str]):
+    """
+    Projected profiles (+ their user's name / email), filtered on indexed
+    columns only. Users whose deletion is scheduled are left out.
+    """
+    query = (
+        select(*PROFILE_COLUMNS, *(PROFILE_USER_COLUMNS if include_user else ()))
+        .join_from(Profile, User, User.id == Profile.user_id)
+        .where(User.deleted_at.is_(None))
+    )
+    if user_id is not None:
+        query = query.where(Profile.user_id == user_id)
+    if email:
+        query = query.where(User.email == email)
+    return query
+
+
+def serialize_profile_row(row, include_user: bool) -> dict:
+    data = {column.name: getattr(row, column.name) for column in PROFILE_COLUMNS}
+    if include_user:
+        data["user"] = {"id": row.user_id, "name": row.user_name, "email": row.user_email}
+    return data
+
+
+@router.get("/", response_model=CursorProfileResponse)
 async def list_profiles(
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_reader),
+    limit: int = Query(20, ge=1, le=100, description="Profiles per page"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` of the previous page"),
+    orderby_dir: Optional[str] = Query("asc", description="Order by id: asc or desc"),
+    include_user: bool = Query(False, description="Add the user's name and email (same query, joined)"),
+    user_id: Optional[int] = Query(None, description="Only this user's profile"),
+    email: Optional[str] = Query(None, description="Only the profile of the user with this email"),
+    stream: bool = Query(False, description="Stream every matching profile as NDJSON instead of one page"),
 ):
-    """Admin-only: list all user profiles."""
+    """
+    ✅ Admin-only: list user profiles.
+    - Keyset pages on id (`cursor` → `next_cursor`); no OFFSET, no COUNT
+    - Filters on indexed columns only: `user_id`, `email`
+    - `stream=true` sends all matches as NDJSON from a server-side cursor
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Access denied")
 
-    result = await session.execute(select(Profile))
-    profiles = result.scalars().all()
-    return profiles
+    query = profile_list_query(include_user, user_id, email)
+    id_column = Profile.__table__.c.id
+    descending = (orderby_dir or "asc").lower() == "desc"
+
+    if stream:
+        query = query.order_by(*keyset_order(id_column, id_column, descending))
+
+        async def lines():
+            # A full listing can outlast the per-statement timeout
+            async with statement_timeout_lifted(session, settings.SQL_STATEMENT_TIMEOUT_MS):
+                rows = await session.stream(query.execution_options(yield_per=PROFILE_STREAM_CHUNK_ROWS))
+                try:
+                    async for partition in rows.partitions():
+                        yield b"".join(orjson.dumps(serialize_profile_row(row, include_user)) + b"\n" for row in partition)
+                finally:
+                    await rows.close()
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    if cursor:
+        _, last_id = decode_cursor(cursor, "id", descending)
+        query = query.where(keyset_after(id_column, id_column, descending, None, last_id))
+    query = query.order_by(*keyset_order(id_column, id_column, descending)).limit(limit + 1)
+    rows = (await session.execute(query)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "limit": limit,
+        "count": len(rows),
+        "next_cursor": encode_cursor("id", descending, rows[-1].id, rows[-1].id) if has_more else None,
+        "data": [serialize_profile_row(row, include_user) for row in rows],
+    }
 
 
 # =========================================
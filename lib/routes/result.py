@@ -1,234 +1,365 @@
-import os, random, string, shutil
-import numpy as np
-from typing import List, Optional
+import asyncio, csv, io, json, time, zlib
+import orjson
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from fastapi import (
     APIRouter,
     Depends,
     UploadFile,
     File,
     Form,
+    Header,
     HTTPException,
+    Response,
     status,
-    Query
+    Query,
+    Path as Path_,
 )
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 from pathlib import Path
-from sqlalchemy import text
-import shutil, os
-
-from lib.config.database import get_async_session
-from lib.models.sql import User, Result
-from lib.schemas import ResultRead, ResultCreate, PaginatedResultResponse
-from lib.utils import send_email, hash_password, predict_image
-from lib.routes.user import get_current_user
+from sqlalchemy import Select, or_, delete, distinct
+
+from lib.config.database import get_async_session, get_read_session
+from lib.config.pool import statement_timeout_lifted
+from lib.config.settings import settings
+from lib.models.sql import User, Result, ResultImage, UploadSession
+from lib.schemas import (
+    ResultRead, ResultCreate, ResultFromUploads, PaginatedResultResponse, CursorResultResponse, ResultStatsResponse,
+)
+from lib.utils import (
+    send_account_email, preprocess_image, predict_array, progress_broker,
+    idempotency_store, request_fingerprint, encode_cursor, decode_cursor, keyset_order, keyset_after,
+    count_cache, filtered_total, estimated_total, NewResult, persist_result, final_verdict,
+)
+from lib.routes.user import get_current_user, get_current_reader, get_token_payload
+from lib.storage import blob_store, chunk_store, is_blob_id, validate_uploads
+from lib.storage.collector import storage_collector, enqueue_storage_job
+from lib.routes.media import image_url
+from lib.routes.upload import claim_uploads
+from lib.search import matching_user_ids
+from lib.stats import grouped_results_query, stats_query, summarize
 
 router = APIRouter(prefix="/results", tags=["Results"])
 
-UPLOAD_DIR = Path("uploads/results")
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+# Columns get_results may order (and keyset-paginate) by
+RESULT_ORDER_COLUMNS = ("date", "id", "age", "gender", "result", "confidence")
+
+GENDERS_TTL_SECONDS = 300
+_genders_cache: Tuple[float, List[str]] = (0.0, [])
+
+
+async def known_genders(session: AsyncSession) -> List[str]:
+    """Distinct stored genders (a handful), read from ix_results_gender and cached."""
+    global _genders_cache
+    expires, genders = _genders_cache
+    if expires < time.monotonic():
+        genders = [g for g in (await session.execute(select(distinct(Result.gender)))).scalars() if g]
+        _genders_cache = (time.monotonic() + GENDERS_TTL_SECONDS, genders)
+    return genders
+
+
+# Columns list / detail reads fetch: a projected Core select mapped straight
+# to dicts — no ORM hydration, and never users.password / otp_code
+RESULT_READ_COLUMNS = (
+    Result.__table__.c.id,
+    Result.__table__.c.user_id,
+    Result.__table__.c.created_by,
+    Result.__table__.c.age,
+    Result.__table__.c.gender,
+    Result.__table__.c.result,
+    Result.__table__.c.confidence,
+    Result.__table__.c.date,
+    User.__table__.c.name.label("user_name"),
+    User.__table__.c.email.label("user_email"),
+)
 
 
-# =========================================
-# CREATE RESULT ENTRY (auto-create user)
-# =========================================
-# @router.post("/", response_model=ResultRead, status_code=status.HTTP_201_CREATED)
-# async def create_result_entry(
-#     email: str = Form(...),
-#     name: str = Form("Unknown User"),
-#     age: Optional[int] = Form(None),
-#     gender: Optional[str] = Form(None),
-#     files: List[UploadFile] = File(...),
-#     session: AsyncSession = Depends(get_async_session),
-#     current_user: User = Depends(get_current_user),
-# ):
-#     """
-#     ✅ Create result entry.
-#     - If user doesn't exist → auto-create and email credentials
-#     - Saves uploaded images in /uploads/results/<user_id>/
-#     - Stores created_by = logged-in user id
-#     """
-
-#     # 1️⃣ Check or create user
-#     result = await session.execute(select(User).where(User.email == email))
-#     user = result.scalar_one_or_none()
-
-#     if not user:
-#         random_password = "".join(random.choices(string.ascii_letters + string.digits, k=10))
-#         hashed_pw = hash_password(random_password)
-#         user = User(name=name, email=email, password=hashed_pw, role="user", otp_verified=True)
-#         session.add(user)
-#         await session.commit()
-#         await session.refresh(user)
-
-#         try:
-#             subject = "Your Oral Cancer AI Account"
-#             body = f"""
-# Hello {name},
-
-# An account has been created for you on the Oral Cancer AI Platform.
-
-# 🔹 Email: {email}
-# 🔹 Temporary Password: {random_password}
-
-# Please log in and change your password after first login.
-
-# Regards,  
-# Oral Cancer AI Team
-# """
-#             await send_email(subject, [email], body)
-#         except Exception as e:
-#             print(f"⚠️ Failed to send email: {e}")
-
-#     # 2️⃣ Save images
-#     user_folder = UPLOAD_DIR / str(user.id)
-#     user_folder.mkdir(parents=True, exist_ok=True)
-
-#     saved_paths = []
-#     for file in files:
-#         filename = f"{user.id}_{file.filename}"
-#         file_path = user_folder / filename
-#         with open(file_path, "wb") as buffer:
-#             shutil.copyfileobj(file.file, buffer)
-#         saved_paths.append(str(file_path))
-
-#     # 3️⃣ Create result
-#     new_result = Result(
-#         user_id=user.id,
-#         created_by=current_user.id,
-#         age=age,
-#         gender=gender,
-#         result=None,
-#         confidence=None,
-#         images=saved_paths,
-#     )
-
-#     session.add(new_result)
-#     await session.commit()
-#     await session.refresh(new_result)
-
-#     return new_result
+def result_read_query():
+    return select(*RESULT_READ_COLUMNS).join_from(Result, User, User.id == Result.user_id)
+
+
+# Per-image columns, fetched for a whole page of results in one query
+RESULT_IMAGE_COLUMNS = (
+    ResultImage.__table__.c.result_id,
+    ResultImage.__table__.c.image,
+    ResultImage.__table__.c.content_hash,
+    ResultImage.__table__.c.label,
+    ResultImage.__table__.c.confidence,
+)
+
+
+async def load_result_images(session: AsyncSession, result_ids: List[int]) -> Dict[int, list]:
+    """Result id → its result_images rows in upload order (one query for any number of results)."""
+    images: Dict[int, list] = defaultdict(list)
+    if result_ids:
+        rows = await session.execute(
+            select(*RESULT_IMAGE_COLUMNS)
+            .where(ResultImage.__table__.c.result_id.in_(result_ids))
+            .order_by(ResultImage.__table__.c.result_id, ResultImage.__table__.c.position)
+        )
+        for row in rows:
+            images[row.result_id].append(row)
+    return images
+
+
+def serialize_result_row(row, images: Optional[list] = None) -> dict:
+    """Shape a result_read_query() row like serialize_result(res, images, user)."""
+    data = serialize_result(row, images)
+    data["user"] = {"id": row.user_id, "name": row.user_name, "email": row.user_email}
+    return data
+
+
+def serialize_result(res: Result, images: Optional[list] = None, user: Optional[User] = None) -> dict:
+    """
+    Shape a Result (or a row with the same fields) and its result_images rows
+    for API responses (blob ids → signed image URLs).
+    """
+    images = images or []
+    data = {
+        "id": res.id,
+        "user_id": res.user_id,
+        "created_by": res.created_by,
+        "age": res.age,
+        "gender": res.gender,
+        "result": res.result,
+        "confidence": res.confidence,
+        "images": [image_url(i.image) for i in images],
+        "thumbnails": [image_url(i.image, "thumb") for i in images],
+        "previews": [image_url(i.image, "preview") for i in images],
+        "image_predictions": [
+            {"content_hash": i.content_hash, "label": i.label, "confidence": i.confidence} for i in images
+        ],
+        "date": res.date,
+    }
+    if user is not None:
+        data["user"] = {
+            "id": user.id,
+            "name": user.name,
+            "email": user.email,
+        }
+    return data
+
+
+async def run_submission(
+    session: AsyncSession,
+    current_user: User,
+    sources: List[Tuple[str, BinaryIO]],
+    email: str,
+    name: str = "Unknown User",
+    age: Optional[int] = None,
+    gender: Optional[str] = None,
+    submission_id: Optional[str] = None,
+    before_commit: Optional[Callable[[AsyncSession], Awaitable[None]]] = None,
+) -> dict:
+    """
+    Shared create pipeline for multipart and resumable submissions:
+    validate → store blobs → score → save patient + Result (lib/utils/result_writer.py).
+    `sources` are (filename, file object) pairs; `before_commit` runs inside
+    the final transaction.
+    """
+    def publish(event: str, data: dict):
+        progress_broker.publish(current_user.id, submission_id, event, data)
+
+    publish("received", {"files": len(sources)})
+
+    try:
+        # 0️⃣ Reject bad uploads from headers alone, before any user/disk/model work
+        await validate_uploads(sources)
+        publish("validated", {"files": len(sources)})
+
+        # 1️⃣ Save images (content-addressed, deduplicated) and score them
+        scored = []
+        predictions = []
+        confidences = []
+
+        for index, (filename, fileobj) in enumerate(sources):
+            # Thumbnail / preview / 224x224 model input are built once per unique image
+            stored = await blob_store.put(fileobj)
+            publish("saved", {"index": index, "filename": filename, "blob_id": stored.blob_id})
+
+            # 🔮 Predict with model (off the event loop so streams keep flowing)
+            img_array = await run_in_threadpool(preprocess_image, io.BytesIO(stored.model_input))
+            publish("decoded", {"index": index})
+            label, conf = await run_in_threadpool(predict_array, img_array)
+            predictions.append(label)
+            confidences.append(conf)
+            scored.append((stored.blob_id, stored.size, label, round(conf * 100, 2)))
+            publish("scored", {"index": index, "label": label, "confidence": round(conf * 100, 2)})
+
+        # 2️⃣ Calculate overall result
+        final_result, avg_conf = final_verdict(predictions, confidences)
+
+        # 3️⃣ Patient + result in a single transaction
+        new_result, images, password = await persist_result(session, NewResult(
+            created_by=current_user.id, email=email, name=name, age=age, gender=gender,
+            final_result=final_result, confidence=avg_conf, scored=scored, before_commit=before_commit,
+        ))
+    except Exception as e:
+        publish("failed", {"detail": getattr(e, "detail", None) or "Submission failed"})
+        raise
+
+    # 4️⃣ Tell a newly created patient about their account (never fails the submission)
+    if password:
+        try:
+            await send_account_email(name, email, password)
+        except Exception as e:
+            print(f"⚠️ Email send failed: {e}")
+
+    publish("completed", {"id": new_result.id, "result": final_result, "confidence": avg_conf})
+    return serialize_result(new_result, images)
+
+
+async def _replay_result(session: AsyncSession, body: dict) -> dict:
+    """Stored create response, re-serialized so its signed image URLs are fresh."""
+    res = await session.get(Result, body["id"])
+    if not res:
+        return body
+    return serialize_result(res, (await load_result_images(session, [res.id]))[res.id])
 
 
 @router.post("/", response_model=ResultRead, status_code=status.HTTP_201_CREATED)
 async def create_result_entry(
+    response: Response,
     email: str = Form(...),
     name: str = Form("Unknown User"),
     age: Optional[int] = Form(None),
     gender: Optional[str] = Form(None),
+    submission_id: Optional[str] = Form(None, max_length=64, description="Client-generated id to follow progress over SSE"),
     files: List[UploadFile] = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
     session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(get_current_user),
 ):
     """
     ✅ Create result entry with ML predictions.
+    - Validates format, size and pixel count of every upload first (422 on failure).
     - Saves all uploaded oral images.
     - Predicts each with ML model.
     - Calculates average confidence & final label.
+    - Streams per-image progress to GET /results/progress/{submission_id}.
+    - Retries with the same `Idempotency-Key` get the original result back.
     """
+    return await idempotency_store.run(
+        idempotency_key, current_user.id, "results.create",
+        fingerprint=lambda: request_fingerprint(
+            {"email": email, "name": name, "age": age, "gender": gender},
+            [f.file for f in files],
+        ),
+        execute=lambda: run_submission(
+            session, current_user, [(f.filename, f.file) for f in files],
+            email=email, name=name, age=age, gender=gender, submission_id=submission_id,
+        ),
+        status_code=status.HTTP_201_CREATED,
+        response=response,
+        replay=lambda body: _replay_result(session, body),
+    )
 
-    # 1️⃣ Check or create user
-    result = await session.execute(select(User).where(User.email == email))
-    user = result.scalar_one_or_none()
-
-    if not user:
-        random_password = "".join(random.choices(string.ascii_letters + string.digits, k=10))
-        hashed_pw = hash_password(random_password)
-        user = User(name=name, email=email, password=hashed_pw, role="user", otp_verified=True)
-        session.add(user)
-        await session.commit()
-        await session.refresh(user)
-
-        try:
-            subject = "Your Oral Cancer AI Account"
-            body = f"""
-Hello {name},
-
-An account has been created for you on the Oral Cancer AI Platform.
-
-🔹 Email: {email}
-🔹 Temporary Password: {random_password}
-
-Please log in and change your password after first login.
-
-Regards,  
-Oral Cancer AI Team
-"""
-            await send_email(subject, [email], body)
-        except Exception as e:
-            print(f"⚠️ Email send failed: {e}")
-
-    # 2️⃣ Save images
-    user_folder = UPLOAD_DIR / str(user.id)
-    user_folder.mkdir(parents=True, exist_ok=True)
-
-    saved_paths = []
-    predictions = []
-    confidences = []
-
-    for file in files:
-        filename = f"{user.id}_{file.filename}"
-        file_path = user_folder / filename
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        saved_paths.append(str(file_path))
 
-        # 🔮 Predict with model
-        label, conf = predict_image(str(file_path))
-        predictions.append(label)
-        confidences.append(conf)
-
-    # 3️⃣ Calculate overall result
-    avg_conf = round(float(np.mean(confidences)) * 100, 2)
-    cancer_votes = predictions.count("CANCER")
-    non_cancer_votes = predictions.count("NON CANCER")
-    final_result = "CANCER" if cancer_votes > non_cancer_votes else "NON CANCER"
-
-    # 4️⃣ Save result entry in DB
-    new_result = Result(
-        user_id=user.id,
-        created_by=current_user.id,
-        age=age,
-        gender=gender,
-        result=final_result,
-        confidence=avg_conf,
-        images=saved_paths,
+# =========================================
+# CREATE RESULT FROM RESUMABLE UPLOADS
+# =========================================
+@router.post("/from-uploads", response_model=ResultRead, status_code=status.HTTP_201_CREATED)
+async def create_result_from_uploads(
+    payload: ResultFromUploads,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ✅ Finalize completed resumable uploads (see /upload/sessions) into a result.
+    Same pipeline and progress events as POST /results/; the upload sessions
+    are consumed in the same transaction as the new result.
+    Retries with the same `Idempotency-Key` get the original result back.
+    """
+    async def fingerprint():
+        return await request_fingerprint(payload.model_dump(exclude={"submission_id"}))
+
+    return await idempotency_store.run(
+        idempotency_key, current_user.id, "results.from_uploads",
+        fingerprint=fingerprint,
+        execute=lambda: _finalize_uploads(payload, session, current_user),
+        status_code=status.HTTP_201_CREATED,
+        response=response,
+        replay=lambda body: _replay_result(session, body),
     )
 
-    session.add(new_result)
-    await session.commit()
-    await session.refresh(new_result)
 
-    return new_result
+async def _finalize_uploads(payload: ResultFromUploads, session: AsyncSession, current_user: User) -> dict:
+    upload_ids = list(dict.fromkeys(payload.upload_ids))
+    uploads = (await session.execute(
+        select(UploadSession).where(
+            UploadSession.id.in_(upload_ids),
+            UploadSession.owner_id == current_user.id,
+        )
+    )).scalars().all()
+    found = {u.id: u for u in uploads}
+    missing = [i for i in upload_ids if i not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Uploads not found: {', '.join(missing)}")
+    incomplete = [u.id for u in uploads if u.offset != u.length]
+    if incomplete:
+        raise HTTPException(status_code=409, detail=f"Uploads not complete: {', '.join(incomplete)}")
+    uploads = [found[i] for i in upload_ids]
+
+    assembled: List[Path] = []
+    handles = []
+    try:
+        for upload in uploads:
+            try:
+                assembled.append(await chunk_store.assemble(upload.id, upload.length))
+            except ValueError as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            handles.append(open(assembled[-1], "rb"))
+
+        response = await run_submission(
+            session, current_user,
+            [(u.filename or u.id, fh) for u, fh in zip(uploads, handles)],
+            email=payload.email, name=payload.name or "Unknown User",
+            age=payload.age, gender=payload.gender, submission_id=payload.submission_id,
+            before_commit=lambda s: claim_uploads(s, uploads),
+        )
+    finally:
+        for fh in handles:
+            fh.close()
+        for path in assembled:
+            path.unlink(missing_ok=True)
+
+    for upload in uploads:
+        await chunk_store.discard(upload.id)
+    return response
 
 
 # =========================================
-# GET RESULTS — Role Based Filtering
+# STREAM SUBMISSION PROGRESS (SSE)
 # =========================================
-@router.get("/")
-async def get_results(
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
-    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
-    limit: int = Query(10, ge=1, le=100, description="Number of records per page"),
-    search: Optional[str] = Query(None, description="Search by gender or user email"),
-    filters: Optional[str] = Query(None, description="JSON filters (e.g. {'gender':'Male'})"),
-    orderby_col: Optional[str] = Query("date", description="Order by column"),
-    orderby_dir: Optional[str] = Query("desc", description="Order direction: asc or desc"),
+@router.get("/progress/{submission_id}")
+async def stream_result_progress(
+    submission_id: str = Path_(..., max_length=64),
+    token: dict = Depends(get_token_payload),
 ):
     """
-    ✅ Get Results with:
-    - Pagination
-    - Search
-    - Dynamic filters
-    - Ordering
-    - Role-based access control
+    ✅ Server-Sent Events stream for one of the caller's own submissions.
+    Emits received → saved / decoded / scored per image → completed (or failed).
+    Open it before or after POSTing with the same `submission_id`; earlier events are replayed.
+    Closes with an `expired` event when nothing is published for a while (e.g. an unknown id).
     """
+    return StreamingResponse(
+        progress_broker.subscribe(token.get("id"), submission_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-    # ==========================================
-    # Base query + Join with User
-    # ==========================================
-    query = select(Result, User).join(User, User.id == Result.user_id)
+
+async def scoped_results_query(
+    session: AsyncSession, current_user: User, search: Optional[str], filters: Optional[str],
+) -> Tuple[Select, dict]:
+    """result_read_query() narrowed to what `current_user` may see, `search` and JSON `filters`."""
+    query = result_read_query()
 
     # ==========================================
     # 🔐 Role-based filter
@@ -242,42 +373,120 @@ async def get_results(
     # ==========================================
     # 🔍 Search
     # ==========================================
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.where(
-            or_(
-                User.email.ilike(search_term),
-                User.name.ilike(search_term),
-                Result.gender.ilike(search_term),
-            )
-        )
+    if search and search.strip():
+        # Users via the trigram index; gender only when the term names a stored value,
+        # so the common case stays an indexed user_id IN (...) lookup
+        clauses = [Result.user_id.in_(matching_user_ids(search))]
+        genders = [g for g in await known_genders(session) if search.strip().lower() in g.lower()]
+        if genders:
+            clauses.append(Result.gender.in_(genders))
+        query = query.where(or_(*clauses))
 
     # ==========================================
     # ⚙️ Filters (JSON)
     # ==========================================
+    applied_filters = {}
     if filters:
         try:
             filter_dict = json.loads(filters)
             for key, value in filter_dict.items():
                 if hasattr(Result, key):
                     query = query.where(getattr(Result, key) == value)
+                    applied_filters[key] = value
         except json.JSONDecodeError:
             raise HTTPException(status_code=400, detail="Invalid JSON in filters parameter")
 
+    return query, applied_filters
+
+
+# =========================================
+# GET RESULTS — Role Based Filtering
+# =========================================
+@router.get("/", response_model=Union[PaginatedResultResponse, CursorResultResponse])
+async def get_results(
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_reader),
+    page: int = Query(1, ge=1, description="Page number (starts from 1)"),
+    limit: int = Query(10, ge=1, le=100, description="Number of records per page"),
+    search: Optional[str] = Query(None, description="Search by gender or user email"),
+    filters: Optional[str] = Query(None, description="JSON filters (e.g. {'gender':'Male'})"),
+    orderby_col: Optional[str] = Query("date", description="Order by column"),
+    orderby_dir: Optional[str] = Query("desc", description="Order direction: asc or desc"),
+    cursor: Optional[str] = Query(
+        None, description="Keyset mode: `next_cursor` of the previous page (empty for the first page)"
+    ),
+    count: str = Query(
+        "exact", pattern="^(exact|estimate)$",
+        description="`estimate` uses table statistics for unfiltered admin listings instead of counting",
+    ),
+    images: bool = Query(
+        True, description="Include image URLs and per-image predictions (one batched query); false skips them"
+    ),
+):
+    """
+    ✅ Get Results with:
+    - Pagination: `page`/`limit` (OFFSET), or keyset via `cursor` — constant
+      cost at any depth, stable under concurrent inserts; returns `next_cursor`
+    - Search
+    - Dynamic filters
+    - Ordering (ties broken by id)
+    - Role-based access control
+    - `total` respects role, search and filters; it is a separate COUNT
+      cached per scope (see CountCache), so the page keeps its indexed LIMIT
+    """
+
+    # ==========================================
+    # Base query + role scope, search, filters
+    # ==========================================
+    query, applied_filters = await scoped_results_query(session, current_user, search, filters)
+
     # ==========================================
     # ↕️ Ordering
     # ==========================================
-    if hasattr(Result, orderby_col):
-        order_col = getattr(Result, orderby_col)
-        query = query.order_by(order_col.asc() if orderby_dir.lower() == "asc" else order_col.desc())
-    else:
-        query = query.order_by(Result.date.desc())
+    order_name = orderby_col if orderby_col in RESULT_ORDER_COLUMNS else "date"
+    order_col = Result.__table__.c[order_name]
+    descending = (orderby_dir or "desc").lower() != "asc"
+
+    if cursor is not None:
+        if cursor:
+            value, last_id = decode_cursor(cursor, order_name, descending)
+            query = query.where(keyset_after(order_col, Result.__table__.c.id, descending, value, last_id))
+        query = query.order_by(*keyset_order(order_col, Result.__table__.c.id, descending)).limit(limit + 1)
+        rows = (await session.execute(query)).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        last = rows[-1] if rows else None
+        image_map = await load_result_images(session, [row.id for row in rows]) if images else {}
+        return {
+            "limit": limit,
+            "count": len(rows),
+            "next_cursor": encode_cursor(order_name, descending, getattr(last, order_name), last.id) if has_more else None,
+            "data": [serialize_result_row(row, image_map.get(row.id)) for row in rows],
+        }
+
+    query = query.order_by(*keyset_order(order_col, Result.__table__.c.id, descending))
 
     # ==========================================
-    # 🧮 Total count (respecting filters)
+    # 🧮 Total count (respecting role, search and filters)
     # ==========================================
-    count_query = select(text("COUNT(*)")).select_from(Result)
-    total = (await session.execute(count_query)).scalar() or 0
+    unfiltered = current_user.role == "admin" and not search and not applied_filters
+    scope = (
+        current_user.role,
+        None if current_user.role == "admin" else current_user.id,
+        (search or "").lower(),
+        json.dumps(applied_filters, sort_keys=True, default=str),
+    )
+    estimated = False
+    total = None
+    if count == "estimate" and unfiltered:
+        total = await estimated_total(session, Result.__tablename__)
+        estimated = total is not None
+    if total is None:
+        total = count_cache.get(Result.__tablename__, scope)
+    if total is None:
+        # Its own COUNT: folded into the page query it would make the (date, id) LIMIT sort every match
+        total = await filtered_total(session, query, Result.id)
+        count_cache.set(Result.__tablename__, scope, total)
 
     # ==========================================
     # 📄 Pagination
@@ -294,41 +503,145 @@ async def get_results(
     # ==========================================
     # 🧩 Format Response
     # ==========================================
-    data = []
-    for res, user in rows:
-        data.append({
-            "id": res.id,
-            "user_id": res.user_id,
-            "created_by": res.created_by,
-            "age": res.age,
-            "gender": res.gender,
-            "result": res.result,
-            "confidence": res.confidence,
-            "images": res.images,
-            "date": res.date,
-            "user": {
-                "id": user.id,
-                "name": user.name,
-                "email": user.email,
-            },
-        })
+    image_map = await load_result_images(session, [row.id for row in rows]) if images else {}
+    data = [serialize_result_row(row, image_map.get(row.id)) for row in rows]
 
     return {
         "page": page,
         "limit": limit,
         "total": total,
+        "estimated": estimated,
         "pages": (total // limit) + (1 if total % limit else 0),
         "count": len(data),
         "data": data,
     }
+# =========================================
+# EXPORT RESULTS — streamed CSV / NDJSON
+# =========================================
+EXPORT_COLUMNS = (
+    "id", "user_id", "user_name", "user_email", "created_by", "age", "gender", "result", "confidence", "date",
+)
+EXPORT_CHUNK_ROWS = 1000  # rows per server-side cursor fetch, encoded and flushed as one chunk
+EXPORT_GZIP_LEVEL = 6
+
+
+def _encode_csv(rows, header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (getattr(row, column) for column in EXPORT_COLUMNS)
+        )
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows) -> bytes:
+    return b"".join(orjson.dumps({column: getattr(row, column) for column in EXPORT_COLUMNS}) + b"\n" for row in rows)
+
+
+async def _gzipped(chunks):
+    compressor = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+@router.get("/export")
+async def export_results(
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_reader),
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson (one JSON object per line)"),
+    search: Optional[str] = Query(None, description="Search by gender or user email"),
+    filters: Optional[str] = Query(None, description="JSON filters (e.g. {'gender':'Male'})"),
+    orderby_dir: Optional[str] = Query("desc", description="Order by date: asc or desc"),
+    gzip: bool = Query(False, description="gzip the stream (Content-Encoding: gzip)"),
+):
+    """
+    ✅ Export every result the caller may see — same role scoping, search and
+    filters as GET /results/ — as one streamed download.
+    - Rows come from a server-side cursor in chunks of EXPORT_CHUNK_ROWS and
+      are flushed as they are encoded: memory stays flat at any size
+    - No COUNT, no OFFSET; ordered by (date, id)
+    - Image URLs are not included (they are signed and short-lived)
+    """
+    query, _ = await scoped_results_query(session, current_user, search, filters)
+    descending = (orderby_dir or "desc").lower() != "asc"
+    query = query.order_by(*keyset_order(Result.__table__.c.date, Result.__table__.c.id, descending))
+
+    async def chunks():
+        # The session stays open until the response is sent (dependencies with yield);
+        # the statement timeout would cut a long export off mid-stream
+        async with statement_timeout_lifted(session, settings.SQL_STATEMENT_TIMEOUT_MS):
+            stream = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            try:
+                first = True
+                async for rows in stream.partitions():
+                    yield _encode_csv(rows, first) if format == "csv" else _encode_ndjson(rows)
+                    first = False
+                if first and format == "csv":
+                    yield _encode_csv([], True)
+            finally:
+                await stream.close()
+
+    filename = f"results.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"}
+    body = chunks()
+    if gzip:
+        body = _gzipped(body)
+        headers["Content-Encoding"] = "gzip"
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+# =========================================
+# GET RESULT STATS — Role Based Aggregates
+# =========================================
+@router.get("/stats", response_model=ResultStatsResponse)
+async def get_result_stats(
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_reader),
+    date_from: Optional[date] = Query(None, description="First day included (UTC)"),
+    date_to: Optional[date] = Query(None, description="Last day included (UTC)"),
+):
+    """
+    ✅ Dashboard statistics: totals and average confidence, broken down by
+    verdict, gender, age bucket, counselor and day.
+    - Admin → every result; counselor → results they created (both read the
+      result_stats aggregates, so the cost does not grow with results)
+    - User → their own results, aggregated directly (a handful of rows)
+    """
+    if date_from and date_to and date_from > date_to:
+        raise HTTPException(status_code=400, detail="date_from must not be after date_to")
+
+    if current_user.role == "user":
+        where = [Result.user_id == current_user.id]
+        if date_from:
+            where.append(Result.date >= datetime.combine(date_from, datetime.min.time()))
+        if date_to:
+            where.append(Result.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+        query = grouped_results_query(*where)
+    else:
+        query = stats_query(
+            created_by=current_user.id if current_user.role == "counselor" else None,
+            date_from=date_from,
+            date_to=date_to,
+        )
+    return summarize((await session.execute(query)).all())
+
+
 # =========================================
 # GET RESULT BY ID (with permissions)
 # =========================================
-@router.get("/{result_id}")
+@router.get("/{result_id}", response_model=ResultRead)
 async def get_result_by_id(
     result_id: int,
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_session),
+    current_user: User = Depends(get_current_reader),
 ):
     """
     ✅ Fetch a single result by ID
@@ -338,47 +651,27 @@ async def get_result_by_id(
     # ==========================================
     # 🚀 Fetch with JOIN (Result + User)
     # ==========================================
-    query = (
-        select(Result, User)
-        .join(User, User.id == Result.user_id)
-        .where(Result.id == result_id)
-    )
+    query = result_read_query().where(Result.id == result_id)
     result = await session.execute(query)
     row = result.first()
 
     if not row:
         raise HTTPException(status_code=404, detail="Result not found")
 
-    result_obj, user_obj = row
-
     # ==========================================
     # 🔐 Role-based Access Control
     # ==========================================
-    if current_user.role == "user" and result_obj.user_id != current_user.id:
+    if current_user.role == "user" and row.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    if current_user.role == "counselor" and result_obj.created_by != current_user.id:
+    if current_user.role == "counselor" and row.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="Access denied")
 
     # ==========================================
     # 🧩 Format and Return Dict
     # ==========================================
-    return {
-        "id": result_obj.id,
-        "user_id": result_obj.user_id,
-        "created_by": result_obj.created_by,
-        "age": result_obj.age,
-        "gender": result_obj.gender,
-        "result": result_obj.result,
-        "confidence": result_obj.confidence,
-        "images": result_obj.images,
-        "date": result_obj.date,
-        "user": {
-            "id": user_obj.id,
-            "name": user_obj.name,
-            "email": user_obj.email,
-        },
-    }
+    images = await load_result_images(session, [row.id])
+    return serialize_result_row(row, images[row.id])
 
 # =========================================
 # UPDATE RESULT (Admin or Owner Counselor)
@@ -406,8 +699,52 @@ async def update_result(
 
     session.add(result)
     await session.commit()
-    await session.refresh(result)
-    return result
+    count_cache.invalidate("results")
+    return serialize_result(result, (await load_result_images(session, [result.id]))[result.id])
+
+
+# =========================================
+# RE-SCORE RESULT (Admin or Owner Counselor)
+# =========================================
+@router.post("/{result_id}/rescore", response_model=ResultRead)
+async def rescore_result(
+    result_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """Re-run the model over a result's stored images (e.g. after a model update)."""
+    result = await session.get(Result, result_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    if current_user.role == "user":
+        raise HTTPException(status_code=403, detail="Users cannot re-score results")
+    if current_user.role == "counselor" and result.created_by != current_user.id:
+        raise HTTPException(status_code=403, detail="You can only re-score your own results")
+
+    images = (await session.execute(
+        select(ResultImage).where(ResultImage.result_id == result.id).order_by(ResultImage.position)
+    )).scalars().all()
+    stored = [image for image in images if is_blob_id(image.image)]
+    if not stored:
+        raise HTTPException(status_code=409, detail="Result has no stored images to re-score")
+
+    # Fetch all model inputs concurrently, then score
+    model_inputs = await asyncio.gather(*(blob_store.read_model_input(image.image) for image in stored))
+    predictions, confidences = [], []
+    for image, data in zip(stored, model_inputs):
+        img_array = await run_in_threadpool(preprocess_image, io.BytesIO(data))
+        label, conf = await run_in_threadpool(predict_array, img_array)
+        predictions.append(label)
+        confidences.append(conf)
+        image.label, image.confidence = label, round(conf * 100, 2)
+        session.add(image)
+
+    result.result, result.confidence = final_verdict(predictions, confidences)
+    session.add(result)
+    await session.commit()
+    count_cache.invalidate("results")
+    return serialize_result(result, images)
 
 
 # =========================================
@@ -430,13 +767,14 @@ async def delete_result(
     if current_user.role == "counselor" and result.created_by != current_user.id:
         raise HTTPException(status_code=403, detail="You can only delete your own results")
 
-    # Delete files from storage
-    for img in result.images or []:
-        try:
-            os.remove(img)
-        except FileNotFoundError:
-            pass
-
+    # Files are released by the background collector, not in the request
+    images = (await session.execute(
+        select(ResultImage.image).where(ResultImage.result_id == result.id)
+    )).scalars().all()
+    await enqueue_storage_job(session, "release_images", {"images": list(images)})
+    await session.execute(delete(ResultImage).where(ResultImage.result_id == result.id))
     await session.delete(result)
     await session.commit()
+    count_cache.invalidate("results")
+    storage_collector.wake()
     return None
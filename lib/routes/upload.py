@@ -0,0 +1,212 @@
+import base64
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from lib.config.database import get_async_session
+from lib.config.settings import settings
+from lib.models.sql import User, UploadSession
+from lib.routes.user import get_current_user
+from lib.storage import chunk_store, sniff_image_format
+
+router = APIRouter(prefix="/sessions", tags=["Uploads"])
+
+UPLOAD_PATH = "/api/v1/upload/sessions"
+TUS_VERSION = "1.0.0"
+TUS_HEADERS = {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store"}
+
+
+def _expires_header(value: datetime) -> str:
+    return value.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+
+def _parse_metadata(raw: Optional[str]) -> dict:
+    """tus Upload-Metadata: comma-separated `key base64value` pairs."""
+    metadata = {}
+    for pair in filter(None, (p.strip() for p in (raw or "").split(","))):
+        key, _, value = pair.partition(" ")
+        try:
+            metadata[key] = base64.b64decode(value).decode() if value else ""
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid Upload-Metadata value for {key!r}")
+    return metadata
+
+
+async def _get_owned(session: AsyncSession, upload_id: str, owner_id: int, lock: bool = False) -> UploadSession:
+    query = select(UploadSession).where(UploadSession.id == upload_id)
+    if lock:
+        query = query.with_for_update()
+    upload = (await session.execute(query)).scalar_one_or_none()
+    if not upload or upload.owner_id != owner_id or upload.expires_at < datetime.utcnow():
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+# =========================================
+# DISCOVERY
+# =========================================
+@router.options("/")
+async def upload_options():
+    """✅ Advertise the supported tus version, extensions and size limit."""
+    return Response(status_code=204, headers={
+        **TUS_HEADERS,
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": "creation,expiration,termination",
+        "Tus-Max-Size": str(settings.UPLOAD_MAX_BYTES),
+    })
+
+
+# =========================================
+# CREATE UPLOAD SESSION
+# =========================================
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_upload(
+    upload_length: int = Header(..., alias="Upload-Length", ge=1),
+    upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ✅ Start a resumable upload of one image.
+    - `Upload-Length`: total size in bytes (at most UPLOAD_MAX_BYTES).
+    - `Upload-Metadata`: optional, e.g. `filename <base64>`.
+    Returns the session URL in `Location`; send the bytes there with PATCH.
+    """
+    if upload_length > settings.UPLOAD_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Upload is {upload_length} bytes, limit is {settings.UPLOAD_MAX_BYTES}",
+        )
+    filename = _parse_metadata(upload_metadata).get("filename")
+
+    upload = UploadSession(
+        id=uuid.uuid4().hex,
+        owner_id=current_user.id,
+        filename=filename[:255] if filename else None,
+        length=upload_length,
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS),
+    )
+    session.add(upload)
+    await session.commit()
+
+    location = f"{UPLOAD_PATH}/{upload.id}"
+    return Response(status_code=201, headers={
+        **TUS_HEADERS,
+        "Location": location,
+        "Upload-Offset": "0",
+        "Upload-Expires": _expires_header(upload.expires_at),
+    })
+
+
+# =========================================
+# QUERY OFFSET
+# =========================================
+@router.head("/{upload_id}")
+async def get_upload_offset(
+    upload_id: str,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """✅ Current `Upload-Offset` of a session: resume PATCHing from there."""
+    upload = await _get_owned(session, upload_id, current_user.id)
+    return Response(status_code=200, headers={
+        **TUS_HEADERS,
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Upload-Expires": _expires_header(upload.expires_at),
+    })
+
+
+# =========================================
+# APPEND CHUNK
+# =========================================
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    content_type: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    ✅ Append bytes at `Upload-Offset` (must equal the current offset, else 409).
+    Body: `application/offset+octet-stream`, at most UPLOAD_CHUNK_MAX_BYTES.
+    The first chunk is checked against the allowed image formats right away.
+    """
+    if content_type != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream")
+
+    owner_id = current_user.id
+    upload = await _get_owned(session, upload_id, owner_id)
+    if upload_offset != upload.offset:
+        raise HTTPException(status_code=409, detail=f"Upload-Offset mismatch, current offset is {upload.offset}")
+    limit = min(settings.UPLOAD_CHUNK_MAX_BYTES, upload.length - upload.offset)
+    filename = upload.filename or "upload"
+    # Release the connection while the body trickles in over a slow link
+    await session.rollback()
+
+    body = bytearray()
+    async for part in request.stream():
+        body.extend(part)
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+    if not body:
+        raise HTTPException(status_code=400, detail="Empty chunk")
+    if upload_offset == 0:
+        fmt = sniff_image_format(bytes(body[:16]))
+        if fmt not in settings.UPLOAD_ALLOWED_FORMATS:
+            raise HTTPException(status_code=422, detail=f"{filename}: not an accepted image format")
+
+    # Row lock serialises concurrent PATCHes of one session; the loser sees 409
+    upload = await _get_owned(session, upload_id, owner_id, lock=True)
+    if upload_offset != upload.offset:
+        raise HTTPException(status_code=409, detail=f"Upload-Offset mismatch, current offset is {upload.offset}")
+    await chunk_store.put(upload.id, upload.offset, bytes(body))
+    upload.offset += len(body)
+    upload.expires_at = datetime.utcnow() + timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+    session.add(upload)
+    await session.commit()
+
+    return Response(status_code=204, headers={
+        **TUS_HEADERS,
+        "Upload-Offset": str(upload.offset),
+        "Upload-Expires": _expires_header(upload.expires_at),
+    })
+
+
+# =========================================
+# TERMINATE
+# =========================================
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_upload(
+    upload_id: str,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(get_current_user),
+):
+    """✅ Abandon an upload and delete its chunks."""
+    upload = await _get_owned(session, upload_id, current_user.id)
+    await session.execute(delete(UploadSession).where(UploadSession.id == upload.id))
+    await session.commit()
+    await chunk_store.discard(upload.id)
+    return Response(status_code=204, headers=TUS_HEADERS)
+
+
+async def claim_uploads(session: AsyncSession, uploads: list) -> None:
+    """
+    Delete finished sessions in the caller's transaction, so a concurrent
+    finalize of the same uploads fails instead of creating a second result.
+    """
+    claimed = await session.execute(
+        delete(UploadSession).where(
+            UploadSession.id.in_([u.id for u in uploads]),
+            UploadSession.offset == UploadSession.length,
+        )
+    )
+    if claimed.rowcount != len(uploads):
+        raise HTTPException(status_code=409, detail="Uploads were already finalized")
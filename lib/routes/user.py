@@ -1,4 +1,5 @@
 import random
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Header, status, Query
 from sqlmodel import select
 from sqlalchemy import text
@@ -8,17 +9,27 @@ from passlib.context import CryptContext
 import json
 
 
-from lib.config.database import get_async_session
-from lib.models.sql import User
-from lib.schemas import UserCreate, UserRead, UserUpdate, UserLogin
+from lib.config.database import get_async_session, get_read_session, async_session, async_engine
+from lib.models.sql import Result, User
+from lib.schemas import UserCreate, UserRead, UserUpdate, UserLogin, PaginatedUserResponse
 from pydantic import BaseModel
-from lib.utils import create_access_token, verify_access_token, send_email
+from lib.utils import create_access_token, verify_access_token, send_email, count_cache, filtered_total, estimated_total
+from lib.storage.collector import storage_collector, enqueue_storage_job
+from lib.search import matching_user_ids, order_by_relevance
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 MAX_BCRYPT_LENGTH = 72
 
+# UserRead fields, selected as plain columns (never password / otp_code)
+USER_READ_COLUMNS = tuple(User.__table__.c[name] for name in ("id", "name", "email", "role", "created_at"))
+
+
+def user_row_to_dict(row) -> dict:
+    mapping = row._mapping
+    return {column.name: mapping[column] for column in USER_READ_COLUMNS}
+
 
 # ==============================
 # Schemas
@@ -54,10 +65,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 # ==============================
 # Auth helper
 # ==============================
-async def get_current_user(
-    Authorization: Optional[str] = Header(None),
-    session: AsyncSession = Depends(get_async_session),
-):
+async def _load_current_user(Authorization: Optional[str], session: AsyncSession) -> User:
     if not Authorization:
         raise HTTPException(status_code=401, detail="Authorization header missing")
 
@@ -69,7 +77,11 @@ async def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid token payload")
 
         user = await session.get(User, user_id)
-        if not user:
+        if not user and session.bind is not async_engine:
+            # Not replicated yet (e.g. just registered): ask the primary
+            async with async_session() as primary:
+                user = await primary.get(User, user_id)
+        if not user or user.deleted_at is not None:
             raise HTTPException(status_code=404, detail="User not found")
 
         return user
@@ -77,6 +89,35 @@ async def get_current_user(
         raise HTTPException(status_code=401, detail=str(e))
 
 
+async def get_current_user(
+    Authorization: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await _load_current_user(Authorization, session)
+
+
+async def get_current_reader(
+    Authorization: Optional[str] = Header(None),
+    session: AsyncSession = Depends(get_read_session),
+):
+    """get_current_user for read-only endpoints: resolved on the same (replica) session they read from."""
+    return await _load_current_user(Authorization, session)
+
+
+def get_token_payload(Authorization: Optional[str] = Header(None)) -> dict:
+    """
+    Verify the Bearer token without touching the database.
+    Use for long-lived responses (e.g. SSE) that must not pin a DB connection.
+    """
+    if not Authorization:
+        raise HTTPException(status_code=401, detail="Authorization header missing")
+
+    payload = verify_access_token(Authorization.replace("Bearer ", ""))
+    if not payload.get("id"):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    return payload
+
+
 # ==============================
 # Register User — with OTP
 # ==============================
@@ -234,6 +275,7 @@ async def register_user(user_data: UserCreate, session: AsyncSession = Depends(g
 
     session.add(new_user)
     await session.commit()
+    count_cache.invalidate("users")
     await session.refresh(new_user)
 
     # -------------------------
@@ -278,7 +320,7 @@ async def verify_otp(payload: VerifyOtpRequest, session: AsyncSession = Depends(
     email = payload.email
     otp_code = payload.otp_code
 
-    result = await session.execute(select(User).where(User.email == email))
+    result = await session.execute(select(User).where(User.email == email, User.deleted_at.is_(None)))
     user = result.scalar_one_or_none()
 
     if not user:
@@ -294,6 +336,7 @@ async def verify_otp(payload: VerifyOtpRequest, session: AsyncSession = Depends(
     user.otp_code = None
     session.add(user)
     await session.commit()
+    count_cache.invalidate("users")
     await session.refresh(user)
 
     token = create_access_token({"id": user.id, "email": user.email, "role": user.role})
@@ -312,7 +355,7 @@ async def verify_otp(payload: VerifyOtpRequest, session: AsyncSession = Depends(
 async def resend_otp(payload: ResendOtpRequest, session: AsyncSession = Depends(get_async_session)):
     """Resend a new OTP to unverified users."""
     email = payload.email
-    result = await session.execute(select(User).where(User.email == email))
+    result = await session.execute(select(User).where(User.email == email, User.deleted_at.is_(None)))
     user = result.scalar_one_or_none()
 
     if not user:
@@ -349,7 +392,7 @@ async def resend_otp(payload: ResendOtpRequest, session: AsyncSession = Depends(
 @router.post("/login", status_code=status.HTTP_200_OK)
 async def login_user(user_data: UserLogin, session: AsyncSession = Depends(get_async_session)):
     """Login with email and password (requires OTP verification for normal users)."""
-    result = await session.execute(select(User).where(User.email == user_data.email))
+    result = await session.execute(select(User).where(User.email == user_data.email, User.deleted_at.is_(None)))
     user = result.scalar_one_or_none()
 
     if not user or not verify_password(user_data.password, user.password):
@@ -382,21 +425,28 @@ async def get_me(current_user: User = Depends(get_current_user)):
 # ==============================
 # Get All Users
 # ==============================
-@router.get("/")
+@router.get("/", response_model=PaginatedUserResponse)
 async def list_users(
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_session),
     page: int = Query(1, ge=1, description="Page number, starts from 1"),
     limit: int = Query(10, ge=1, le=100, description="Number of records per page"),
     search: Optional[str] = Query(None, description="Search by name or email"),
     filters: Optional[str] = Query(None, description="Filters as JSON string, e.g. {'role':'user'}"),
-    orderby_col: Optional[str] = Query("created_at", description="Column to order by"),
+    orderby_col: Optional[str] = Query(
+        None, description="Column to order by, or `relevance` (default when searching, else created_at)"
+    ),
     orderby_dir: Optional[str] = Query("desc", description="Order direction: asc or desc"),
+    count: str = Query(
+        "exact", pattern="^(exact|estimate)$",
+        description="`estimate` uses table statistics for unfiltered listings instead of counting",
+    ),
 ):
     """
     List users with pagination, search, filtering, and ordering.
+    `total` respects search and filters and is cached per scope (see CountCache).
     """
 
-    query = select(User)
+    query = select(*USER_READ_COLUMNS).where(User.deleted_at.is_(None))
 
     # ✅ Parse filters (string → dict)
     filter_dict = {}
@@ -407,19 +457,22 @@ async def list_users(
             raise HTTPException(status_code=400, detail="Invalid JSON in filters parameter")
 
     # ✅ Apply filters dynamically
+    applied_filters = {}
     for key, value in filter_dict.items():
         if hasattr(User, key):
             query = query.where(getattr(User, key) == value)
-
-    # ✅ Apply search
-    if search:
-        search_term = f"%{search.lower()}%"
-        query = query.where(
-            (User.name.ilike(search_term)) | (User.email.ilike(search_term))
-        )
-
-    # ✅ Apply ordering
-    if hasattr(User, orderby_col):
+            applied_filters[key] = value
+
+    # ✅ Apply search (trigram index, see lib/search)
+    if search and search.strip():
+        query = query.where(User.id.in_(matching_user_ids(search)))
+
+    # ✅ Apply ordering (best matches first when searching, unless told otherwise)
+    if orderby_col is None:
+        orderby_col = "relevance" if search and search.strip() else "created_at"
+    if orderby_col == "relevance" and search and search.strip():
+        query = order_by_relevance(query, search)
+    elif hasattr(User, orderby_col):
         order_column = getattr(User, orderby_col)
         if orderby_dir.lower() == "asc":
             query = query.order_by(order_column.asc())
@@ -428,26 +481,36 @@ async def list_users(
     else:
         query = query.order_by(User.created_at.desc())
 
+    # ✅ Total: cached, estimated, or a separate COUNT (the page query keeps its indexed LIMIT)
+    scope = ((search or "").lower(), json.dumps(applied_filters, sort_keys=True, default=str))
+    estimated = False
+    total = None
+    if count == "estimate" and not search and not applied_filters:
+        total = await estimated_total(session, User.__tablename__)
+        estimated = total is not None
+    if total is None:
+        total = count_cache.get(User.__tablename__, scope)
+    if total is None:
+        total = await filtered_total(session, query, User.id)
+        count_cache.set(User.__tablename__, scope, total)
+
     # ✅ Pagination
     offset = (page - 1) * limit
     query = query.offset(offset).limit(limit)
 
     # ✅ Execute
     result = await session.execute(query)
-    users = result.scalars().all()
-
-    # ✅ Count total
-    count_result = await session.execute(select(text("COUNT(*) FROM users")))
-    total = count_result.scalar_one()
+    rows = result.all()
 
     # ✅ Return metadata + data
     return {
         "page": page,
         "limit": limit,
         "total": total,
+        "estimated": estimated,
         "pages": (total // limit) + (1 if total % limit else 0),
-        "count": len(users),
-        "data": [UserRead.model_validate(u) for u in users],
+        "count": len(rows),
+        "data": [user_row_to_dict(row) for row in rows],
     }
 
 
@@ -455,12 +518,14 @@ async def list_users(
 # Get Single User by ID
 # ==============================
 @router.get("/{user_id}", response_model=UserRead)
-async def get_user(user_id: int, session: AsyncSession = Depends(get_async_session)):
+async def get_user(user_id: int, session: AsyncSession = Depends(get_read_session)):
     """Get user by ID"""
-    user = await session.get(User, user_id)
-    if not user:
+    row = (await session.execute(
+        select(*USER_READ_COLUMNS).where(User.id == user_id, User.deleted_at.is_(None))
+    )).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return user_row_to_dict(row)
 
 
 # ==============================
@@ -480,6 +545,7 @@ async def update_user(user_id: int, user_data: UserUpdate, session: AsyncSession
 
     session.add(user)
     await session.commit()
+    count_cache.invalidate("users")
     await session.refresh(user)
     return user
 
@@ -487,13 +553,37 @@ async def update_user(user_id: int, user_data: UserUpdate, session: AsyncSession
 # ==============================
 # Delete User
 # ==============================
-@router.delete("/{user_id}", status_code=status.HTTP_200_OK)
+@router.delete("/{user_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_user(user_id: int, session: AsyncSession = Depends(get_async_session)):
-    """Delete user by ID"""
-    user = await session.get(User, user_id)
+    """
+    Schedule user deletion.
+    The user is locked out and hidden at once; the background collector then
+    removes their results, images, profile and the user row.
+    """
+    user = (await session.execute(select(User).where(User.id == user_id).with_for_update())).scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    if user.deleted_at is not None:
+        return {"message": "User deletion already scheduled"}
+
+    # Results they created for other patients are handed to another admin when purged
+    created_for_others = (await session.execute(
+        select(Result.id).where(Result.created_by == user_id, Result.user_id != user_id).limit(1)
+    )).first()
+    if created_for_others:
+        other_admin = (await session.execute(
+            select(User.id).where(User.role == "admin", User.id != user_id, User.deleted_at.is_(None)).limit(1)
+        )).first()
+        if not other_admin:
+            raise HTTPException(
+                status_code=409,
+                detail="User created results for other patients and there is no other admin to reassign them to",
+            )
 
-    await session.delete(user)
+    user.deleted_at = datetime.utcnow()
+    session.add(user)
+    await enqueue_storage_job(session, "purge_user", {"user_id": user_id})
     await session.commit()
-    return {"message": "User deleted successfully"}
+    count_cache.invalidate("users")
+    storage_collector.wake()
+    return {"message": "User deletion scheduled"}
@@ -1,5 +1,5 @@
-from .profile import ProfileBase, ProfileCreate, ProfileRead, ProfileUpdate
-from .user import UserCreate, UserRead, UserRole, UserUpdate, UserLogin
-from .result import ResultBase, ResultCreate, ResultRead, PaginatedResultResponse
+from .profile import ProfileBase, ProfileCreate, ProfileRead, ProfileUpdate, ProfileUser, ProfileListItem, CursorProfileResponse
+from .user import UserCreate, UserRead, UserRole, UserUpdate, UserLogin, PaginatedUserResponse
+from .result import ResultBase, ResultCreate, ResultFromUploads, ResultRead, ResultImagePrediction, ResultUser, PaginatedResultResponse, CursorResultResponse, ResultStatsResponse
 
-__all__ = [ProfileBase, ProfileCreate, ProfileRead, ProfileUpdate, UserCreate, UserRead, UserRole, UserUpdate, UserLogin, ResultBase, ResultCreate, ResultRead, PaginatedResultResponse]
\ No newline at end of file
+__all__ = [ProfileBase, ProfileCreate, ProfileRead, ProfileUpdate, ProfileUser, ProfileListItem, CursorProfileResponse, UserCreate, UserRead, UserRole, UserUpdate, UserLogin, PaginatedUserResponse, ResultBase, ResultCreate, ResultFromUploads, ResultRead, ResultImagePrediction, ResultUser, PaginatedResultResponse, CursorResultResponse, ResultStatsResponse]
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -24,3 +24,20 @@ class ProfileRead(ProfileBase):
 
     class Config:
         from_attributes = True  # ✅ For ORM mode (Pydantic v2)
+
+
+class ProfileUser(BaseModel):
+    id: int
+    name: str
+    email: str
+
+
+class ProfileListItem(ProfileRead):
+    user: Optional[ProfileUser] = None  # with include_user=true
+
+
+class CursorProfileResponse(BaseModel):
+    limit: int
+    count: int
+    next_cursor: Optional[str] = None
+    data: List[ProfileListItem]
@@ -1,7 +1,7 @@
 # lib/schemas/result_schema.py
-from typing import Optional, List
-from datetime import datetime
-from pydantic import BaseModel, EmailStr
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from pydantic import BaseModel, EmailStr, Field
 
 class ResultBase(BaseModel):
     email: EmailStr
@@ -12,16 +12,36 @@ class ResultBase(BaseModel):
 class ResultCreate(ResultBase):
     pass
 
+class ResultFromUploads(ResultBase):
+    upload_ids: List[str] = Field(..., min_length=1)
+    submission_id: Optional[str] = Field(None, max_length=64)
+
+class ResultUser(BaseModel):
+    id: int
+    name: str
+    email: str
+
+
+class ResultImagePrediction(BaseModel):
+    content_hash: str | None = None
+    label: str | None = None
+    confidence: float | None = None
+
+
 class ResultRead(BaseModel):
     id: int
     user_id: int
     created_by: int
-    age: int
-    gender: str
+    age: int | None = None
+    gender: str | None = None
     result: str | None = None
     confidence: float | None = None
     images: List[str] = []
+    thumbnails: List[str] = []
+    previews: List[str] = []
+    image_predictions: List[ResultImagePrediction] = []  # aligned with images
     date: datetime
+    user: ResultUser | None = None
 
     class Config:
         from_attributes = True
@@ -31,6 +51,34 @@ class PaginatedResultResponse(BaseModel):
     page: int
     limit: int
     total: int
+    estimated: bool = False
     pages: int
     count: int
-    data: List[ResultRead]
\ No newline at end of file
+    data: List[ResultRead]
+
+
+class CursorResultResponse(BaseModel):
+    limit: int
+    count: int
+    next_cursor: Optional[str] = None
+    data: List[ResultRead]
+
+
+class CounselorCount(BaseModel):
+    counselor_id: int
+    count: int
+
+
+class DayCount(BaseModel):
+    day: date
+    count: int
+
+
+class ResultStatsResponse(BaseModel):
+    total: int
+    average_confidence: float | None = None
+    by_result: Dict[str, int] = {}
+    by_gender: Dict[str, int] = {}
+    by_age_bucket: Dict[str, int] = {}
+    by_counselor: List[CounselorCount] = []
+    by_day: List[DayCount] = []
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 from pydantic import BaseModel, EmailStr
@@ -33,6 +33,16 @@ class UserRead(UserBase):
         from_attributes = True  # ✅ Pydantic v2 compatible
 
 
+class PaginatedUserResponse(BaseModel):
+    page: int
+    limit: int
+    total: int
+    estimated: bool = False
+    pages: int
+    count: int
+    data: List[UserRead]
+
+
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -0,0 +1,129 @@
+"""
+Indexed substring search over users (name, email).
+
+Every User insert / update rewrites its rows in user_search_trigrams (via
+ORM events, so all write paths are covered). A query of 3+ characters is
+answered from that table: users holding every trigram of the term are the
+candidates, which are then verified with a LIKE on just those rows. Shorter
+terms use trigram / column prefixes. Matches are ranked exact > prefix >
+substring, shorter names first.
+"""
+from typing import Iterable, List, Set
+
+from sqlalchemy import case, delete, distinct, event, func, inspect, or_, select
+from sqlalchemy.engine import Connection
+
+from lib.models.sql import User, UserSearchTrigram
+
+# Appended to each field so a short term at the very end still has a trigram
+END_MARK = "$"
+SEARCH_FIELDS = ("name", "email")
+
+
+def field_trigrams(value: str) -> Set[str]:
+    text = (value or "").lower() + END_MARK
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def user_trigrams(name: str, email: str) -> Set[str]:
+    return field_trigrams(name) | field_trigrams(email)
+
+
+def term_trigrams(term: str) -> Set[str]:
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+# =========================================
+# Index maintenance
+# =========================================
+def write_user_trigrams(connection: Connection, rows: Iterable[tuple], replace: bool = True):
+    """(user_id, name, email) rows → user_search_trigrams. Sync; runs inside the caller's transaction."""
+    rows = list(rows)
+    if not rows:
+        return
+    if replace:
+        connection.execute(delete(UserSearchTrigram).where(UserSearchTrigram.user_id.in_([r[0] for r in rows])))
+    values = [
+        {"trigram": gram, "user_id": user_id}
+        for user_id, name, email in rows
+        for gram in user_trigrams(name, email)
+    ]
+    if values:
+        connection.execute(UserSearchTrigram.__table__.insert(), values)
+
+
+@event.listens_for(User, "after_insert")
+def _index_new_user(mapper, connection, target):
+    write_user_trigrams(connection, [(target.id, target.name, target.email)], replace=False)
+
+
+@event.listens_for(User, "after_update")
+def _reindex_user(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in SEARCH_FIELDS):
+        write_user_trigrams(connection, [(target.id, target.name, target.email)])
+
+
+@event.listens_for(User, "before_delete")
+def _unindex_user(mapper, connection, target):
+    connection.execute(delete(UserSearchTrigram).where(UserSearchTrigram.user_id == target.id))
+
+
+# =========================================
+# Queries
+# =========================================
+def matching_user_ids(term: str):
+    """Subquery of ids of users whose name or email contains `term` (case-insensitive)."""
+    term = term.strip().lower()
+    escaped = _escape_like(term)
+    if len(term) >= 3:
+        grams: List[str] = sorted(term_trigrams(term))
+        candidates = (
+            select(UserSearchTrigram.user_id)
+            .where(UserSearchTrigram.trigram.in_(grams))
+            .group_by(UserSearchTrigram.user_id)
+            .having(func.count(distinct(UserSearchTrigram.trigram)) == len(grams))
+        )
+    elif len(term) == 2:
+        # Every occurrence of a 2-char term starts some trigram (END_MARK covers the tail)
+        candidates = select(UserSearchTrigram.user_id).where(
+            UserSearchTrigram.trigram.like(f"{escaped}%", escape="\\")
+        ).distinct()
+    else:
+        # Single character: prefix only, served by the name / email indexes
+        return select(User.id).where(or_(
+            User.name.like(f"{escaped}%", escape="\\"),
+            User.email.like(f"{escaped}%", escape="\\"),
+        ))
+
+    pattern = f"%{escaped}%"
+    return select(User.id).where(
+        User.id.in_(candidates),
+        or_(User.name.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\")),
+    )
+
+
+def user_relevance(term: str):
+    """Rank expression: 3 exact, 2 prefix, 1 substring match on name or email."""
+    term = term.strip().lower()
+    escaped = _escape_like(term)
+    name, email = func.lower(User.name), func.lower(User.email)
+    return case(
+        (or_(name == term, email == term), 3),
+        (or_(name.like(f"{escaped}%", escape="\\"), email.like(f"{escaped}%", escape="\\")), 2),
+        else_=1,
+    )
+
+
+def order_by_relevance(query, term: str):
+    return query.order_by(user_relevance(term).desc(), func.length(User.name), User.id)
+
+
+__all__ = [
+    "field_trigrams", "user_trigrams", "term_trigrams", "write_user_trigrams",
+    "matching_user_ids", "user_relevance", "order_by_relevance",
+]
@@ -0,0 +1,209 @@
+"""
+Incremental columnar snapshots of results and users for analytics.
+
+Each run exports the rows whose (updated_at, id) is past the table's
+watermark into zstd-compressed Parquet files, partitioned by the day the
+rows changed, and records the files, the new watermark and the run's
+throughput in a compact manifest. Analysts query the files locally (DuckDB,
+pandas, Spark, ...) instead of the OLTP database. Rows are read from the
+primary in keyset pages of SNAPSHOT_BATCH_ROWS: the run's upper bound comes
+from the clock, and a lagging replica could still be missing rows below it
+that the watermark would then skip for good.
+
+    SNAPSHOT_DIR/manifest.json
+    SNAPSHOT_DIR/results/updated_date=2026-10-19/part-20261019T120000000000Z.parquet
+    SNAPSHOT_DIR/users/updated_date=.../part-....parquet
+
+A row that changes again is exported again by a later run: keep the latest
+updated_at per id. updated_at is stamped when the row is flushed, not when
+it commits, so rows changed within SNAPSHOT_LAG_SECONDS wait for the next
+run: a row whose transaction commits within SNAPSHOT_LAG_SECONDS of its
+flush is never skipped by the watermark. A longer-running transaction can
+land behind it and is only picked up by `--full`, as are hard deletes;
+`--full` rewrites every table and removes the files it no longer lists.
+
+    python -m lib.snapshots [--full]   # e.g. hourly from cron
+"""
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import and_, or_, select
+from sqlalchemy.engine import Connection
+
+from lib.config.settings import settings
+from lib.models.sql import Result, User
+
+logger = logging.getLogger("snapshots")
+
+MANIFEST = "manifest.json"
+MANIFEST_RUNS_KEPT = 20
+
+# Exported columns and their Arrow types; users never include password / otp_code
+SNAPSHOT_TABLES = {
+    "results": (Result.__table__, pa.schema([
+        ("id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("created_by", pa.int64()),
+        ("age", pa.int32()),
+        ("gender", pa.string()),
+        ("result", pa.string()),
+        ("confidence", pa.float64()),
+        ("date", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])),
+    "users": (User.__table__, pa.schema([
+        ("id", pa.int64()),
+        ("name", pa.string()),
+        ("email", pa.string()),
+        ("role", pa.string()),
+        ("otp_verified", pa.bool_()),
+        ("created_at", pa.timestamp("us")),
+        ("updated_at", pa.timestamp("us")),
+    ])),
+}
+
+
+def _value(value):
+    return value.value if isinstance(value, Enum) else value
+
+
+def load_manifest(root: Path) -> dict:
+    path = root / MANIFEST
+    if not path.exists():
+        return {"version": 1, "tables": {}, "runs": []}
+    return json.loads(path.read_text())
+
+
+def _write_manifest(root: Path, manifest: dict):
+    tmp = root / (MANIFEST + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, default=str))
+    os.replace(tmp, root / MANIFEST)  # readers never see a half-written manifest
+
+
+def snapshot_table(connection: Connection, name: str, state: dict, upper: datetime, run_id: str, root: Path) -> dict:
+    """
+    Export `name`'s rows changed after state["watermark"] and before `upper`.
+    Updates `state` (watermark, files) in place and returns the run's counters. Sync.
+    """
+    table, schema = SNAPSHOT_TABLES[name]
+    columns = [table.c[field.name] for field in schema]
+    updated_at, row_id = table.c.updated_at, table.c.id
+    watermark = state.get("watermark")
+
+    writers: Dict[str, pq.ParquetWriter] = {}
+    counts: Dict[str, int] = defaultdict(int)
+    started = time.perf_counter()
+    rows_total = 0
+    completed = False
+    try:
+        while True:
+            query = select(*columns).where(updated_at < upper)
+            if watermark:
+                since = datetime.fromisoformat(watermark["updated_at"])
+                query = query.where(or_(updated_at > since, and_(updated_at == since, row_id > watermark["id"])))
+            rows = connection.execute(query.order_by(updated_at, row_id).limit(settings.SNAPSHOT_BATCH_ROWS)).all()
+            if not rows:
+                break
+
+            partitions = defaultdict(list)
+            for row in rows:
+                partitions[row.updated_at.date().isoformat()].append(row)
+            for day, part in partitions.items():
+                if day not in writers:
+                    directory = root / name / f"updated_date={day}"
+                    directory.mkdir(parents=True, exist_ok=True)
+                    writers[day] = pq.ParquetWriter(
+                        directory / f"part-{run_id}.parquet.tmp", schema, compression=settings.SNAPSHOT_COMPRESSION,
+                    )
+                writers[day].write_batch(pa.RecordBatch.from_pydict(
+                    {field.name: [_value(getattr(row, field.name)) for row in part] for field in schema}, schema=schema,
+                ))
+                counts[day] += len(part)
+
+            rows_total += len(rows)
+            last = rows[-1]
+            watermark = {"updated_at": last.updated_at.isoformat(), "id": last.id}
+        completed = True
+    finally:
+        for writer in writers.values():
+            writer.close()
+        if not completed:
+            for day in writers:
+                (root / name / f"updated_date={day}" / f"part-{run_id}.parquet.tmp").unlink(missing_ok=True)
+
+    files, bytes_total = [], 0
+    for day in sorted(writers):
+        path = root / name / f"updated_date={day}" / f"part-{run_id}.parquet"
+        os.replace(path.with_name(path.name + ".tmp"), path)
+        size = path.stat().st_size
+        bytes_total += size
+        files.append({"path": path.relative_to(root).as_posix(), "rows": counts[day], "bytes": size, "run": run_id})
+
+    state["watermark"] = watermark
+    state.setdefault("files", []).extend(files)
+    state["rows"] = state.get("rows", 0) + rows_total
+    state["columns"] = schema.names
+    seconds = time.perf_counter() - started
+    return {
+        "rows": rows_total,
+        "files": len(files),
+        "bytes": bytes_total,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows_total / seconds) if seconds else 0,
+        "mb_per_second": round(bytes_total / seconds / 1e6, 3) if seconds else 0.0,
+    }
+
+
+def _remove_unlisted(root: Path, manifest: dict):
+    listed = {f["path"] for state in manifest["tables"].values() for f in state.get("files", [])}
+    for name in SNAPSHOT_TABLES:
+        for path in (root / name).rglob("*.parquet*"):
+            if path.relative_to(root).as_posix() not in listed:
+                path.unlink()
+
+
+async def run_snapshot(full: bool = False, root: Optional[Path] = None) -> dict:
+    """One snapshot run over every table; returns its throughput report."""
+    from lib.config.database import async_engine
+
+    root = Path(root or settings.SNAPSHOT_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    manifest = load_manifest(root)
+    if full:
+        manifest = {"version": 1, "tables": {}, "runs": manifest.get("runs", [])}
+    started = datetime.utcnow()
+    run_id = started.strftime("%Y%m%dT%H%M%S%fZ")
+    upper = started - timedelta(seconds=settings.SNAPSHOT_LAG_SECONDS)
+
+    report = {}
+    try:
+        async with async_engine.connect() as conn:
+            for name in SNAPSHOT_TABLES:
+                state = manifest["tables"].setdefault(name, {})
+                report[name] = await conn.run_sync(snapshot_table, name, state, upper, run_id, root)
+    except BaseException:
+        # The manifest is not written: drop the files earlier tables of this run already published
+        for path in root.glob(f"*/updated_date=*/part-{run_id}.parquet"):
+            path.unlink()
+        raise
+
+    manifest["updated_at"] = started.isoformat()
+    manifest["runs"] = (manifest.get("runs", []) + [{"run": run_id, "full": full, **report}])[-MANIFEST_RUNS_KEPT:]
+    _write_manifest(root, manifest)
+    if full:
+        _remove_unlisted(root, manifest)
+    for name, counters in report.items():
+        logger.info("Snapshot %s %s: %s", run_id, name, counters)
+    return report
+
+
+__all__ = ["SNAPSHOT_TABLES", "load_manifest", "snapshot_table", "run_snapshot"]
@@ -0,0 +1,17 @@
+import argparse
+import asyncio
+import logging
+
+from lib.snapshots import __doc__ as DOC, run_snapshot
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description=DOC, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="re-export everything (picks up deleted rows)")
+    args = parser.parse_args()
+    report = asyncio.run(run_snapshot(full=args.full))
+    for name, counters in report.items():
+        print(
+            f"{name:8} {counters['rows']} rows in {counters['files']} file(s), {counters['bytes']} bytes, "
+            f"{counters['seconds']}s ({counters['rows_per_second']} rows/s, {counters['mb_per_second']} MB/s)"
+        )
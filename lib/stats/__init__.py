@@ -0,0 +1,376 @@
+"""
+Result statistics for dashboards, served from result_stats.
+
+Every Result insert / update / delete adjusts its (day, counselor, verdict,
+gender, age bucket) row in the same transaction: ORM events collect the
+deltas per session and one upsert applies them after each flush. Bulk Core
+writes (the storage collector's user purge) go through shift_result_stats.
+reconcile_result_stats() recomputes the table from results and fixes drift; StatsReconciler runs it every RESULT_STATS_RECONCILE_INTERVAL_SECONDS.
+
+    python -m lib.stats   # one reconciliation pass
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, event, func, inspect, literal_column, select, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from lib.config.settings import settings
+from lib.models.sql import Result, ResultStat
+
+logger = logging.getLogger("results.stats")
+
+# (upper bound exclusive, label); older patients fall into "70+"
+AGE_BUCKETS = ((18, "0-17"), (30, "18-29"), (40, "30-39"), (50, "40-49"), (60, "50-59"), (70, "60-69"))
+TEXT_LENGTH = 32
+DELTAS_KEY = "result_stat_deltas"
+RECONCILE_BATCH_IDS = 50_000  # results ids per GROUP BY, so no statement nears SQL_STATEMENT_TIMEOUT_MS
+
+StatKey = Tuple[date, int, str, str, str]
+STAT = ResultStat.__table__
+KEY_COLUMNS = (STAT.c.day, STAT.c.created_by, STAT.c.result, STAT.c.gender, STAT.c.age_bucket)
+
+
+def age_bucket(age: Optional[int]) -> str:
+    if age is None:
+        return "unknown"
+    for upper, label in AGE_BUCKETS:
+        if age < upper:
+            return label
+    return "70+"
+
+
+def stat_key(day: datetime, created_by: int, result: Optional[str], gender: Optional[str], age: Optional[int]) -> StatKey:
+    return (day.date(), created_by, (result or "")[:TEXT_LENGTH], (gender or "")[:TEXT_LENGTH], age_bucket(age))
+
+
+# =========================================
+# Applying deltas
+# =========================================
+def apply_stat_deltas(connection: Connection, deltas: Dict[StatKey, List[float]]):
+    """Add {key: [count, confidence_sum]} to result_stats in one upsert. Sync; caller's transaction."""
+    rows = [
+        dict(zip(("day", "created_by", "result", "gender", "age_bucket"), key), count=int(count), confidence_sum=total)
+        for key, (count, total) in sorted(deltas.items())
+        if count or total
+    ]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(STAT).values(rows)
+        statement = statement.on_duplicate_key_update(
+            count=STAT.c.count + statement.inserted.count,
+            confidence_sum=STAT.c.confidence_sum + statement.inserted.confidence_sum,
+        )
+    elif dialect in ("postgresql", "sqlite"):
+        statement = (pg_insert if dialect == "postgresql" else sqlite_insert)(STAT).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(KEY_COLUMNS),
+            set_={
+                "count": STAT.c.count + statement.excluded.count,
+                "confidence_sum": STAT.c.confidence_sum + statement.excluded.confidence_sum,
+            },
+        )
+    else:
+        for row in rows:
+            bumped = connection.execute(
+                update(STAT).where(*_key_clause(row)).values(
+                    count=STAT.c.count + row["count"], confidence_sum=STAT.c.confidence_sum + row["confidence_sum"],
+                )
+            )
+            if not bumped.rowcount:
+                connection.execute(STAT.insert().values(row))
+        return
+    connection.execute(statement)
+
+
+async def shift_result_stats(session, *where, reassign_to: Optional[int] = None):
+    """
+    For Core bulk writes, which bypass the ORM events: take the results
+    matching `where` out of result_stats (run before deleting them), or move
+    them to counselor `reassign_to` (run before reassigning created_by).
+    """
+    deltas: Dict[StatKey, List[float]] = defaultdict(lambda: [0, 0.0])
+    for row in (await session.execute(grouped_results_query(*where))).all():
+        key = row_key(row)
+        deltas[key][0] -= row.count
+        deltas[key][1] -= row.confidence_sum
+        if reassign_to is not None:
+            moved = (key[0], reassign_to) + key[2:]
+            deltas[moved][0] += row.count
+            deltas[moved][1] += row.confidence_sum
+    if deltas:
+        await session.run_sync(lambda sync_session: apply_stat_deltas(sync_session.connection(), deltas))
+
+
+def _key_clause(row: dict):
+    return [column == row[column.name] for column in KEY_COLUMNS]
+
+
+def _collect(target: Result, key: StatKey, sign: int, confidence: Optional[float], connection: Connection):
+    session = object_session(target)
+    if session is None:
+        apply_stat_deltas(connection, {key: [sign, sign * (confidence or 0.0)]})
+        return
+    deltas = session.info.setdefault(DELTAS_KEY, defaultdict(lambda: [0, 0.0]))
+    deltas[key][0] += sign
+    deltas[key][1] += sign * (confidence or 0.0)
+
+
+def _current_key(target: Result) -> StatKey:
+    return stat_key(target.date, target.created_by, target.result, target.gender, target.age)
+
+
+@event.listens_for(Result, "after_insert")
+def _count_new(mapper, connection, target):
+    _collect(target, _current_key(target), 1, target.confidence, connection)
+
+
+@event.listens_for(Result, "after_update")
+def _recount(mapper, connection, target):
+    state = inspect(target)
+
+    def before(field):
+        history = state.attrs[field].history
+        return history.deleted[0] if history.deleted else getattr(target, field)
+
+    old_key = stat_key(before("date"), before("created_by"), before("result"), before("gender"), before("age"))
+    new_key = _current_key(target)
+    old_confidence = before("confidence")
+    if old_key == new_key and old_confidence == target.confidence:
+        return
+    _collect(target, old_key, -1, old_confidence, connection)
+    _collect(target, new_key, 1, target.confidence, connection)
+
+
+@event.listens_for(Result, "after_delete")
+def _uncount(mapper, connection, target):
+    _collect(target, _current_key(target), -1, target.confidence, connection)
+
+
+@event.listens_for(Session, "after_flush")
+def _apply_collected(session, flush_context):
+    deltas = session.info.pop(DELTAS_KEY, None)
+    if deltas:
+        apply_stat_deltas(session.connection(), deltas)
+
+
+# =========================================
+# Queries
+# =========================================
+def _text_sql(column):
+    return func.coalesce(func.substr(column, literal_column("1"), literal_column(str(TEXT_LENGTH))), literal_column("''"))
+
+
+def _age_bucket_sql(column):
+    # Inline literals: the same expression text must appear in SELECT and GROUP BY
+    return case(
+        (column.is_(None), literal_column("'unknown'")),
+        *((column < literal_column(str(upper)), literal_column(f"'{label}'")) for upper, label in AGE_BUCKETS),
+        else_=literal_column("'70+'"),
+    )
+
+
+def grouped_results_query(*where):
+    """results grouped by stat key → (day, created_by, result, gender, age_bucket, count, confidence_sum)."""
+    columns = Result.__table__.c
+    keys = (
+        func.date(columns.date),
+        columns.created_by,
+        _text_sql(columns.result),
+        _text_sql(columns.gender),
+        _age_bucket_sql(columns.age),
+    )
+    labels = ("day", "created_by", "result", "gender", "age_bucket")
+    return (
+        select(*(k.label(n) for k, n in zip(keys, labels)),
+               func.count().label("count"),
+               func.coalesce(func.sum(columns.confidence), 0.0).label("confidence_sum"))
+        .where(*where)
+        .group_by(*keys)
+    )
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):  # SQLite returns DATE() as text
+        return date.fromisoformat(value)
+    return value
+
+
+def row_key(row) -> StatKey:
+    return (_as_date(row.day), row.created_by, row.result, row.gender, row.age_bucket)
+
+
+def stats_query(created_by: Optional[int] = None, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Aggregate rows for a scope (all counselors, or one) and an inclusive day range."""
+    query = select(*KEY_COLUMNS, STAT.c.count, STAT.c.confidence_sum).where(STAT.c.count != 0)
+    if created_by is not None:
+        query = query.where(STAT.c.created_by == created_by)
+    if date_from is not None:
+        query = query.where(STAT.c.day >= date_from)
+    if date_to is not None:
+        query = query.where(STAT.c.day <= date_to)
+    return query
+
+
+def summarize(rows: Iterable) -> dict:
+    """Roll aggregate rows (any of the queries above) up into the dashboard dimensions."""
+    total, confidence_sum = 0, 0.0
+    by_result: Dict[str, int] = defaultdict(int)
+    by_gender: Dict[str, int] = defaultdict(int)
+    by_age: Dict[str, int] = defaultdict(int)
+    by_counselor: Dict[int, int] = defaultdict(int)
+    by_day: Dict[date, int] = defaultdict(int)
+    for row in rows:
+        day, created_by, result, gender, bucket = row_key(row)
+        count = int(row.count)
+        total += count
+        confidence_sum += float(row.confidence_sum or 0.0)
+        by_result[result or "unknown"] += count
+        by_gender[gender or "unknown"] += count
+        by_age[bucket] += count
+        by_counselor[created_by] += count
+        by_day[day] += count
+    return {
+        "total": total,
+        "average_confidence": round(confidence_sum / total, 2) if total else None,
+        "by_result": dict(by_result),
+        "by_gender": dict(by_gender),
+        "by_age_bucket": {label: by_age[label] for label in [l for _, l in AGE_BUCKETS] + ["70+", "unknown"] if by_age[label]},
+        "by_counselor": [{"counselor_id": c, "count": n} for c, n in sorted(by_counselor.items(), key=lambda i: -i[1])],
+        "by_day": [{"day": d, "count": n} for d, n in sorted(by_day.items())],
+    }
+
+
+# =========================================
+# Reconciliation
+# =========================================
+def _insert_missing(connection: Connection, rows: List[dict]):
+    """Insert rows whose key is absent; keys created meanwhile are left for the next pass."""
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect == "mysql":
+        connection.execute(mysql_insert(STAT).values(rows).prefix_with("IGNORE"))
+    elif dialect in ("postgresql", "sqlite"):
+        connection.execute((pg_insert if dialect == "postgresql" else sqlite_insert)(STAT).values(rows).on_conflict_do_nothing())
+    else:
+        for row in rows:
+            try:
+                with connection.begin_nested():
+                    connection.execute(STAT.insert().values(row))
+            except IntegrityError:
+                pass
+
+
+def reconcile_result_stats(connection: Connection) -> int:
+    """
+    Recompute result_stats from results and fix rows that drifted; returns
+    how many were fixed. results is aggregated in id ranges of
+    RECONCILE_BATCH_IDS, each a short statement. The table is snapshotted
+    before results are scanned and fixes are conditional on the snapshot's
+    count and confidence_sum (a DOUBLE, read back exactly), so a row a request
+    touched meanwhile is skipped (and fixed by the next pass).
+    """
+    snapshot = {
+        row_key(row): (row.count, row.confidence_sum)
+        for row in connection.execute(select(*KEY_COLUMNS, STAT.c.count, STAT.c.confidence_sum))
+    }
+    connection.commit()
+    ids = Result.__table__.c.id
+    max_id = connection.execute(select(func.max(ids))).scalar() or 0
+    truth: Dict[Tuple, Tuple[int, float]] = {}
+    for start in range(0, max_id, RECONCILE_BATCH_IDS):
+        for row in connection.execute(grouped_results_query(ids > start, ids <= start + RECONCILE_BATCH_IDS)):
+            key = row_key(row)
+            count, total = truth.get(key, (0, 0.0))
+            truth[key] = (count + int(row.count), total + float(row.confidence_sum))
+        connection.commit()
+
+    fixed = 0
+    for key, (count, total) in truth.items():
+        current = snapshot.get(key)
+        if current is None or current[0] == count and abs((current[1] or 0.0) - total) < 0.01:
+            continue
+        row = dict(zip(("day", "created_by", "result", "gender", "age_bucket"), key))
+        fixed += connection.execute(
+            update(STAT)
+            .where(*_key_clause(row), STAT.c.count == current[0], STAT.c.confidence_sum == current[1])
+            .values(count=count, confidence_sum=total)
+        ).rowcount
+    missing = [
+        dict(zip(("day", "created_by", "result", "gender", "age_bucket"), key), count=count, confidence_sum=total)
+        for key, (count, total) in truth.items() if key not in snapshot
+    ]
+    _insert_missing(connection, missing)
+    fixed += len(missing)
+    for key, (count, total) in snapshot.items():
+        if key not in truth:
+            row = dict(zip(("day", "created_by", "result", "gender", "age_bucket"), key))
+            fixed += connection.execute(
+                delete(STAT).where(*_key_clause(row), STAT.c.count == count, STAT.c.confidence_sum == total)
+            ).rowcount
+    connection.commit()
+    return fixed
+
+
+class StatsReconciler:
+    """Runs reconcile_result_stats in the background every `interval` seconds."""
+
+    def __init__(self, interval: int):
+        self.interval = interval
+        self.last_run: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def run_once(self) -> int:
+        from lib.config.database import async_engine
+
+        async with async_engine.connect() as conn:
+            fixed = await conn.run_sync(reconcile_result_stats)
+        self.last_run = datetime.utcnow()
+        if fixed:
+            logger.info("Reconciled result_stats: %d rows fixed", fixed)
+        return fixed
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="result-stats-reconciler")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("result_stats reconciliation failed")
+
+
+stats_reconciler = StatsReconciler(settings.RESULT_STATS_RECONCILE_INTERVAL_SECONDS)
+
+
+__all__ = [
+    "age_bucket", "stat_key", "apply_stat_deltas", "shift_result_stats", "grouped_results_query", "row_key", "stats_query",
+    "summarize", "reconcile_result_stats", "StatsReconciler", "stats_reconciler",
+]
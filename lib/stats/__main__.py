@@ -0,0 +1,8 @@
+import asyncio
+import logging
+
+from lib.stats import stats_reconciler
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"Fixed {asyncio.run(stats_reconciler.run_once())} result_stats row(s)")
@@ -0,0 +1,42 @@
+from lib.config.settings import settings
+
+from .base import StorageBackend, StoredObject
+from .local import LocalStorage
+from .validation import ImageInfo, inspect_image, sniff_image_format, validate_uploads
+from .derivatives import DERIVATIVES, derivative_id, render_derivatives
+from .blob_store import BlobStore, StoredBlob, is_blob_id, blob_content_hash, add_blob_refs, release_blob_refs
+from .chunks import ChunkStore, STAGING_PREFIX
+
+
+def create_storage() -> StorageBackend:
+    """Build the backend selected by settings.STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "s3":
+        from .s3 import S3Storage
+
+        return S3Storage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+            part_size=settings.S3_MULTIPART_PART_SIZE,
+            upload_concurrency=settings.S3_UPLOAD_CONCURRENCY,
+        )
+    if settings.STORAGE_BACKEND == "local":
+        return LocalStorage(settings.STORAGE_ROOT)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {settings.STORAGE_BACKEND!r}")
+
+
+storage = create_storage()
+blob_store = BlobStore(storage, settings.STORAGE_TMP_DIR)
+chunk_store = ChunkStore(storage, settings.STORAGE_TMP_DIR)
+
+__all__ = [
+    "StorageBackend", "StoredObject", "LocalStorage", "create_storage", "storage",
+    "BlobStore", "StoredBlob", "blob_store", "is_blob_id", "blob_content_hash", "add_blob_refs", "release_blob_refs",
+    "ChunkStore", "STAGING_PREFIX", "chunk_store",
+    "DERIVATIVES", "derivative_id", "render_derivatives",
+    "ImageInfo", "inspect_image", "sniff_image_format", "validate_uploads",
+]
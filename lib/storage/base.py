@@ -0,0 +1,58 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, NamedTuple, Optional
+
+
+class StoredObject(NamedTuple):
+    key: str
+    size: int
+    modified: datetime
+
+
+class StorageBackend(ABC):
+    """
+    Minimal async object-storage interface used by the blob store.
+
+    Keys are '/'-separated relative paths (e.g. "blobs/ab/cd/<sha>.jpg").
+    Missing keys raise FileNotFoundError on read.
+    """
+
+    @abstractmethod
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        """Store a local file under `key`. The source file may be moved away."""
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    async def read(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def delete_many(self, keys: Iterable[str], sizes: Optional[Dict[str, int]] = None) -> int:
+        """
+        Delete keys (missing ones are ignored) and return the bytes freed.
+        `sizes` (key → bytes, as the caller knows them from a listing or the
+        blobs table) is what backends that can't measure a delete for free count.
+        """
+
+    @abstractmethod
+    def list(self, prefix: str) -> AsyncIterator[StoredObject]:
+        ...
+
+    def local_path(self, key: str) -> Optional[Path]:
+        """Filesystem path when the backend is local, so it can be sendfile'd."""
+        return None
+
+    async def presigned_url(self, key: str, expires_in: int) -> Optional[str]:
+        """Direct download URL when the backend can issue one."""
+        return None
+
+    async def close(self) -> None:
+        pass
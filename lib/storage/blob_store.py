@@ -0,0 +1,247 @@
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import case, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from lib.config.database import async_session
+from lib.models.sql import Blob
+from lib.storage.base import StorageBackend
+from lib.storage.derivatives import DERIVATIVES, derivative_id, render_derivatives
+from lib.storage.validation import FORMAT_EXTENSIONS, sniff_image_format
+
+BLOB_PREFIX = "blobs"
+CHUNK_SIZE = 1024 * 1024
+BLOB_ID_RE = re.compile(r"^[0-9a-f]{64}\.[a-z0-9]{1,5}$")
+# Blob ids plus their derivatives (<sha256>.thumb.webp, ...)
+STORED_NAME_RE = re.compile(r"^[0-9a-f]{64}(\.[a-z]{1,10})?\.[a-z0-9]{1,5}$")
+
+
+def _sniff_extension(head: bytes) -> str:
+    # Derived from content, so identical bytes always map to the same blob id
+    return FORMAT_EXTENSIONS.get(sniff_image_format(head), ".bin")
+
+
+def is_blob_id(value: str) -> bool:
+    return bool(BLOB_ID_RE.match(value or ""))
+
+
+def blob_content_hash(value: str) -> Optional[str]:
+    """sha256 of a blob's bytes (the stem of its id); None for legacy paths."""
+    return value[:64] if is_blob_id(value) else None
+
+
+class StoredBlob(NamedTuple):
+    blob_id: str
+    size: int
+    model_input: bytes  # 224x224 PNG fed to the model
+
+
+class BlobStore:
+    """
+    SHA-256 content-addressed store on top of a StorageBackend.
+
+    Keys are blobs/<ab>/<cd>/<sha256><ext> so no directory (or listing page)
+    grows past 65k entries. Uploads are hashed into a local staging file and
+    only then published under their final key; derivatives are published
+    before the original, so an existing original implies its derivatives.
+    """
+
+    def __init__(self, storage: StorageBackend, tmp_dir: str):
+        self.storage = storage
+        self.tmp_dir = Path(tmp_dir)
+
+    @staticmethod
+    def key_for(name: str) -> str:
+        """Storage key of a blob or one of its derivatives, by file name."""
+        if not STORED_NAME_RE.match(name or ""):
+            raise ValueError(f"Invalid stored name: {name!r}")
+        return f"{BLOB_PREFIX}/{name[:2]}/{name[2:4]}/{name}"
+
+    def _stage(self, fileobj: BinaryIO) -> Tuple[str, int, str]:
+        """Copy into a staging file while hashing. Blocking."""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                while chunk := fileobj.read(CHUNK_SIZE):
+                    if not head:
+                        head = chunk[:16]
+                    digest.update(chunk)
+                    size += len(chunk)
+                    tmp.write(chunk)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        return digest.hexdigest() + _sniff_extension(head), size, tmp_path
+
+    async def put(self, fileobj: BinaryIO) -> StoredBlob:
+        """Store a file object (deduplicated) and return its id, size and model input."""
+        blob_id, size, tmp_path = await run_in_threadpool(self._stage, fileobj)
+        try:
+            return await self._publish(blob_id, size, Path(tmp_path))
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    async def put_path(self, path: Path) -> StoredBlob:
+        with open(path, "rb") as fh:
+            return await self.put(fh)
+
+    async def _publish(self, blob_id: str, size: int, staged: Path) -> StoredBlob:
+        model_key = self.key_for(derivative_id(blob_id, "model"))
+        # Committed before the exists() check: a sweep of this blob either finished
+        # (the files are gone and are written again below) or now skips it
+        async with async_session() as session:
+            await touch_blob(session, blob_id, size)
+            await session.commit()
+        if await self.storage.exists(self.key_for(blob_id)):
+            try:
+                return StoredBlob(blob_id, size, await self.storage.read(model_key))
+            except FileNotFoundError:
+                pass  # stored before derivatives existed: build them below
+
+        rendered = await run_in_threadpool(render_derivatives, staged)
+        for kind, data in rendered.items():
+            await self.storage.put_bytes(
+                self.key_for(derivative_id(blob_id, kind)), data, DERIVATIVES[kind].content_type
+            )
+        await self.storage.put_file(self.key_for(blob_id), staged)
+        return StoredBlob(blob_id, size, rendered["model"])
+
+    async def read_model_input(self, blob_id: str) -> bytes:
+        """224x224 model input for re-scoring, rebuilt from the original if missing."""
+        try:
+            return await self.storage.read(self.key_for(derivative_id(blob_id, "model")))
+        except FileNotFoundError:
+            self.tmp_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(await self.storage.read(self.key_for(blob_id)))
+                stored = await self._publish(blob_id, os.path.getsize(tmp_path), Path(tmp_path))
+                return stored.model_input
+            finally:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+
+    def keys_for(self, blob_id: str) -> List[str]:
+        """Original plus every derivative key."""
+        return [self.key_for(blob_id)] + [self.key_for(derivative_id(blob_id, kind)) for kind in DERIVATIVES]
+
+    async def remove(self, blob_ids: Iterable[str], sizes: Optional[Dict[str, int]] = None) -> int:
+        """Delete blobs and their derivatives, returning the bytes freed. `sizes`: blob_id → original's size."""
+        keys = [key for blob_id in blob_ids for key in self.keys_for(blob_id)]
+        key_sizes = {self.key_for(blob_id): size for blob_id, size in (sizes or {}).items()}
+        return await self.storage.delete_many(keys, key_sizes) if keys else 0
+
+
+# =========================================
+# Reference counting (blobs table)
+# =========================================
+async def add_blob_refs(session: AsyncSession, blobs: Iterable[Tuple[str, int]]):
+    """
+    Add one reference per (blob_id, size) occurrence. Runs in the caller's
+    transaction; on MySQL / PostgreSQL all blobs go in one upsert.
+    """
+    blobs = list(blobs)
+    if not blobs:
+        return
+    sizes: Dict[str, int] = dict(blobs)
+    counts = Counter(b for b, _ in blobs)
+    dialect = session.bind.dialect.name
+
+    if dialect in ("mysql", "postgresql"):
+        now = datetime.utcnow()
+        # Sorted, so concurrent submissions lock shared blob rows in the same order
+        rows = [
+            {"id": blob_id, "size": sizes[blob_id], "refcount": counts[blob_id], "created_at": now}
+            for blob_id in sorted(counts)
+        ]
+        refcount = Blob.__table__.c.refcount
+        if dialect == "mysql":
+            statement = mysql_insert(Blob.__table__).values(rows)
+            statement = statement.on_duplicate_key_update(refcount=refcount + statement.inserted.refcount)
+        else:
+            statement = pg_insert(Blob.__table__).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[Blob.__table__.c.id],
+                set_={"refcount": refcount + statement.excluded.refcount},
+            )
+        await session.execute(statement)
+        return
+
+    for blob_id, count in counts.items():
+        bumped = await session.execute(
+            update(Blob).where(Blob.id == blob_id).values(refcount=Blob.refcount + count)
+        )
+        if bumped.rowcount:
+            continue
+        try:
+            async with session.begin_nested():
+                session.add(Blob(id=blob_id, size=sizes[blob_id], refcount=count))
+        except IntegrityError:
+            # Another request inserted it first
+            await session.execute(
+                update(Blob).where(Blob.id == blob_id).values(refcount=Blob.refcount + count)
+            )
+
+
+async def touch_blob(session: AsyncSession, blob_id: str, size: int):
+    """
+    Stamp touched_at on a blob an upload is landing on, creating its row
+    with no references if needed. Waits for a collector sweep holding the row.
+    """
+    now = datetime.utcnow()
+    dialect = session.bind.dialect.name
+    if dialect in ("mysql", "postgresql"):
+        row = {"id": blob_id, "size": size, "refcount": 0, "created_at": now, "touched_at": now}
+        if dialect == "mysql":
+            statement = mysql_insert(Blob.__table__).values(row).on_duplicate_key_update(touched_at=now)
+        else:
+            statement = pg_insert(Blob.__table__).values(row).on_conflict_do_update(
+                index_elements=[Blob.__table__.c.id], set_={"touched_at": now},
+            )
+        await session.execute(statement)
+        return
+
+    touched = await session.execute(update(Blob).where(Blob.id == blob_id).values(touched_at=now))
+    if touched.rowcount:
+        return
+    try:
+        async with session.begin_nested():
+            session.add(Blob(id=blob_id, size=size, refcount=0, touched_at=now))
+    except IntegrityError:
+        await session.execute(update(Blob).where(Blob.id == blob_id).values(touched_at=now))
+
+
+async def release_blob_refs(session: AsyncSession, images: Iterable[str]):
+    """
+    Drop one reference per occurrence, never below zero. Legacy (non-blob)
+    paths are ignored. Rows that reach zero are left for the collector, which
+    deletes the row and its files only if nothing re-referenced the blob in
+    the meantime.
+    """
+    counts = Counter(i for i in images if is_blob_id(i))
+    for blob_id, count in counts.items():
+        await session.execute(
+            update(Blob).where(Blob.id == blob_id)
+            .values(refcount=case((Blob.refcount > count, Blob.refcount - count), else_=0))
+        )
@@ -0,0 +1,75 @@
+import os
+import tempfile
+from pathlib import Path
+from typing import List
+
+from lib.storage.base import StorageBackend, StoredObject
+
+STAGING_PREFIX = "staging"
+
+
+class ChunkStore:
+    """
+    Chunks of resumable uploads, written straight to the storage backend.
+
+    Each PATCH lands as its own object, staging/<session>/<offset:012d>, so a
+    dropped connection never loses what was already acknowledged and nothing
+    is ever rewritten in place (S3 has no append). Finalizing stitches the
+    chunks back together into a local staging file for the blob store.
+    """
+
+    def __init__(self, storage: StorageBackend, tmp_dir: str):
+        self.storage = storage
+        self.tmp_dir = Path(tmp_dir)
+
+    @staticmethod
+    def prefix_for(session_id: str) -> str:
+        return f"{STAGING_PREFIX}/{session_id}/"
+
+    def key_for(self, session_id: str, offset: int) -> str:
+        return f"{self.prefix_for(session_id)}{offset:012d}"
+
+    async def put(self, session_id: str, offset: int, data: bytes) -> None:
+        await self.storage.put_bytes(self.key_for(session_id, offset), data)
+
+    async def chunks(self, session_id: str) -> List[StoredObject]:
+        return sorted(
+            [obj async for obj in self.storage.list(self.prefix_for(session_id))
+             if not obj.key.endswith(".part")],
+            key=lambda obj: obj.key,
+        )
+
+    async def assemble(self, session_id: str, length: int) -> Path:
+        """
+        Concatenate a session's chunks into a local temp file (caller deletes it).
+        Raises ValueError if the chunks do not cover exactly `length` bytes.
+        """
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                position = 0
+                for obj in await self.chunks(session_id):
+                    if int(obj.key.rsplit("/", 1)[-1]) != position:
+                        raise ValueError(f"Upload {session_id} has a gap at byte {position}")
+                    data = await self.storage.read(obj.key)
+                    fh.write(data)
+                    position += len(data)
+                if position != length:
+                    raise ValueError(f"Upload {session_id} has {position} of {length} bytes")
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return Path(tmp_path)
+
+    async def discard(self, session_id: str) -> int:
+        """Delete every chunk of a session, returning the bytes freed."""
+        sizes = {obj.key: obj.size async for obj in self.storage.list(self.prefix_for(session_id))}
+        freed = await self.storage.delete_many(list(sizes), sizes) if sizes else 0
+        directory = self.storage.local_path(self.prefix_for(session_id))
+        if directory is not None:
+            try:
+                directory.rmdir()
+            except OSError:
+                pass
+        return freed
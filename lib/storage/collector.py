@@ -0,0 +1,399 @@
+"""
+Background storage garbage collector.
+
+Delete endpoints only enqueue a StorageJob; this collector drains the queue,
+releases blob references, deletes unreferenced blobs, expired resumable
+upload sessions and expired idempotency keys in batches and, on a slower schedule, reconciles the blobs
+table and storage with result_images.
+
+    python -m lib.storage.collector   # one drain + reconcile pass, then exit
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, update, or_
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.config.settings import settings
+from lib.models.sql import Blob, IdempotencyKey, Profile, Result, ResultImage, StorageJob, UploadSession, User, UserSearchTrigram
+from lib.storage import (
+    blob_store, chunk_store, storage, is_blob_id, add_blob_refs, release_blob_refs, LocalStorage, STAGING_PREFIX,
+)
+from lib.storage.blob_store import BLOB_PREFIX
+from lib.stats import shift_result_stats
+
+logger = logging.getLogger("storage.gc")
+
+LEGACY_STORAGE = LocalStorage("uploads")
+LEGACY_PREFIX = "results"
+MAX_ATTEMPTS = 5
+
+
+async def enqueue_storage_job(session, kind: str, payload: dict):
+    """Queue storage work inside the caller's transaction."""
+    session.add(StorageJob(kind=kind, payload=payload))
+
+
+class StorageCollector:
+    def __init__(self):
+        self.stats = {
+            "jobs_processed": 0,
+            "jobs_failed": 0,
+            "blobs_deleted": 0,
+            "orphans_deleted": 0,
+            "uploads_expired": 0,
+            "bytes_reclaimed": 0,
+            "last_run": None,
+            "last_reconcile": None,
+        }
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._last_reconcile = 0.0
+
+    # ---------------------------
+    # Lifecycle
+    # ---------------------------
+    def start(self):
+        if settings.STORAGE_GC_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="storage-collector")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """Ask for a pass now instead of at the next interval."""
+        self._wakeup.set()
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+                if time.monotonic() - self._last_reconcile >= settings.STORAGE_RECONCILE_INTERVAL_SECONDS:
+                    await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Storage collector pass failed")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.STORAGE_GC_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    # ---------------------------
+    # Job queue
+    # ---------------------------
+    async def run_once(self) -> Dict:
+        """Drain queued jobs, then delete unreferenced blobs and expired uploads."""
+        while await self._drain_jobs():
+            pass
+        while await self._sweep_blobs():
+            pass
+        while await self._expire_uploads():
+            pass
+        while await self._expire_idempotency_keys():
+            pass
+        self.stats["last_run"] = datetime.utcnow()
+        return self.stats
+
+    async def _drain_jobs(self) -> bool:
+        async with async_session() as session:
+            jobs = (await session.execute(
+                select(StorageJob)
+                .where(StorageJob.attempts < MAX_ATTEMPTS)
+                .order_by(StorageJob.id)
+                .limit(settings.STORAGE_GC_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).scalars().all()
+            if not jobs:
+                return False
+
+            failed = 0
+            for job in jobs:
+                try:
+                    async with session.begin_nested():
+                        await self._run_job(session, job)
+                        await session.delete(job)
+                    self.stats["jobs_processed"] += 1
+                except Exception as e:
+                    logger.exception("Storage job %s (%s) failed", job.id, job.kind)
+                    job.attempts += 1
+                    job.last_error = str(e)[:500]
+                    session.add(job)
+                    failed += 1
+            await session.commit()
+            self.stats["jobs_failed"] += failed
+            # Failed jobs are retried on the next interval, not in a tight loop
+            return not failed and len(jobs) == settings.STORAGE_GC_BATCH_SIZE
+
+    async def _run_job(self, session, job: StorageJob):
+        if job.kind == "release_images":
+            images = job.payload.get("images") or []
+            await release_blob_refs(session, images)
+            legacy = [img for img in images if not is_blob_id(img)]
+            if legacy:
+                self.stats["bytes_reclaimed"] += await LEGACY_STORAGE.delete_many(
+                    img.removeprefix("uploads/") for img in legacy
+                )
+        elif job.kind == "purge_user":
+            await self._purge_user(session, job.payload["user_id"])
+        else:
+            raise ValueError(f"Unknown storage job kind: {job.kind}")
+
+    async def _purge_user(self, session, user_id: int):
+        """Delete a user's results (releasing their images), profile and row."""
+        batch = settings.STORAGE_GC_BATCH_SIZE
+        while True:
+            ids = (await session.execute(
+                select(Result.id).where(Result.user_id == user_id).limit(batch)
+            )).scalars().all()
+            if not ids:
+                break
+            images = (await session.execute(
+                select(ResultImage.image).where(ResultImage.result_id.in_(ids))
+            )).scalars().all()
+            await release_blob_refs(session, images)
+            await session.execute(delete(ResultImage).where(ResultImage.result_id.in_(ids)))
+            await shift_result_stats(session, Result.id.in_(ids))
+            await session.execute(delete(Result).where(Result.id.in_(ids)))
+
+        # Results this user created for other patients must keep a valid creator
+        if (await session.execute(select(Result.id).where(Result.created_by == user_id).limit(1))).first():
+            admin_id = (await session.execute(
+                select(User.id).where(User.role == "admin", User.id != user_id, User.deleted_at.is_(None))
+                .order_by(User.id).limit(1)
+            )).scalar_one_or_none()
+            if admin_id is None:
+                # delete_user refuses this case up front; if the last other admin went since, fail with a clear last_error
+                raise RuntimeError(f"No other admin to take over the results created by user {user_id}")
+            await shift_result_stats(session, Result.created_by == user_id, reassign_to=admin_id)
+            await session.execute(update(Result).where(Result.created_by == user_id).values(created_by=admin_id))
+
+        # Their staged chunks are swept by reconcile once the rows are gone
+        await session.execute(delete(UploadSession).where(UploadSession.owner_id == user_id))
+        await session.execute(delete(Profile).where(Profile.user_id == user_id))
+        await session.execute(delete(UserSearchTrigram).where(UserSearchTrigram.user_id == user_id))
+        await session.execute(delete(User).where(User.id == user_id))
+
+    async def _sweep_blobs(self) -> bool:
+        """
+        Delete files + rows of blobs whose refcount reached zero and that no
+        upload touched within STORAGE_ORPHAN_GRACE_SECONDS. The rows stay
+        locked until their files are gone: an upload landing on one of them
+        waits in touch_blob, then finds no file and publishes it again.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.STORAGE_ORPHAN_GRACE_SECONDS)
+        sweepable = (Blob.refcount <= 0, or_(Blob.touched_at.is_(None), Blob.touched_at < cutoff))
+        async with async_session() as session:
+            candidates = (await session.execute(
+                select(Blob.id).where(*sweepable).limit(settings.STORAGE_GC_BATCH_SIZE)
+            )).scalars().all()
+            if not candidates:
+                return False
+
+            # Re-checked under the lock: a concurrent upload may have re-referenced or touched some
+            doomed = dict((await session.execute(
+                select(Blob.id, Blob.size).where(Blob.id.in_(candidates), *sweepable).order_by(Blob.id).with_for_update()
+            )).all())
+            freed = await blob_store.remove(doomed, doomed) if doomed else 0
+            if doomed:
+                await session.execute(delete(Blob).where(Blob.id.in_(doomed)))
+            await session.commit()
+
+        if doomed:
+            self.stats["blobs_deleted"] += len(doomed)
+            self.stats["bytes_reclaimed"] += freed
+            logger.info("Deleted %d unreferenced blobs, reclaimed %d bytes", len(doomed), freed)
+        return len(candidates) == settings.STORAGE_GC_BATCH_SIZE
+
+    async def _expire_uploads(self) -> bool:
+        """Delete resumable upload sessions (and their chunks) past expires_at."""
+        now = datetime.utcnow()
+        async with async_session() as session:
+            candidates = (await session.execute(
+                select(UploadSession.id).where(UploadSession.expires_at < now)
+                .limit(settings.STORAGE_GC_BATCH_SIZE)
+            )).scalars().all()
+            if not candidates:
+                return False
+
+            expired = []
+            for upload_id in candidates:
+                # Conditional: a PATCH may have extended it since the select
+                deleted = await session.execute(
+                    delete(UploadSession).where(UploadSession.id == upload_id, UploadSession.expires_at < now)
+                )
+                if deleted.rowcount:
+                    expired.append(upload_id)
+            await session.commit()
+
+        freed = 0
+        for upload_id in expired:
+            freed += await chunk_store.discard(upload_id)
+        if expired:
+            self.stats["uploads_expired"] += len(expired)
+            self.stats["bytes_reclaimed"] += freed
+            logger.info("Expired %d upload sessions, reclaimed %d bytes", len(expired), freed)
+        return len(candidates) == settings.STORAGE_GC_BATCH_SIZE
+
+    async def _expire_idempotency_keys(self) -> bool:
+        async with async_session() as session:
+            ids = (await session.execute(
+                select(IdempotencyKey.id).where(IdempotencyKey.expires_at < datetime.utcnow())
+                .limit(settings.STORAGE_GC_BATCH_SIZE)
+            )).scalars().all()
+            if not ids:
+                return False
+            await session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(ids)))
+            await session.commit()
+        return len(ids) == settings.STORAGE_GC_BATCH_SIZE
+
+    # ---------------------------
+    # Reconciliation
+    # ---------------------------
+    async def _referenced_images(self) -> Counter:
+        refs: Counter = Counter()
+        last_id = 0
+        async with async_session() as session:
+            while True:
+                rows = (await session.execute(
+                    select(ResultImage.id, ResultImage.image).where(ResultImage.id > last_id)
+                    .order_by(ResultImage.id).limit(settings.STORAGE_GC_BATCH_SIZE)
+                )).all()
+                if not rows:
+                    return refs
+                last_id = rows[-1].id
+                refs.update(image for _, image in rows)
+
+    async def _pending_releases(self) -> Counter:
+        """Images of queued release_images jobs: their result_images rows are gone, their refs not yet dropped."""
+        pending: Counter = Counter()
+        last_id = 0
+        async with async_session() as session:
+            while True:
+                jobs = (await session.execute(
+                    select(StorageJob.id, StorageJob.payload)
+                    .where(StorageJob.id > last_id, StorageJob.kind == "release_images", StorageJob.attempts < MAX_ATTEMPTS)
+                    .order_by(StorageJob.id).limit(settings.STORAGE_GC_BATCH_SIZE)
+                )).all()
+                if not jobs:
+                    return pending
+                last_id = jobs[-1].id
+                pending.update(image for _, payload in jobs for image in payload.get("images") or [])
+
+    async def reconcile(self) -> Dict:
+        """
+        Fix blob refcounts from result_images and delete stored files that no
+        row references (older than STORAGE_ORPHAN_GRACE_SECONDS).
+        """
+        started = time.monotonic()
+        # Snapshot refcounts *before* scanning results: the conditional update
+        # below then skips any blob a request touched while we were scanning.
+        async with async_session() as session:
+            known: Dict[str, int] = dict((await session.execute(select(Blob.id, Blob.refcount))).all())
+
+        # Queued releases are read *after* the scan: a result deleted meanwhile is
+        # then counted twice at worst (fixed next time), never zero times
+        refs = await self._referenced_images()
+        refs.update(await self._pending_releases())
+        wanted = {img: n for img, n in refs.items() if is_blob_id(img)}
+        fixed = 0
+
+        async with async_session() as session:
+            for blob_id, refcount in known.items():
+                if wanted.get(blob_id, 0) != refcount:
+                    updated = await session.execute(
+                        update(Blob).where(Blob.id == blob_id, Blob.refcount == refcount)
+                        .values(refcount=wanted.get(blob_id, 0))
+                    )
+                    fixed += updated.rowcount
+            for blob_id in wanted.keys() - known.keys():
+                await add_blob_refs(session, [(blob_id, 0)] * wanted[blob_id])
+                fixed += 1
+            await session.commit()
+
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.STORAGE_ORPHAN_GRACE_SECONDS)
+        live: Set[str] = {b.split(".", 1)[0] for b in wanted.keys() | known.keys()}
+        blob_orphans: List[str] = []
+        orphan_sizes: Dict[str, int] = {}
+        async for obj in storage.list(BLOB_PREFIX):
+            name = obj.key.rsplit("/", 1)[-1]
+            if name.split(".", 1)[0] not in live and obj.modified < cutoff and not name.endswith(".part"):
+                blob_orphans.append(obj.key)
+                orphan_sizes[obj.key] = obj.size
+
+        # Chunks left behind by a crash between finalize and discard, or a purged user
+        staged: Dict[str, datetime] = {}
+        async for obj in storage.list(STAGING_PREFIX):
+            upload_id = obj.key.split("/")[1]
+            staged[upload_id] = max(staged.get(upload_id, obj.modified), obj.modified)
+        stale_uploads = [upload_id for upload_id, modified in staged.items() if modified < cutoff]
+        if stale_uploads:
+            async with async_session() as session:
+                open_uploads = set((await session.execute(
+                    select(UploadSession.id).where(UploadSession.id.in_(stale_uploads))
+                )).scalars())
+            stale_uploads = [u for u in stale_uploads if u not in open_uploads]
+
+        legacy_live = {img.removeprefix("uploads/") for img in refs if not is_blob_id(img)}
+        legacy_orphans = [
+            obj.key async for obj in LEGACY_STORAGE.list(LEGACY_PREFIX)
+            if obj.key not in legacy_live and obj.modified < cutoff
+        ]
+
+        freed = 0
+        batch = settings.STORAGE_GC_BATCH_SIZE
+        for start in range(0, len(blob_orphans), batch):
+            keys = blob_orphans[start:start + batch]
+            hashes = {k.rsplit("/", 1)[-1].split(".", 1)[0] for k in keys}
+            # Re-check: an upload may have re-adopted an orphaned file since the snapshot
+            async with async_session() as session:
+                adopted = {
+                    blob_id.split(".", 1)[0] for blob_id in (await session.execute(
+                        select(Blob.id).where(or_(*(Blob.id.startswith(h) for h in hashes)))
+                    )).scalars()
+                }
+            freed += await storage.delete_many(
+                (k for k in keys if k.rsplit("/", 1)[-1].split(".", 1)[0] not in adopted), orphan_sizes,
+            )
+        if legacy_orphans:
+            freed += await LEGACY_STORAGE.delete_many(legacy_orphans)
+        for upload_id in stale_uploads:
+            freed += await chunk_store.discard(upload_id)
+
+        orphan_count = len(blob_orphans) + len(legacy_orphans) + len(stale_uploads)
+        self.stats["orphans_deleted"] += orphan_count
+        self.stats["bytes_reclaimed"] += freed
+        self.stats["last_reconcile"] = datetime.utcnow()
+        self._last_reconcile = time.monotonic()
+        logger.info(
+            "Reconciled storage in %.1fs: %d refcounts fixed, %d orphan files deleted, %d bytes reclaimed",
+            time.monotonic() - started, fixed, orphan_count, freed,
+        )
+        # Freshly zeroed rows are picked up by the next sweep
+        await self.run_once()
+        return self.stats
+
+
+storage_collector = StorageCollector()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    async def _main():
+        await storage_collector.run_once()
+        print(await storage_collector.reconcile())
+
+    asyncio.run(_main())
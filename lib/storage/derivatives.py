@@ -0,0 +1,57 @@
+import io
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from PIL import Image, ImageOps
+
+MODEL_SIZE = (224, 224)
+
+
+class Derivative(NamedTuple):
+    suffix: str
+    box: Optional[int]  # bounding box in px, None = fixed model size
+    content_type: str
+
+
+DERIVATIVES = {
+    "thumb": Derivative(".thumb.webp", 160, "image/webp"),
+    "preview": Derivative(".preview.webp", 800, "image/webp"),
+    "model": Derivative(".model.png", None, "image/png"),
+}
+
+
+def derivative_id(blob_id: str, kind: str) -> str:
+    """<sha256>.thumb.webp etc. — stored next to the original blob."""
+    return blob_id.split(".", 1)[0] + DERIVATIVES[kind].suffix
+
+
+def _encode(img: Image.Image, **params) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, **params)
+    return buffer.getvalue()
+
+
+def render_derivatives(source: Path) -> Dict[str, bytes]:
+    """
+    Build thumb / preview / model-input images from a source file. Blocking.
+
+    The source is decoded once. The model input reproduces keras `load_img`
+    (RGB, nearest-neighbour 224x224, no EXIF rotation) so predictions made
+    from it are identical to predictions made from the original.
+    """
+    with Image.open(source) as src:
+        src.load()
+        rgb = src.convert("RGB") if src.mode != "RGB" else src
+
+        model_input = rgb.resize(MODEL_SIZE, Image.NEAREST)
+
+        preview = ImageOps.exif_transpose(rgb)  # returns a copy
+        preview.thumbnail((DERIVATIVES["preview"].box,) * 2, Image.LANCZOS)
+        thumb = preview.copy()
+        thumb.thumbnail((DERIVATIVES["thumb"].box,) * 2, Image.LANCZOS)
+
+    return {
+        "thumb": _encode(thumb, format="WEBP", quality=70, method=4),
+        "preview": _encode(preview, format="WEBP", quality=80, method=4),
+        "model": _encode(model_input, format="PNG"),
+    }
@@ -0,0 +1,108 @@
+import errno
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from lib.storage.base import StorageBackend, StoredObject
+
+
+class LocalStorage(StorageBackend):
+    """Filesystem driver. Every write lands via an atomic rename."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        parts = PurePosixPath(key).parts
+        if not parts or ".." in parts or PurePosixPath(key).is_absolute():
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return self.root.joinpath(*parts)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self._path(key)
+
+    def _put_file(self, key: str, path: Path):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, target)
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            # Different filesystem: copy next to the target, then rename
+            fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".part")
+            with os.fdopen(fd, "wb") as dst, open(path, "rb") as src:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, target)
+
+    def _put_bytes(self, key: str, data: bytes):
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def _delete_many(self, keys: Iterable[str]) -> int:
+        freed = 0
+        for key in keys:
+            path = self._path(key)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                freed += size
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def _scan(self, base: Path, recursive: bool = True):
+        found = []
+        walker = os.walk(base) if recursive else [(base, [], [e.name for e in os.scandir(base) if e.is_file()])]
+        for dirpath, _, filenames in walker:
+            for filename in filenames:
+                full = Path(dirpath) / filename
+                try:
+                    stat = full.stat()
+                except FileNotFoundError:
+                    continue
+                key = full.relative_to(self.root).as_posix()
+                found.append(StoredObject(key, stat.st_size, datetime.utcfromtimestamp(stat.st_mtime)))
+        return found
+
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        await run_in_threadpool(self._put_file, key, path)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        await run_in_threadpool(self._put_bytes, key, data)
+
+    async def read(self, key: str) -> bytes:
+        return await run_in_threadpool(self._path(key).read_bytes)
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    async def delete_many(self, keys: Iterable[str], sizes: Optional[Dict[str, int]] = None) -> int:
+        return await run_in_threadpool(self._delete_many, list(keys))  # stat() is cheap: measured, not trusted
+
+    async def list(self, prefix: str) -> AsyncIterator[StoredObject]:
+        base = self._path(prefix)
+        if not base.is_dir():
+            return
+        # One top-level shard at a time keeps memory bounded on large trees
+        for obj in await run_in_threadpool(self._scan, base, False):
+            yield obj
+        for shard in sorted(p for p in base.iterdir() if p.is_dir()):
+            for obj in await run_in_threadpool(self._scan, shard):
+                yield obj
@@ -0,0 +1,100 @@
+"""
+Move the legacy uploads/results/<user_id>/<user_id>_<name> tree into the
+content-addressed blob store (with thumbnail / preview / model-input
+derivatives) and rewrite result_images rows to blob ids.
+
+    python -m lib.storage.migrate_uploads            # migrate
+    python -m lib.storage.migrate_uploads --dry-run  # report only
+
+Each batch of images is committed before its source files are removed, so the
+tool can be interrupted and re-run safely.
+"""
+import argparse
+import asyncio
+import os
+from pathlib import Path
+
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.models.sql import ResultImage
+from lib.storage import blob_store, is_blob_id, blob_content_hash, add_blob_refs
+
+LEGACY_ROOT = Path("uploads/results")
+BATCH_SIZE = 200
+
+
+async def migrate(dry_run: bool = False):
+    stats = {"results": 0, "files": 0, "missing": 0, "bytes_before": 0, "unique_blobs": {}}
+    migrated = {}  # legacy path → (blob_id, size), for paths shared across results
+    touched_results = set()
+    last_id = 0
+
+    while True:
+        async with async_session() as session:
+            rows = (await session.execute(
+                select(ResultImage).where(ResultImage.id > last_id).order_by(ResultImage.id).limit(BATCH_SIZE)
+            )).scalars().all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            migrated_files, refs, touched = [], [], set()
+            for image in rows:
+                img = image.image
+                if is_blob_id(img):
+                    continue
+                touched.add(image.result_id)
+                if img in migrated:
+                    blob_id, size = migrated[img]
+                else:
+                    path = Path(img)
+                    if not path.is_file():
+                        stats["missing"] += 1  # keep the dangling path visible
+                        continue
+
+                    stats["files"] += 1
+                    stats["bytes_before"] += path.stat().st_size
+                    if dry_run:
+                        continue
+                    blob_id, size, _ = await blob_store.put_path(path)
+                    stats["unique_blobs"][blob_id] = size
+                    migrated[img] = (blob_id, size)
+                    migrated_files.append(path)
+
+                refs.append((blob_id, size))
+                if not dry_run:
+                    image.image = blob_id
+                    image.content_hash = blob_content_hash(blob_id)
+                    session.add(image)
+
+            touched_results |= touched
+            stats["results"] = len(touched_results)
+            if not dry_run:
+                await add_blob_refs(session, refs)
+                await session.commit()
+                for path in migrated_files:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    bytes_after = sum(stats["unique_blobs"].values())
+    print(
+        f"✅ Migrated {stats['results']} results / {stats['files']} files "
+        f"({stats['missing']} missing) into {len(stats['unique_blobs'])} blobs. "
+        f"{stats['bytes_before']} → {bytes_after} bytes"
+        + (" [dry run]" if dry_run else "")
+    )
+
+    if LEGACY_ROOT.exists():
+        leftovers = [p for p in LEGACY_ROOT.rglob("*") if p.is_file()]
+        if leftovers:
+            print(f"⚠️ {len(leftovers)} unreferenced files remain under {LEGACY_ROOT}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated")
+    args = parser.parse_args()
+    asyncio.run(migrate(dry_run=args.dry_run))
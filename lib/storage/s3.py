@@ -0,0 +1,197 @@
+"""
+S3-compatible driver (AWS S3, MinIO, Ceph, ...).
+
+One long-lived client per process keeps a pool of keep-alive connections
+(S3_MAX_POOL_CONNECTIONS). Files above S3_MULTIPART_PART_SIZE are sent as
+multipart uploads with S3_UPLOAD_CONCURRENCY parts in flight.
+
+For local runs point S3_ENDPOINT_URL at an in-process stand-in, e.g.
+
+    from moto.server import ThreadedMotoServer
+    ThreadedMotoServer(port=5005).start()   # S3_ENDPOINT_URL=http://127.0.0.1:5005
+"""
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from lib.storage.base import StorageBackend, StoredObject
+
+logger = logging.getLogger("storage.s3")
+
+DELETE_BATCH = 1000  # DeleteObjects limit
+
+
+class S3Storage(StorageBackend):
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        max_pool_connections: int = 32,
+        part_size: int = 8 * 1024 * 1024,
+        upload_concurrency: int = 4,
+    ):
+        try:
+            from aiobotocore.session import get_session
+            from aiobotocore.config import AioConfig
+        except ImportError as e:  # pragma: no cover - optional dependency
+            raise RuntimeError("STORAGE_BACKEND=s3 requires the 'aiobotocore' package") from e
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.part_size = max(part_size, 5 * 1024 * 1024)  # S3 minimum part size
+        self.upload_concurrency = upload_concurrency
+        self._client_kwargs = dict(
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=AioConfig(max_pool_connections=max_pool_connections, retries={"max_attempts": 3, "mode": "adaptive"}),
+        )
+        self._session = get_session()
+        self._client = None
+        self._client_ctx = None
+        self._lock = asyncio.Lock()
+
+    # ---------------------------
+    # Client lifecycle
+    # ---------------------------
+    async def _get_client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    self._client_ctx = self._session.create_client("s3", **self._client_kwargs)
+                    self._client = await self._client_ctx.__aenter__()
+        return self._client
+
+    async def close(self) -> None:
+        if self._client_ctx is not None:
+            await self._client_ctx.__aexit__(None, None, None)
+            self._client = self._client_ctx = None
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    @staticmethod
+    def _is_missing(error) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    async def put_bytes(self, key: str, data: bytes, content_type: Optional[str] = None) -> None:
+        client = await self._get_client()
+        extra = {"ContentType": content_type} if content_type else {}
+        await client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+
+    async def put_file(self, key: str, path: Path, content_type: Optional[str] = None) -> None:
+        size = os.path.getsize(path)
+        if size <= self.part_size:
+            data = await run_in_threadpool(Path(path).read_bytes)
+            await self.put_bytes(key, data, content_type)
+            return
+
+        client = await self._get_client()
+        extra = {"ContentType": content_type} if content_type else {}
+        upload = await client.create_multipart_upload(Bucket=self.bucket, Key=self._key(key), **extra)
+        upload_id = upload["UploadId"]
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        def read_part(offset: int) -> bytes:
+            with open(path, "rb") as fh:
+                fh.seek(offset)
+                return fh.read(self.part_size)
+
+        async def send_part(number: int, offset: int):
+            async with semaphore:
+                body = await run_in_threadpool(read_part, offset)
+                part = await client.upload_part(
+                    Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                    PartNumber=number, Body=body,
+                )
+                return {"PartNumber": number, "ETag": part["ETag"]}
+
+        try:
+            parts = await asyncio.gather(*(
+                send_part(number, offset)
+                for number, offset in enumerate(range(0, size, self.part_size), start=1)
+            ))
+            await client.complete_multipart_upload(
+                Bucket=self.bucket, Key=self._key(key), UploadId=upload_id,
+                MultipartUpload={"Parts": list(parts)},
+            )
+        except BaseException:
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(key), UploadId=upload_id)
+            raise
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    async def read(self, key: str) -> bytes:
+        client = await self._get_client()
+        try:
+            response = await client.get_object(Bucket=self.bucket, Key=self._key(key))
+        except client.exceptions.ClientError as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(key) from e
+            raise
+        async with response["Body"] as stream:
+            return await stream.read()
+
+    async def exists(self, key: str) -> bool:
+        client = await self._get_client()
+        try:
+            await client.head_object(Bucket=self.bucket, Key=self._key(key))
+            return True
+        except client.exceptions.ClientError as e:
+            if self._is_missing(e):
+                return False
+            raise
+
+    async def list(self, prefix: str) -> AsyncIterator[StoredObject]:
+        client = await self._get_client()
+        paginator = client.get_paginator("list_objects_v2")
+        async for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get("Contents", []):
+                key = obj["Key"][len(self.prefix):]
+                yield StoredObject(key, obj["Size"], obj["LastModified"].replace(tzinfo=None))
+
+    async def presigned_url(self, key: str, expires_in: int) -> Optional[str]:
+        client = await self._get_client()
+        return await client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self._key(key)}, ExpiresIn=expires_in
+        )
+
+    # ---------------------------
+    # Deletes
+    # ---------------------------
+    async def delete_many(self, keys: Iterable[str], sizes: Optional[Dict[str, int]] = None) -> int:
+        """One DeleteObjects per DELETE_BATCH keys; bytes freed come from `sizes` (no HEAD per key)."""
+        client = await self._get_client()
+        keys = list(keys)
+        sizes = sizes or {}
+        freed = 0
+        for start in range(0, len(keys), DELETE_BATCH):
+            batch = keys[start:start + DELETE_BATCH]
+            response = await client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": self._key(k)} for k in batch], "Quiet": True},
+            )
+            # Quiet mode only lists failures; a missing key is not one
+            failed = {error["Key"][len(self.prefix):]: error for error in response.get("Errors", [])}
+            if failed:
+                first = next(iter(failed.values()))
+                logger.warning(
+                    "DeleteObjects left %d of %d keys in %s (e.g. %s: %s %s)", len(failed), len(batch),
+                    self.bucket, first["Key"], first.get("Code"), first.get("Message"),
+                )
+            freed += sum(sizes.get(k, 0) for k in batch if k not in failed)
+        return freed
@@ -0,0 +1,94 @@
+import os
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image, UnidentifiedImageError
+
+from lib.config.settings import settings
+
+# Decoding anything larger than this raises DecompressionBombError in Pillow
+Image.MAX_IMAGE_PIXELS = settings.UPLOAD_MAX_PIXELS
+
+SNIFF_BYTES = 16
+
+# Leading bytes → Pillow format name
+_MAGIC = [
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+    (b"BM", "BMP"),
+]
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "GIF": ".gif", "BMP": ".bmp", "WEBP": ".webp"}
+
+
+class ImageInfo(NamedTuple):
+    format: str
+    width: int
+    height: int
+    size: int
+
+
+def sniff_image_format(head: bytes) -> Optional[str]:
+    """Identify an image from its magic bytes, without trusting name or content type."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "WEBP"
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return None
+
+
+def _reject(filename: str, reason: str):
+    raise HTTPException(status_code=422, detail=f"{filename or 'upload'}: {reason}")
+
+
+def inspect_image(fileobj: BinaryIO, filename: str = "") -> ImageInfo:
+    """
+    Check one upload against the byte, format and pixel limits. Blocking.
+
+    Only the header is parsed (Pillow opens lazily), so cost is bounded
+    regardless of what the file claims to contain. Leaves the file at 0.
+    """
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+
+    if size == 0:
+        _reject(filename, "file is empty")
+    if size > settings.UPLOAD_MAX_BYTES:
+        _reject(filename, f"file is {size} bytes, limit is {settings.UPLOAD_MAX_BYTES}")
+
+    fmt = sniff_image_format(fileobj.read(SNIFF_BYTES))
+    fileobj.seek(0)
+    if fmt is None:
+        _reject(filename, "not a recognised image")
+    if fmt not in settings.UPLOAD_ALLOWED_FORMATS:
+        _reject(filename, f"{fmt} images are not accepted (allowed: {', '.join(settings.UPLOAD_ALLOWED_FORMATS)})")
+
+    try:
+        with Image.open(fileobj, formats=[fmt]) as img:
+            width, height = img.size
+    except Image.DecompressionBombError:
+        _reject(filename, f"image exceeds {settings.UPLOAD_MAX_PIXELS} pixels")
+    except (UnidentifiedImageError, OSError, SyntaxError):
+        _reject(filename, f"corrupt or truncated {fmt} header")
+    finally:
+        fileobj.seek(0)
+
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        _reject(filename, f"image is {width}x{height} pixels, limit is {settings.UPLOAD_MAX_PIXELS}")
+
+    return ImageInfo(fmt, width, height, size)
+
+
+async def validate_uploads(files: List[Tuple[str, BinaryIO]]) -> List[ImageInfo]:
+    """Validate a whole submission of (filename, file object) pairs before anything is stored or decoded."""
+    if len(files) > settings.UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many files: {len(files)}, limit is {settings.UPLOAD_MAX_FILES}",
+        )
+    return [await run_in_threadpool(inspect_image, fileobj, filename) for filename, fileobj in files]
@@ -4,7 +4,13 @@ from .errors import raise_error, AppException
 from .password import hash_password, verify_password
 from .permissions import has_role, require_roles
 from .response import success_response, error_response
-from .smtp import send_email
+from .smtp import send_email, send_account_email
 from .init_admin import init_admin_user
-from .model_predict import predict_image
-__all__ = ["create_access_token", "verify_access_token", "raise_error", "AppException", "hash_password", "verify_password", "has_role" , "require_roles", "success_response", "error_response", "send_email", "init_admin_user", "predict_image"]
+from .model_predict import predict_image, preprocess_image, predict_array, predict_batch, final_verdict
+from .progress import progress_broker, format_sse
+from .signing import sign_value, verify_signature
+from .idempotency import idempotency_store, request_fingerprint
+from .pagination import encode_cursor, decode_cursor, keyset_order, keyset_after
+from .counts import count_cache, filtered_total, estimated_total
+from .result_writer import NewResult, PersistedResult, write_results, persist_result, result_write_batcher
+__all__ = ["create_access_token", "verify_access_token", "raise_error", "AppException", "hash_password", "verify_password", "has_role" , "require_roles", "success_response", "error_response", "send_email", "send_account_email", "init_admin_user", "predict_image", "preprocess_image", "predict_array", "predict_batch", "final_verdict", "progress_broker", "format_sse", "sign_value", "verify_signature", "idempotency_store", "request_fingerprint", "encode_cursor", "decode_cursor", "keyset_order", "keyset_after", "count_cache", "filtered_total", "estimated_total", "NewResult", "PersistedResult", "write_results", "persist_result", "result_write_batcher"]
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import func, text
+
+from lib.config.settings import settings
+
+
+class CountCache:
+    """
+    Per-process cache of listing totals, keyed by table and query scope
+    (role, owner, search, filters).
+
+    Writes to a table call invalidate(table): its totals cached before the
+    write are dropped once they are `write_grace` seconds old, so under a
+    steady stream of writes each scope is recounted at most that often rather
+    than on every request. Other workers only see the write once their entry
+    expires, so totals may lag by COUNT_CACHE_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: int, write_grace: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.write_grace = write_grace
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[float, int]]" = OrderedDict()
+        self._written: Dict[str, float] = {}
+
+    def get(self, table: str, scope: Hashable) -> Optional[int]:
+        entry = self._entries.get((table, scope))
+        if entry is None:
+            return None
+        cached_at, total = entry
+        now = time.monotonic()
+        stale = cached_at < self._written.get(table, 0.0) and now - cached_at >= self.write_grace
+        if stale or now - cached_at > self.ttl:
+            del self._entries[(table, scope)]
+            return None
+        self._entries.move_to_end((table, scope))
+        return total
+
+    def set(self, table: str, scope: Hashable, total: int):
+        self._entries[(table, scope)] = (time.monotonic(), total)
+        self._entries.move_to_end((table, scope))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *tables: str):
+        now = time.monotonic()
+        for table in tables:
+            self._written[table] = now
+
+
+count_cache = CountCache(settings.COUNT_CACHE_TTL_SECONDS, settings.COUNT_CACHE_WRITE_GRACE_SECONDS)
+
+
+def total_query(query, id_column):
+    """The COUNT statement filtered_total runs for a listing query."""
+    return query.with_only_columns(func.count(id_column)).order_by(None).limit(None).offset(None)
+
+
+async def filtered_total(session, query, id_column) -> int:
+    """
+    COUNT of a listing query (its ordering and paging dropped). A separate
+    statement, so the page query keeps its index-ordered early-stopping LIMIT.
+    """
+    return (await session.execute(total_query(query, id_column))).scalar() or 0
+
+
+async def estimated_total(session, table: str) -> Optional[int]:
+    """
+    Row estimate from the database's table statistics (no scan). Only
+    meaningful for an unfiltered listing; None when the backend has none.
+    """
+    dialect = session.bind.dialect.name
+    if dialect == "mysql":
+        query = text(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table"
+        )
+    elif dialect == "postgresql":
+        query = text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table")
+    else:
+        return None
+    estimate = (await session.execute(query, {"table": table})).scalar()
+    return max(int(estimate), 0) if estimate is not None else None
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import logging
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.config.settings import settings
+from lib.models.sql import IdempotencyKey
+
+logger = logging.getLogger("idempotency")
+
+# How often a waiting duplicate re-reads the row when the original runs in another worker
+POLL_SECONDS = 0.25
+# Claim attempts against deadlocks with a concurrent duplicate, or an original dropping its row
+CLAIM_ATTEMPTS = 5
+HASH_CHUNK = 1024 * 1024
+
+_Ident = Tuple[int, str, str]
+
+
+def _digest_file(fileobj: BinaryIO) -> str:
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    while chunk := fileobj.read(HASH_CHUNK):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+async def request_fingerprint(fields: Dict[str, Any], files: Iterable[BinaryIO] = ()) -> str:
+    """Stable hash of a request's fields plus the content of its files."""
+    file_digests = [await run_in_threadpool(_digest_file, f) for f in files]
+    canonical = json.dumps({"fields": jsonable_encoder(fields), "files": file_digests}, sort_keys=True)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key handling for create endpoints, backed by idempotency_keys.
+
+    The first request with a key claims a pending row (with a lease) and runs;
+    its response is then stored for IDEMPOTENCY_TTL_SECONDS. A duplicate that
+    arrives while the original is in flight waits for it (woken in-process,
+    polling across workers) and every later duplicate gets the stored response
+    back without running anything. Reusing a key for a different request is a
+    422. Only successes are stored: if the original fails, its claim is dropped
+    so a retry can run; if it dies outright its lease (renewed while it runs)
+    expires and the next retry takes over. Each claim carries a token, so an
+    original whose lease was taken over never stores or drops the new claim.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[_Ident, asyncio.Event] = {}
+
+    @staticmethod
+    def _where(ident: _Ident) -> tuple:
+        owner_id, scope, key = ident
+        return (IdempotencyKey.owner_id == owner_id, IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+
+    async def _claim(self, ident: _Ident, fingerprint: str, claim: str) -> Optional[IdempotencyKey]:
+        """
+        Claim the key under the token `claim` (returns None) or return the row
+        somebody else holds. INSERT first: locking a row that does not exist
+        yet would take gap locks that two concurrent duplicates deadlock on.
+        """
+        owner_id, scope, key = ident
+        for attempt in range(CLAIM_ATTEMPTS):
+            now = datetime.utcnow()
+            lease = now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+            expires = now + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            try:
+                async with async_session() as session:
+                    session.add(IdempotencyKey(
+                        owner_id=owner_id, scope=scope, key=key, fingerprint=fingerprint,
+                        locked_until=lease, expires_at=expires, claim=claim,
+                    ))
+                    try:
+                        await session.commit()
+                        return None
+                    except IntegrityError:
+                        await session.rollback()
+
+                    # The row exists: lock it to read it, or take it over when stale
+                    record = (await session.execute(
+                        select(IdempotencyKey).where(*self._where(ident)).with_for_update()
+                    )).scalar_one_or_none()
+                    if record is None:
+                        continue  # its original failed and dropped it meanwhile: insert again
+
+                    stale = record.expires_at < now or (record.status == "pending" and record.locked_until < now)
+                    if stale:
+                        record.fingerprint = fingerprint
+                        record.status = "pending"
+                        record.status_code = None
+                        record.response = None
+                        record.locked_until = lease
+                        record.expires_at = expires
+                        record.claim = claim
+                        session.add(record)
+                        await session.commit()
+                        return None
+
+                    await session.commit()
+                    return record
+            except OperationalError:
+                # Deadlock / lock wait timeout against a concurrent duplicate: try again
+                if attempt == CLAIM_ATTEMPTS - 1:
+                    raise
+                await asyncio.sleep(POLL_SECONDS * random.random())
+        raise HTTPException(
+            status_code=409, detail="A request with this Idempotency-Key is still in progress", headers={"Retry-After": "5"},
+        )
+
+    async def _renew(self, ident: _Ident, claim: str):
+        """Extend the lease every third of IDEMPOTENCY_LEASE_SECONDS while the original runs."""
+        interval = settings.IDEMPOTENCY_LEASE_SECONDS / 3
+        while True:
+            await asyncio.sleep(interval)
+            lease = datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)
+            try:
+                async with async_session() as session:
+                    await session.execute(
+                        update(IdempotencyKey)
+                        .where(*self._where(ident), IdempotencyKey.claim == claim, IdempotencyKey.status == "pending")
+                        .values(locked_until=lease)
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.warning("Idempotency lease renewal failed (%s); retrying", e)
+
+    async def _finish(self, ident: _Ident, claim: str, status_code: Optional[int], body: Any = None):
+        """
+        Store the response, or drop the claim when status_code is None; only
+        while `claim` still holds the key (a taken-over lease is left alone).
+        """
+        owned = (*self._where(ident), IdempotencyKey.claim == claim, IdempotencyKey.status == "pending")
+        async with async_session() as session:
+            if status_code is None:
+                await session.execute(delete(IdempotencyKey).where(*owned))
+            else:
+                updated = await session.execute(
+                    update(IdempotencyKey).where(*owned).values(
+                        status="completed",
+                        status_code=status_code,
+                        response=jsonable_encoder(body),
+                        expires_at=datetime.utcnow() + timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS),
+                    )
+                )
+                if not updated.rowcount:
+                    logger.warning("Idempotency-Key %s lost its claim before completing; response not stored", ident[2])
+            await session.commit()
+
+    async def run(
+        self,
+        key: Optional[str],
+        owner_id: int,
+        scope: str,
+        fingerprint: Callable[[], Awaitable[str]],
+        execute: Callable[[], Awaitable[Any]],
+        status_code: int = 200,
+        response: Optional[Response] = None,
+        replay: Optional[Callable[[Any], Awaitable[Any]]] = None,
+    ) -> Any:
+        """
+        Run `execute` at most once per (owner, scope, key). Without a key it
+        simply runs. `replay` may refresh a stored body (e.g. re-sign URLs);
+        replays are flagged with an `Idempotent-Replayed: true` header.
+        """
+        if not key:
+            return await execute()
+
+        ident = (owner_id, scope, key)
+        request_hash = await fingerprint()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+
+        claim = uuid.uuid4().hex
+        while (record := await self._claim(ident, request_hash, claim)) is not None:
+            if record.fingerprint != request_hash:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if record.status == "completed":
+                if response is not None:
+                    response.headers["Idempotent-Replayed"] = "true"
+                return await replay(record.response) if replay else record.response
+            if time.monotonic() >= deadline:
+                raise HTTPException(
+                    status_code=409,
+                    detail="A request with this Idempotency-Key is still in progress",
+                    headers={"Retry-After": "5"},
+                )
+            event = self._inflight.get(ident)
+            if event is not None:
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=POLL_SECONDS * 4)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(POLL_SECONDS)
+
+        event = self._inflight[ident] = asyncio.Event()
+        renewal = asyncio.create_task(self._renew(ident, claim), name="idempotency-lease")
+        try:
+            body = await execute()
+        except BaseException:
+            # Errors are not stored: a fixed-up retry with the same key runs again
+            await asyncio.shield(self._finish(ident, claim, None))
+            raise
+        else:
+            await self._finish(ident, claim, status_code, body)
+        finally:
+            renewal.cancel()
+            event.set()
+            self._inflight.pop(ident, None)
+        return body
+
+
+idempotency_store = IdempotencyStore()
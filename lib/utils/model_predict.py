@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 import tensorflow as tf
 import numpy as np
 from tensorflow.keras.preprocessing import image
@@ -9,12 +11,33 @@ model = tf.keras.models.load_model(MODEL_PATH)
 # Labels (order from your training generator)
 CLASS_NAMES = ['CANCER', 'NON CANCER']
 
-def predict_image(img_path: str):
-    """Predict single image using trained model."""
+
+def preprocess_image(img_path) -> np.ndarray:
+    """Decode and resize an image (path or BytesIO) into a (1, 224, 224, 3) model input batch."""
     img = image.load_img(img_path, target_size=(224, 224))
     img_array = image.img_to_array(img) / 255.0
-    img_array = np.expand_dims(img_array, axis=0)
-    preds = model.predict(img_array)
-    predicted_class = CLASS_NAMES[np.argmax(preds[0])]
-    confidence = float(np.max(preds[0]))
-    return predicted_class, confidence
+    return np.expand_dims(img_array, axis=0)
+
+
+def predict_array(img_array: np.ndarray):
+    """Score an already preprocessed image batch."""
+    return predict_batch(img_array)[0]
+
+
+def predict_batch(img_arrays: np.ndarray) -> List[Tuple[str, float]]:
+    """Score an (N, 224, 224, 3) batch in one model call → (label, confidence) per image."""
+    preds = model.predict(img_arrays, verbose=0)
+    return [(CLASS_NAMES[int(np.argmax(p))], float(np.max(p))) for p in preds]
+
+
+def final_verdict(predictions: List[str], confidences: List[float]) -> Tuple[str, float]:
+    """Overall result of a submission: majority label (ties → NON CANCER) and mean confidence in %."""
+    avg_conf = round(float(np.mean(confidences)) * 100, 2)
+    cancer_votes = predictions.count("CANCER")
+    non_cancer_votes = predictions.count("NON CANCER")
+    return ("CANCER" if cancer_votes > non_cancer_votes else "NON CANCER"), avg_conf
+
+
+def predict_image(img_path: str):
+    """Predict single image using trained model."""
+    return predict_array(preprocess_image(img_path))
@@ -0,0 +1,65 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+
+def encode_cursor(column: str, descending: bool, value: Any, last_id: int) -> str:
+    """Opaque cursor pointing just after the row (value, last_id) of an ordering."""
+    is_datetime = isinstance(value, datetime)
+    payload = {
+        "c": column,
+        "d": descending,
+        "v": value.isoformat() if is_datetime else value,
+        "t": "dt" if is_datetime else None,
+        "i": last_id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, column: str, descending: bool) -> tuple:
+    """Return (value, last_id) from a cursor issued for the same ordering, else 400."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        value = payload["v"]
+        if payload.get("t") == "dt" and value is not None:
+            value = datetime.fromisoformat(value)
+        last_id = int(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("c") != column or payload.get("d") != descending:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different ordering")
+    return value, last_id
+
+
+def keyset_order(column, id_column, descending: bool) -> List:
+    """
+    ORDER BY for keyset pages: the column, then the primary key as a unique
+    tie-breaker. NULLs of a nullable column always sort last. Takes table
+    columns (Model.__table__.c.x), which know whether they are nullable.
+    """
+    direction = (lambda c: c.desc()) if descending else (lambda c: c.asc())
+    if column is id_column:
+        return [direction(id_column)]
+    order = [direction(column), direction(id_column)]
+    if column.nullable:
+        order.insert(0, column.is_(None).asc())
+    return order
+
+
+def keyset_after(column, id_column, descending: bool, value: Any, last_id: int):
+    """WHERE clause selecting the rows that follow (value, last_id) in keyset_order."""
+    beyond = (lambda c, v: c < v) if descending else (lambda c, v: c > v)
+    if column is id_column:
+        return beyond(id_column, last_id)
+    if value is None:
+        # Already in the trailing NULL block
+        return and_(column.is_(None), beyond(id_column, last_id))
+    after = or_(beyond(column, value), and_(column == value, beyond(id_column, last_id)))
+    if column.nullable:
+        return or_(and_(column.isnot(None), after), column.is_(None))
+    return after
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, Optional, Set, Tuple
+
+# Events kept per submission so late subscribers can catch up
+HISTORY_SIZE = 64
+# Events buffered per listener before a slow client starts losing them
+LISTENER_QUEUE_SIZE = 32
+# How long a finished submission stays replayable
+FINISHED_TTL_SECONDS = 60
+# How long a submission nobody publishes to is kept around
+IDLE_TTL_SECONDS = 600
+KEEPALIVE_SECONDS = 15
+# A subscription with no new event for this long, or open this long in all, is closed with an "expired" event
+SUBSCRIBE_IDLE_SECONDS = 120
+SUBSCRIBE_MAX_SECONDS = IDLE_TTL_SECONDS
+# Expired channels are swept at most this often, when a new one is created
+SWEEP_INTERVAL_SECONDS = 30
+
+TERMINAL_EVENTS = {"completed", "failed"}
+
+
+def format_sse(event: str, data: dict) -> str:
+    """Encode a single Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class _Channel:
+    __slots__ = ("history", "listeners", "finished", "touched")
+
+    def __init__(self):
+        self.history: deque = deque(maxlen=HISTORY_SIZE)
+        self.listeners: Set[asyncio.Queue] = set()
+        self.finished = False
+        self.touched = time.monotonic()
+
+
+class ProgressBroker:
+    """
+    In-process pub/sub for per-submission progress events.
+
+    Channels are keyed by (user id, submission_id): a client-chosen id only
+    ever reaches the listeners of the user who submitted under it. Each
+    listener only holds a small bounded queue of pre-encoded frames, so
+    thousands of idle SSE connections cost a few KB each. Channels live in
+    the memory of the worker that handles the upload, so the SSE request
+    must reach the same worker (sticky sessions when running several).
+    """
+
+    def __init__(self):
+        self._channels: Dict[Tuple[int, str], _Channel] = {}
+        self._next_sweep = 0.0
+
+    def _channel(self, key: Tuple[int, str]) -> _Channel:
+        channel = self._channels.get(key)
+        if channel is None:
+            now = time.monotonic()
+            if now >= self._next_sweep:
+                self._next_sweep = now + SWEEP_INTERVAL_SECONDS
+                self._sweep()
+            channel = self._channels[key] = _Channel()
+        return channel
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key, channel in list(self._channels.items()):
+            ttl = FINISHED_TTL_SECONDS if channel.finished else IDLE_TTL_SECONDS
+            if not channel.listeners and now - channel.touched > ttl:
+                del self._channels[key]
+
+    def publish(self, owner_id: int, submission_id: Optional[str], event: str, data: dict):
+        """Broadcast an event of `owner_id`'s submission. No-op when the client did not ask for progress."""
+        if not submission_id:
+            return
+        channel = self._channel((owner_id, submission_id))
+        if event == "received":
+            # The id was reused for a new submission: don't replay (or stay finished on) the old one
+            channel.history.clear()
+            channel.finished = False
+        frame = format_sse(event, data)
+        channel.history.append(frame)
+        channel.touched = time.monotonic()
+        if event in TERMINAL_EVENTS:
+            channel.finished = True
+
+        for queue in channel.listeners:
+            if queue.full():
+                # Slow consumer: drop its oldest frame rather than grow memory
+                queue.get_nowait()
+            queue.put_nowait(frame)
+
+    async def subscribe(self, owner_id: int, submission_id: str) -> AsyncIterator[str]:
+        """
+        Yield SSE frames for `owner_id`'s submission until it completes or fails, or
+        until it has been quiet for SUBSCRIBE_IDLE_SECONDS (or open for
+        SUBSCRIBE_MAX_SECONDS): then a final "expired" event. An unknown or
+        swept submission_id therefore closes too, instead of pinning its channel.
+        """
+        key = (owner_id, submission_id)
+        channel = self._channel(key)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=LISTENER_QUEUE_SIZE)
+        for frame in list(channel.history)[-LISTENER_QUEUE_SIZE:]:
+            queue.put_nowait(frame)
+        channel.listeners.add(queue)
+
+        opened = last_event = time.monotonic()
+        try:
+            while True:
+                if queue.empty() and channel.finished:
+                    return
+                try:
+                    frame = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    now = time.monotonic()
+                    if now - last_event >= SUBSCRIBE_IDLE_SECONDS or now - opened >= SUBSCRIBE_MAX_SECONDS:
+                        yield format_sse("expired", {"detail": "No progress for this submission"})
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                last_event = time.monotonic()
+                yield frame
+        finally:
+            channel.listeners.discard(queue)
+            channel.touched = time.monotonic()
+            if not channel.listeners and not channel.history and self._channels.get(key) is channel:
+                # Only ever subscribed to: nothing to replay, drop it now
+                del self._channels[key]
+
+
+progress_broker = ProgressBroker()
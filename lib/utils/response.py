@@ -1,15 +1,15 @@
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from typing import Optional, Dict
 
 def success_response(
     data: Optional[Dict] = None, 
     message: str = "Success", 
     status_code: int = 200
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Standard success response
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "success": True,
@@ -23,11 +23,11 @@ def error_response(
     message: str = "Error", 
     details: Optional[Dict] = None, 
     status_code: int = 400
-) -> JSONResponse:
+) -> ORJSONResponse:
     """
     Standard error response
     """
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status_code,
         content={
             "success": False,
@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import random
+import string
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from lib.config.database import async_session
+from lib.config.replicas import request_wrote
+from lib.config.settings import settings
+from lib.models.sql import Result, ResultImage, User, UserRole
+from lib.storage import add_blob_refs, blob_content_hash
+import lib.stats  # noqa: F401 — the Result events that keep result_stats in step
+from .counts import count_cache
+from .password import hash_password
+
+logger = logging.getLogger("results.writer")
+
+
+class NewResult(NamedTuple):
+    """A scored submission, ready to be written."""
+    created_by: int
+    email: str
+    name: str
+    age: Optional[int]
+    gender: Optional[str]
+    final_result: str
+    confidence: float
+    scored: List[Tuple[str, int, str, float]]  # (blob_id, size, label, confidence %) per image
+    before_commit: Optional[Callable[[AsyncSession], Awaitable[None]]] = None
+    credentials: Optional[Tuple[str, str]] = None  # (temporary password, its hash) if the patient is new, precomputed
+
+
+class PersistedResult(NamedTuple):
+    result: Result
+    images: List[ResultImage]
+    password: Optional[str]  # temporary password of a patient account created for it
+
+
+async def write_results(session: AsyncSession, items: List[NewResult]) -> List[PersistedResult]:
+    """
+    Write submissions in the caller's transaction (the caller commits):
+    find or create their patients, insert the Results and their result_images,
+    add blob references, run each item's before_commit. Ids come back from the
+    INSERTs themselves; nothing is re-read. Statements are shared by the whole
+    list, so N submissions cost about as many round-trips as one.
+    """
+    # Patients: one lookup for every email in the batch (emails compare case-insensitively).
+    # Only patient accounts: a counselor or admin with the same email is a different user.
+    emails = {item.email for item in items}
+    patients = (await session.execute(
+        select(User.email, User.id, User.deleted_at).where(User.email.in_(emails), User.role == UserRole.user)
+    )).all()
+    user_ids: Dict[str, int] = {email.lower(): user_id for email, user_id, deleted_at in patients if deleted_at is None}
+    purging = {email.lower() for email, _, deleted_at in patients if deleted_at is not None}
+    new_users: Dict[str, User] = {}
+    passwords: Dict[str, str] = {}
+    for item in items:
+        key = item.email.lower()
+        if key in purging:
+            # Attaching it would have it purged with the account; a new one can't exist alongside
+            raise HTTPException(status_code=409, detail=f"Patient account {item.email} is being deleted")
+        if key in user_ids or key in new_users:
+            continue
+        if item.credentials is not None:
+            password, hashed = item.credentials
+        else:
+            password = "".join(random.choices(string.ascii_letters + string.digits, k=10))
+            hashed = hash_password(password)
+        new_users[key] = User(
+            name=item.name, email=item.email, password=hashed, role="user", otp_verified=True,
+        )
+        passwords[key] = password
+    if new_users:
+        session.add_all(new_users.values())
+        await session.flush()
+        user_ids.update({key: user.id for key, user in new_users.items()})
+
+    # Results: a multi-row INSERT ... RETURNING where the backend has it (one INSERT per row on MySQL)
+    results = [
+        Result(
+            user_id=user_ids[item.email.lower()],
+            created_by=item.created_by,
+            age=item.age,
+            gender=item.gender,
+            result=item.final_result,
+            confidence=item.confidence,
+        )
+        for item in items
+    ]
+    session.add_all(results)
+    await session.flush()
+
+    images = [
+        [
+            ResultImage(
+                result_id=result.id, position=position, image=blob_id,
+                content_hash=blob_content_hash(blob_id), label=label, confidence=conf,
+            )
+            for position, (blob_id, _, label, conf) in enumerate(item.scored)
+        ]
+        for result, item in zip(results, items)
+    ]
+    rows = [image.model_dump(exclude={"id"}) for group in images for image in group]
+    if rows:
+        # One multi-row INSERT; the rows need no ids back
+        await session.execute(ResultImage.__table__.insert(), rows)
+    await add_blob_refs(session, [(blob_id, size) for item in items for blob_id, size, _, _ in item.scored])
+
+    for item in items:
+        if item.before_commit is not None:
+            await item.before_commit(session)
+
+    return [
+        PersistedResult(result, group, passwords.pop(item.email.lower(), None))
+        for result, group, item in zip(results, images, items)
+    ]
+
+
+class ResultWriteBatcher:
+    """
+    Write-behind coalescing of result inserts (RESULT_WRITE_BATCHING).
+
+    Submissions arriving within RESULT_WRITE_BATCH_WINDOW_MS of each other
+    (up to RESULT_WRITE_BATCH_MAX) are written by write_results in one
+    transaction, so a burst pays for one COMMIT instead of one per request.
+    Every caller waits for the commit and gets its own Result back. If the
+    batch fails it is rolled back and each submission is retried in its own
+    transaction, so only the submissions that fail on their own (e.g. uploads
+    already finalized) see an error.
+    """
+
+    def __init__(self, window_ms: int, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.stats = {"batches": 0, "results": 0, "isolated_retries": 0}
+        self._pending: List[Tuple[NewResult, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    async def submit(self, item: NewResult) -> PersistedResult:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush_now()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush_now)
+        persisted = await future
+        request_wrote()  # the commit ran in the flush task, not in this request
+        return persisted
+
+    def _flush_now(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._flush(batch), name="result-write-batch")
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[NewResult, asyncio.Future]]) -> List[PersistedResult]:
+        async with async_session() as session:
+            persisted = await write_results(session, [item for item, _ in batch])
+            await session.commit()
+        count_cache.invalidate("results", *(("users",) if any(p.password for p in persisted) else ()))
+        return persisted
+
+    async def _flush(self, batch: List[Tuple[NewResult, asyncio.Future]]):
+        try:
+            persisted = await self._write(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                _, future = batch[0]
+                if not future.done():
+                    future.set_exception(e)
+                return
+            logger.warning("Result batch of %d failed (%s); retrying one by one", len(batch), e)
+            self.stats["isolated_retries"] += 1
+            for entry in batch:
+                await self._flush([entry])
+            return
+
+        self.stats["batches"] += 1
+        self.stats["results"] += len(batch)
+        for (_, future), result in zip(batch, persisted):
+            if not future.done():
+                future.set_result(result)
+
+    async def drain(self):
+        """Flush what is queued and wait for in-flight batches (shutdown)."""
+        self._flush_now()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+
+result_write_batcher = ResultWriteBatcher(settings.RESULT_WRITE_BATCH_WINDOW_MS, settings.RESULT_WRITE_BATCH_MAX)
+
+
+async def persist_result(session: AsyncSession, item: NewResult) -> PersistedResult:
+    """Write one submission: through the batcher when enabled, else in the caller's session."""
+    if settings.RESULT_WRITE_BATCHING:
+        return await result_write_batcher.submit(item)
+    persisted = (await write_results(session, [item]))[0]
+    await session.commit()
+    count_cache.invalidate("results", *(("users",) if persisted.password else ()))
+    return persisted
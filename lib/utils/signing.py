@@ -0,0 +1,30 @@
+import base64
+import hashlib
+import hmac
+import time
+from typing import Optional, Tuple
+
+from lib.config.settings import settings
+
+
+def _digest(value: str, expires: int) -> str:
+    mac = hmac.new(settings.SECRET_KEY.encode(), f"{value}:{expires}".encode(), hashlib.sha256)
+    return base64.urlsafe_b64encode(mac.digest()[:18]).decode()
+
+
+def sign_value(value: str, ttl: Optional[int] = None) -> Tuple[int, str]:
+    """
+    Sign a value (e.g. a media name) and return (expires, signature).
+
+    Expiry is rounded up to the next TTL window so every link issued within
+    a window is byte-identical and stays cacheable by the browser.
+    """
+    ttl = ttl or settings.MEDIA_URL_TTL_SECONDS
+    expires = (int(time.time()) // ttl + 2) * ttl
+    return expires, _digest(value, expires)
+
+
+def verify_signature(value: str, expires: int, signature: str) -> bool:
+    if expires < time.time():
+        return False
+    return hmac.compare_digest(_digest(value, expires), signature or "")
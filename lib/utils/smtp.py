@@ -80,3 +80,22 @@ async def send_email(
     except Exception as exc:
         # Bubble up or wrap error
         raise
+
+
+async def send_account_email(name: str, email: str, password: str) -> dict:
+    """Tell a patient whose account was created for a result how to log in."""
+    subject = "Your Oral Cancer AI Account"
+    body = f"""
+Hello {name},
+
+An account has been created for you on the Oral Cancer AI Platform.
+
+🔹 Email: {email}
+🔹 Temporary Password: {password}
+
+Please log in and change your password after first login.
+
+Regards,  
+Oral Cancer AI Team
+"""
+    return await send_email(subject, [email], body)
@@ -1,12 +1,16 @@
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 from lib.middleware import register_middleware, register_middleware_at_last
 from lib.routes import register_routes
-from lib.utils import success_response, error_response, init_admin_user
+from lib.utils import success_response, error_response, init_admin_user, result_write_batcher
 from lib.config.settings import settings  
-from lib.config.database import init_databases
+from lib.config.database import init_databases, replica_set
+from lib.storage import storage
+from lib.storage.collector import storage_collector
+from lib.stats import stats_reconciler
 
-app = FastAPI()
+# orjson: native datetime / dataclass encoding for every route that doesn't pick its own response class
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Register middleware and routes
 register_middleware(app)
@@ -14,7 +18,17 @@ register_middleware(app)
 async def startup_event():
     await init_databases()
     await init_admin_user()
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    storage_collector.start()
+    replica_set.start()
+    stats_reconciler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await result_write_batcher.drain()
+    await storage_collector.stop()
+    await replica_set.stop()
+    await stats_reconciler.stop()
+    await storage.close()
 
 register_routes(app)
 register_middleware_at_last(app)